@@ -42,6 +42,11 @@ async def run_async_migrations() -> None:
 
 
 def run_migrations_online() -> None:
+    # migrate.py passes in a connection that already holds the migration lock
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
     asyncio.run(run_async_migrations())
 
 
@@ -0,0 +1,38 @@
+"""drop otp_codes
+
+Locally issued OTPs now live in Redis under otp:{phone} with a TTL, so the
+table (and the rows that were never cleaned up) goes away.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 15:02:11.518204
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index(op.f('ix_otp_codes_phone'), table_name='otp_codes')
+    op.drop_table('otp_codes')
+
+
+def downgrade() -> None:
+    op.create_table('otp_codes',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('verified', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_otp_codes_phone'), 'otp_codes', ['phone'], unique=False)
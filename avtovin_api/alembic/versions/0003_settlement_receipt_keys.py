@@ -0,0 +1,40 @@
+"""settlement receipt keys
+
+settlements.receipt_url held the base64 receipt itself (copied into every
+settlement of a bulk upload). Receipts now live in storage and settlements
+keep the storage key in receipt_key.
+
+Moving the blobs needs the storage backend, so it is not done here:
+migrate.py runs backfill_receipts() after upgrading, which stores each blob
+(unknown ones as application/octet-stream), sets receipt_key and only then
+clears receipt_url. The column itself is left for a later migration to drop
+once every deployment has been backfilled.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:40:27.093412
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('settlements', sa.Column('receipt_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    # Backfilled rows point at the stored file again (the API serves /uploads/ for both backends)
+    op.execute("""
+        UPDATE settlements SET receipt_url = '/uploads/' || receipt_key
+        WHERE receipt_url IS NULL AND receipt_key IS NOT NULL
+    """)
+    op.drop_column('settlements', 'receipt_key')
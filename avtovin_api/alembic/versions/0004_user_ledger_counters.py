@@ -0,0 +1,46 @@
+"""user ledger counters
+
+users.total_earned / total_spent are kept by ledger_service.post() next to
+users.balance, so the balance endpoint stops summing balance_transactions
+on every request. Existing users are backfilled from their transactions;
+balance itself is left alone (the reconciliation job reports any drift).
+The (user_id, created_at) index serves the paginated transaction history.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 21:12:40.381025
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('total_earned', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('total_spent', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE users SET total_earned = t.earned, total_spent = t.spent
+        FROM (
+            SELECT user_id,
+                   COALESCE(SUM(amount) FILTER (WHERE type = 'CASHBACK_EARN'), 0) AS earned,
+                   COALESCE(-SUM(amount) FILTER (WHERE type = 'CASHBACK_SPEND'), 0) AS spent
+            FROM balance_transactions
+            GROUP BY user_id
+        ) t
+        WHERE t.user_id = users.id
+    """)
+    op.create_index('ix_balance_transactions_user_id_created_at', 'balance_transactions', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_balance_transactions_user_id_created_at', table_name='balance_transactions')
+    op.drop_column('users', 'total_spent')
+    op.drop_column('users', 'total_earned')
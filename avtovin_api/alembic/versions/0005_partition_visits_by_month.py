@@ -0,0 +1,160 @@
+"""partition visits and balance_transactions by month
+
+Both tables become RANGE (created_at) partitioned tables with one partition
+per month (from the oldest row through MONTHS_AHEAD), a DEFAULT partition,
+and the worker creating new months from then on
+(services/partition_service.py). The DDL helpers are copied here so the
+migration does not change with that module.
+
+A partitioned table's primary key must contain the partition key, so the
+keys become (id, created_at), and the foreign keys from visit_services and
+balance_transactions to visits are dropped (the ORM keeps the link). The
+old tables are renamed, copied into the new ones and dropped, all in the
+migration transaction: writers wait for it, so run it in a quiet window.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-20 10:05:51.204671
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VISIT_COLUMNS = "id, car_id, service_center_id, description, cost, mileage, cashback, cashback_used, service_fee, status, created_at"
+TXN_COLUMNS = "id, user_id, amount, type, description, visit_id, created_at"
+# The worker's default partition_months_ahead; it creates later months itself
+MONTHS_AHEAD = 3
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def months_between(first: date, last: date) -> list[date]:
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def _visits_table(partitioned: bool):
+    op.create_table('visits',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('car_id', sa.String(), nullable=False),
+    sa.Column('service_center_id', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('cost', sa.Integer(), nullable=False),
+    sa.Column('mileage', sa.Integer(), nullable=True),
+    sa.Column('cashback', sa.Integer(), nullable=False),
+    sa.Column('cashback_used', sa.Integer(), nullable=False),
+    sa.Column('service_fee', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['car_id'], ['cars.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['service_center_id'], ['service_centers.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {})
+    )
+
+
+def _transactions_table(partitioned: bool):
+    op.create_table('balance_transactions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('visit_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    *([] if partitioned else [sa.ForeignKeyConstraint(['visit_id'], ['visits.id'], )]),
+    sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {})
+    )
+
+
+def _create_partitions(table: str):
+    oldest = op.get_bind().execute(sa.text(f"SELECT min(created_at) FROM {table}_unpartitioned")).scalar()
+    this_month = month_start(datetime.utcnow())
+    first = min(month_start(oldest), this_month) if oldest else this_month
+    for month in months_between(first, add_months(this_month, MONTHS_AHEAD)):
+        op.execute(create_partition_sql(table, month))
+    op.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+
+def upgrade() -> None:
+    op.drop_constraint('visit_services_visit_id_fkey', 'visit_services', type_='foreignkey')
+    op.drop_constraint('balance_transactions_visit_id_fkey', 'balance_transactions', type_='foreignkey')
+    op.drop_index('ix_balance_transactions_user_id_created_at', table_name='balance_transactions')
+
+    for table in ('visits', 'balance_transactions'):
+        op.rename_table(table, f'{table}_unpartitioned')
+        op.execute(f'ALTER INDEX {table}_pkey RENAME TO {table}_unpartitioned_pkey')
+
+    _visits_table(partitioned=True)
+    _create_partitions('visits')
+    op.execute(f"INSERT INTO visits ({VISIT_COLUMNS}) SELECT {VISIT_COLUMNS} FROM visits_unpartitioned")
+
+    _transactions_table(partitioned=True)
+    _create_partitions('balance_transactions')
+    op.execute(f"INSERT INTO balance_transactions ({TXN_COLUMNS}) SELECT {TXN_COLUMNS} FROM balance_transactions_unpartitioned")
+
+    op.drop_table('balance_transactions_unpartitioned')
+    op.drop_table('visits_unpartitioned')
+
+    # Indexes on the parent are created on every partition (and on future ones)
+    op.create_index('ix_visits_service_center_id_created_at', 'visits', ['service_center_id', 'created_at'])
+    op.create_index('ix_visits_car_id_created_at', 'visits', ['car_id', 'created_at'])
+    op.create_index('ix_balance_transactions_user_id_created_at', 'balance_transactions', ['user_id', 'created_at'])
+    op.create_index(op.f('ix_visit_services_visit_id'), 'visit_services', ['visit_id'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_visit_services_visit_id'), table_name='visit_services')
+    for table in ('visits', 'balance_transactions'):
+        op.rename_table(table, f'{table}_partitioned')
+        op.execute(f'ALTER INDEX {table}_pkey RENAME TO {table}_partitioned_pkey')
+    op.drop_index('ix_visits_service_center_id_created_at', table_name='visits_partitioned')
+    op.drop_index('ix_visits_car_id_created_at', table_name='visits_partitioned')
+    op.drop_index('ix_balance_transactions_user_id_created_at', table_name='balance_transactions_partitioned')
+
+    # Links the ORM let dangle would fail the restored foreign keys
+    op.execute("DELETE FROM visit_services WHERE visit_id NOT IN (SELECT id FROM visits_partitioned)")
+    op.execute(
+        "UPDATE balance_transactions_partitioned SET visit_id = NULL "
+        "WHERE visit_id IS NOT NULL AND visit_id NOT IN (SELECT id FROM visits_partitioned)"
+    )
+
+    _visits_table(partitioned=False)
+    op.execute(f"INSERT INTO visits ({VISIT_COLUMNS}) SELECT {VISIT_COLUMNS} FROM visits_partitioned")
+    _transactions_table(partitioned=False)
+    op.execute(f"INSERT INTO balance_transactions ({TXN_COLUMNS}) SELECT {TXN_COLUMNS} FROM balance_transactions_partitioned")
+
+    # Dropping the parents drops every monthly partition with them
+    op.drop_table('balance_transactions_partitioned')
+    op.drop_table('visits_partitioned')
+
+    op.create_index('ix_balance_transactions_user_id_created_at', 'balance_transactions', ['user_id', 'created_at'])
+    op.create_foreign_key('visit_services_visit_id_fkey', 'visit_services', 'visits', ['visit_id'], ['id'], ondelete='CASCADE')
@@ -0,0 +1,76 @@
+"""visit and balance transaction archive tables
+
+Cold tier for closed months (services/archive_service.py). visits_archive
+inlines each visit's services as JSONB; with a low toast_tuple_target (and
+lz4 column compression where the server supports it) Postgres stores those
+rows compressed. Each table has only the index its merged read path needs.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-20 12:31:08.660417
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('visits_archive',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('car_id', sa.String(), nullable=False),
+    sa.Column('service_center_id', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('cost', sa.Integer(), nullable=False),
+    sa.Column('mileage', sa.Integer(), nullable=True),
+    sa.Column('cashback', sa.Integer(), nullable=False),
+    sa.Column('cashback_used', sa.Integer(), nullable=False),
+    sa.Column('service_fee', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('services', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['car_id'], ['cars.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['service_center_id'], ['service_centers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_visits_archive_car_id_created_at', 'visits_archive', ['car_id', 'created_at'])
+    op.create_table('balance_transactions_archive',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('visit_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_balance_transactions_archive_user_id_created_at', 'balance_transactions_archive', ['user_id', 'created_at'],
+    )
+
+    # Compress rows above 128 bytes (default ~2KB), the services JSON with lz4 when the server has it
+    op.execute("ALTER TABLE visits_archive SET (toast_tuple_target = 128)")
+    op.execute("ALTER TABLE balance_transactions_archive SET (toast_tuple_target = 128)")
+    has_lz4 = op.get_bind().execute(sa.text(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'"
+    )).scalar()
+    if has_lz4:
+        op.execute("ALTER TABLE visits_archive ALTER COLUMN services SET COMPRESSION lz4")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_balance_transactions_archive_user_id_created_at', table_name='balance_transactions_archive')
+    op.drop_table('balance_transactions_archive')
+    op.drop_index('ix_visits_archive_car_id_created_at', table_name='visits_archive')
+    op.drop_table('visits_archive')
@@ -0,0 +1,43 @@
+"""car warranty status table
+
+car_warranty_status has one row per car with an active warranty, kept by
+warranty writes and the worker's sweep (services/warranty_status.py). The
+visits warranty filter semi/anti-joins it on car_id instead of running
+IN / NOT IN over warranties. Backfilled from the warranties active now.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 15:47:22.318904
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('car_warranty_status',
+    sa.Column('car_id', sa.String(), nullable=False),
+    sa.Column('active_until', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['car_id'], ['cars.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('car_id')
+    )
+    op.create_index('ix_car_warranty_status_active_until', 'car_warranty_status', ['active_until'])
+    op.execute("""
+        INSERT INTO car_warranty_status (car_id, active_until)
+        SELECT car_id, max(end_date) FROM warranties
+        WHERE is_active AND end_date >= (now() AT TIME ZONE 'utc')
+        GROUP BY car_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_car_warranty_status_active_until', table_name='car_warranty_status')
+    op.drop_table('car_warranty_status')
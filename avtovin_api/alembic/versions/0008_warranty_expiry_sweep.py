@@ -0,0 +1,45 @@
+"""warranty expiry sweep
+
+warranties.is_active becomes a maintained status: the worker clears it
+once end_date passes (services/warranty_status.py), using the partial index
+on end_date of active warranties, which also serves the expiring-soon
+reminders (expiry_notified_at records the one sent). users.active_warranties
+counts each manager's active warranties; it is backfilled from is_active,
+and the first sweep takes expired ones out of it.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-20 17:09:41.552013
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('warranties', sa.Column('expiry_notified_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_warranties_active_end_date', 'warranties', ['end_date'], postgresql_where=sa.text('is_active'),
+    )
+    op.add_column('users', sa.Column('active_warranties', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE users SET active_warranties = w.active
+        FROM (
+            SELECT created_by_id, count(*) AS active FROM warranties WHERE is_active GROUP BY created_by_id
+        ) w
+        WHERE w.created_by_id = users.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'active_warranties')
+    op.drop_index('ix_warranties_active_end_date', table_name='warranties')
+    op.drop_column('warranties', 'expiry_notified_at')
@@ -0,0 +1,28 @@
+"""warranties created_by_id index
+
+The warranty manager list counts each manager's warranties for the page it
+returns; this index keeps those counts (and the managers' own warranty
+lists) from scanning the table.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-20 18:24:05.917366
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_warranties_created_by_id'), 'warranties', ['created_by_id'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_warranties_created_by_id'), table_name='warranties')
@@ -0,0 +1,30 @@
+"""warranty expired_at
+
+warranties.expired_at records that the expiry sweep, not a manager, cleared
+is_active, so extending the end_date of such a warranty makes it active
+again (services/warranty_status.py). Warranties the sweep has already
+expired cannot be told apart from deactivated ones and are left unmarked.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-21 10:12:36.204518
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('warranties', sa.Column('expired_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('warranties', 'expired_at')
@@ -1,10 +1,32 @@
+from fastapi import Request
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+engine = create_async_engine(
+    settings.database_url,
+    echo=settings.debug,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read-only routes (get_read_db) go to the replica when one is configured, so
+# dashboards, exports and lists use its pool and not the one visits write through
+read_engine = create_async_engine(
+    settings.database_read_url,
+    echo=settings.debug,
+    pool_size=settings.db_read_pool_size,
+    max_overflow=settings.db_read_max_overflow,
+    pool_pre_ping=True,
+) if settings.database_read_url else engine
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+WROTE_KEY = "db:wrote:{}"
+
 
 async def get_db():
     async with async_session() as session:
@@ -12,3 +34,49 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+def caller_id(request: Request) -> str | None:
+    """User id from the request's bearer token, if it carries a valid one."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]).get("sub")
+    except JWTError:
+        return None
+
+
+async def mark_write(request: Request):
+    """Pin the caller to the primary for a while after a write (ReadYourWritesMiddleware)."""
+    user_id = caller_id(request)
+    if read_engine is engine or user_id is None:
+        return
+    try:
+        await request.app.state.redis.set(WROTE_KEY.format(user_id), 1, ex=settings.read_your_writes_seconds)
+    except RedisError as e:
+        print(f"[DB] Could not mark write by {user_id}: {e}")
+
+
+async def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """The replica, unless the caller wrote recently and the replica may not have it yet."""
+    if read_engine is engine:
+        return async_session
+    user_id = caller_id(request)
+    if user_id is None:
+        return read_session
+    try:
+        wrote = await request.app.state.redis.exists(WROTE_KEY.format(user_id))
+    except RedisError:
+        wrote = True  # can't tell: stay on the primary
+    return async_session if wrote else read_session
+
+
+async def get_read_db(request: Request):
+    """Session for read-only routes; never write through it (a replica refuses)."""
+    maker = await read_sessionmaker(request)
+    async with maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
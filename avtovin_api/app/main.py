@@ -1,30 +1,59 @@
+import asyncio
+import ipaddress
 import os
 from contextlib import asynccontextmanager
 
 import redis.asyncio as aioredis
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from app import metrics
 from app.config import settings as app_settings
+from app.database import async_session, engine, read_engine
+from app.middleware import BodySizeLimitMiddleware, ReadYourWritesMiddleware
+from app.migrations import verify_schema_revision
+from app.services import catalog_index, image_service, password_service, vin_service
+from app.services.storage import get_storage
 from app.routers import (
     auth, users, cars, car_catalog, services, service_centers, visits,
     warranties, warranty_managers, settlements, banners, dashboard,
-    settings as settings_router, events, seed, landing,
+    settings as settings_router, events, seed, landing, uploads,
 )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: connect Redis
+    # Runs once per worker process: every worker gets its own Redis client and DB pool
+    if app_settings.verify_schema_on_startup:
+        await verify_schema_revision()
     app.state.redis = aioredis.from_url(app_settings.redis_url, decode_responses=True)
+    catalog_listener = asyncio.create_task(catalog_index.listen_for_reloads(app.state.redis))
+    async with async_session() as db:
+        await catalog_index.get_index(db)
     yield
-    # Shutdown: close Redis
-    await app.state.redis.close()
+    catalog_listener.cancel()
+    # Shutdown: close Redis, the worker's pooled DB connections, HTTP clients and worker pools
+    await app.state.redis.aclose()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await vin_service.aclose()
+    password_service.shutdown()
+    image_service.shutdown()
 
 
-app = FastAPI(title="Avtovin API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(
+    title="Avtovin API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
+# Added first so it sits inside CORS and its 413s still carry CORS headers
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=app_settings.max_request_body_mb * 1024 * 1024)
+app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -50,12 +79,33 @@ app.include_router(settings_router.router)
 app.include_router(events.router)
 app.include_router(seed.router)
 app.include_router(landing.router)
+app.include_router(uploads.router)
 
 
-os.makedirs("/app/uploads/logos", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="/app/uploads"), name="uploads")
+if app_settings.storage_backend == "local":
+    os.makedirs(os.path.join(app_settings.upload_dir, "logos"), exist_ok=True)
+    if app_settings.serve_uploads:
+        app.mount("/uploads", StaticFiles(directory=app_settings.upload_dir), name="uploads")
+else:
+    # Stored /uploads/... URLs keep working: send the client to the bucket
+    @app.get("/uploads/{key:path}", include_in_schema=False)
+    async def uploaded_file(key: str):
+        return RedirectResponse(get_storage().presign_download(key), headers={"Cache-Control": "private, max-age=300"})
 
 
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    # For a scraper inside the deployment's network; nginx refuses the path too
+    host = request.client.host if request.client else ""
+    try:
+        internal = ipaddress.ip_address(host).is_private
+    except ValueError:
+        internal = False
+    if not internal:
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+    return metrics.render()
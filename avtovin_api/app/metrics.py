@@ -0,0 +1,38 @@
+"""Process-local counters exposed at /api/metrics in Prometheus text format.
+
+Each gunicorn worker keeps its own counts; the pid label keeps scrapes that
+land on different workers apart.
+"""
+
+import os
+from collections import defaultdict
+
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], int] = defaultdict(int)
+_help: dict[str, str] = {}
+
+
+def describe(metric: str, help_text: str):
+    _help[metric] = help_text
+
+
+def inc(metric: str, amount: int = 1, /, **labels: str):
+    _counters[(metric, tuple(sorted(labels.items())))] += amount
+
+
+def value(metric: str, /, **labels: str) -> int:
+    return _counters.get((metric, tuple(sorted(labels.items()))), 0)
+
+
+def render() -> str:
+    pid = str(os.getpid())
+    lines = []
+    for name in sorted({name for name, _ in _counters}):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), count in sorted(_counters.items()):
+            if metric != name:
+                continue
+            label_str = ",".join(f'{k}="{v}"' for k, v in (*labels, ("pid", pid)))
+            lines.append(f"{name}{{{label_str}}} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,104 @@
+import orjson
+from fastapi import HTTPException, Request
+
+from app.database import mark_write
+
+
+def _detail(max_bytes: int) -> str:
+    return f"Слишком большой запрос (макс. {max_bytes // (1024 * 1024)}МБ)"
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as is and the
+    # normal exception handler (inside CORS) renders the 413
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=_detail(max_bytes))
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over max_bytes without reading them into memory.
+
+    A declared Content-Length over the limit is refused before any body is
+    received; chunked bodies are counted as they arrive and the request is
+    aborted with 413 as soon as the running total passes the limit.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge(self.max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = orjson.dumps({"detail": _detail(self.max_bytes)})
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class ReadYourWritesMiddleware:
+    """After a successful write, keep the caller's reads on the primary.
+
+    get_read_db routes read from the replica, which lags the primary a little;
+    a user who just created a visit and reloads the list must still see it.
+    Any non-GET request answered below 400 pins the token's user to the
+    primary for settings.read_your_writes_seconds (see app/database.py).
+    """
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def tracking_send(message):
+            # Pin before the client can see the response and issue its next read
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await mark_write(Request(scope))
+            await send(message)
+
+        await self.app(scope, receive, tracking_send)
@@ -0,0 +1,43 @@
+import os
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database import engine
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), "..")
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    cfg = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return cfg
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+async def current_revision(conn: AsyncConnection) -> str | None:
+    has_table = (await conn.execute(text("SELECT to_regclass('alembic_version') IS NOT NULL"))).scalar()
+    if not has_table:
+        return None
+    return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+
+
+async def verify_schema_revision():
+    """Fail fast when the database is not at the revision this build expects.
+
+    API processes never migrate; the one-shot `python migrate.py` job does.
+    """
+    expected = head_revision()
+    async with engine.connect() as conn:
+        current = await current_revision(conn)
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, expected {expected}. "
+            "Run `python migrate.py` before starting the API."
+        )
@@ -5,13 +5,13 @@ from app.models.car_catalog import CarBrand, CarModel, CarGeneration
 from app.models.service import Service
 from app.models.service_center import ServiceCenter, ServiceCenterAddress, ServiceCenterService
 from app.models.visit import Visit, VisitService
-from app.models.otp import OtpCode
 from app.models.banner import Banner
-from app.models.warranty import Warranty
+from app.models.warranty import Warranty, CarWarrantyStatus
 from app.models.app_settings import AppSettings
 from app.models.balance import BalanceTransaction
 from app.models.settlement import Settlement
 from app.models.landing_partner import LandingPartner
+from app.models.archive import ArchivedVisit, ArchivedBalanceTransaction
 
 __all__ = [
     "Base",
@@ -20,6 +20,7 @@ __all__ = [
     "Service",
     "ServiceCenter", "ServiceCenterAddress", "ServiceCenterService",
     "Visit", "VisitService",
-    "OtpCode", "Banner", "Warranty", "AppSettings",
+    "Banner", "Warranty", "CarWarrantyStatus", "AppSettings",
     "BalanceTransaction", "Settlement", "LandingPartner",
+    "ArchivedVisit", "ArchivedBalanceTransaction",
 ]
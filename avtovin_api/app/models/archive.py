@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, String, Integer, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base
+
+
+class ArchivedVisit(Base):
+    """A visit from a closed month, moved out of visits by services/archive_service.py.
+
+    Same columns as Visit, with its visit_services rows inlined as JSON (kept
+    compressed by Postgres) instead of a separate table and index.
+    """
+
+    __tablename__ = "visits_archive"
+    __table_args__ = (
+        Index("ix_visits_archive_car_id_created_at", "car_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    car_id: Mapped[str] = mapped_column(String, ForeignKey("cars.id", ondelete="CASCADE"))
+    service_center_id: Mapped[str] = mapped_column(String, ForeignKey("service_centers.id"))
+    description: Mapped[str] = mapped_column(String)
+    cost: Mapped[int] = mapped_column(Integer)
+    mileage: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cashback: Mapped[int] = mapped_column(Integer)
+    cashback_used: Mapped[int] = mapped_column(Integer)
+    service_fee: Mapped[int] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    services: Mapped[list] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), default=list)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    car = relationship("Car")
+    service_center = relationship("ServiceCenter")
+
+
+class ArchivedBalanceTransaction(Base):
+    __tablename__ = "balance_transactions_archive"
+    __table_args__ = (
+        Index("ix_balance_transactions_archive_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"))
+    amount: Mapped[int] = mapped_column(Integer)
+    type: Mapped[str] = mapped_column(String)
+    description: Mapped[str] = mapped_column(String)
+    visit_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
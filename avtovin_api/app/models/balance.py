@@ -1,22 +1,30 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
 
 
 class BalanceTransaction(Base):
+    """Range-partitioned by month on created_at in Postgres, like visits (see Visit)."""
+
     __tablename__ = "balance_transactions"
+    __table_args__ = (
+        Index("ix_balance_transactions_user_id_created_at", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid4()))
     user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"))
     amount: Mapped[int] = mapped_column(Integer)  # + earn, - spend
-    type: Mapped[str] = mapped_column(String)  # CASHBACK_EARN | CASHBACK_SPEND
+    type: Mapped[str] = mapped_column(String)  # CASHBACK_EARN | CASHBACK_SPEND | ADJUSTMENT
     description: Mapped[str] = mapped_column(String)
-    visit_id: Mapped[str | None] = mapped_column(String, ForeignKey("visits.id"), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    visit_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, server_default=func.now())
+
+    __mapper_args__ = {"primary_key": [id]}
 
     user = relationship("User", back_populates="balance_transactions")
-    visit = relationship("Visit", back_populates="balance_transactions")
+    visit = relationship("Visit", back_populates="balance_transactions", primaryjoin="foreign(BalanceTransaction.visit_id) == Visit.id")
@@ -1,18 +0,0 @@
-from datetime import datetime
-from uuid import uuid4
-
-from sqlalchemy import String, DateTime, Boolean, func
-from sqlalchemy.orm import Mapped, mapped_column
-
-from app.models.base import Base
-
-
-class OtpCode(Base):
-    __tablename__ = "otp_codes"
-
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid4()))
-    phone: Mapped[str] = mapped_column(String, index=True)
-    code: Mapped[str] = mapped_column(String)
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
-    verified: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
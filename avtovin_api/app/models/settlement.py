@@ -18,7 +18,7 @@ class Settlement(Base):
     total_cashback_redeemed: Mapped[int] = mapped_column(Integer)
     net_amount: Mapped[int] = mapped_column(Integer)
     is_paid: Mapped[bool] = mapped_column(Boolean, default=False)
-    receipt_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    receipt_key: Mapped[str | None] = mapped_column(String, nullable=True)  # storage key, see receipt_service
     receipt_status: Mapped[str] = mapped_column(String, default="NONE")  # NONE, PENDING, APPROVED, REJECTED
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
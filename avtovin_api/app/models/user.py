@@ -19,7 +19,12 @@ class User(Base):
     fcm_token: Mapped[str | None] = mapped_column(String, nullable=True)
     salon_name: Mapped[str | None] = mapped_column(String, nullable=True)
     city: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Ledger counters, moved only by ledger_service.post() together with a balance_transactions row
     balance: Mapped[int] = mapped_column(Integer, default=0)
+    total_earned: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total_spent: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Warranty managers: active warranties they created, kept by services/warranty_status.py
+    active_warranties: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -1,14 +1,28 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
 
 
 class Visit(Base):
+    """Range-partitioned by month on created_at in Postgres (services/partition_service.py).
+
+    The table key is (id, created_at), as Postgres requires the partition key
+    in it; the ORM still identifies a visit by id alone. Rows referencing a
+    visit (visit_services, balance_transactions) cannot have a foreign key to
+    a partitioned table without carrying created_at, so those links are
+    enforced by the ORM relationships.
+    """
+
     __tablename__ = "visits"
+    __table_args__ = (
+        Index("ix_visits_service_center_id_created_at", "service_center_id", "created_at"),
+        Index("ix_visits_car_id_created_at", "car_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid4()))
     car_id: Mapped[str] = mapped_column(String, ForeignKey("cars.id", ondelete="CASCADE"))
@@ -20,23 +34,31 @@ class Visit(Base):
     cashback_used: Mapped[int] = mapped_column(Integer, default=0)
     service_fee: Mapped[int] = mapped_column(Integer, default=0)
     status: Mapped[str] = mapped_column(String, default="COMPLETED")
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, server_default=func.now())
+
+    __mapper_args__ = {"primary_key": [id]}
 
     car = relationship("Car", back_populates="visits")
     service_center = relationship("ServiceCenter", back_populates="visits")
-    services = relationship("VisitService", back_populates="visit", cascade="all, delete-orphan")
-    balance_transactions = relationship("BalanceTransaction", back_populates="visit")
+    services = relationship(
+        "VisitService", back_populates="visit", cascade="all, delete-orphan",
+        primaryjoin="Visit.id == foreign(VisitService.visit_id)",
+    )
+    balance_transactions = relationship(
+        "BalanceTransaction", back_populates="visit",
+        primaryjoin="Visit.id == foreign(BalanceTransaction.visit_id)",
+    )
 
 
 class VisitService(Base):
     __tablename__ = "visit_services"
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid4()))
-    visit_id: Mapped[str] = mapped_column(String, ForeignKey("visits.id", ondelete="CASCADE"))
+    visit_id: Mapped[str] = mapped_column(String, index=True)
     service_name: Mapped[str] = mapped_column(String)
     price: Mapped[int] = mapped_column(Integer)
     commission: Mapped[int] = mapped_column(Integer)
     cashback: Mapped[int] = mapped_column(Integer)
     details: Mapped[str | None] = mapped_column(String, nullable=True)
 
-    visit = relationship("Visit", back_populates="services")
+    visit = relationship("Visit", back_populates="services", primaryjoin="foreign(VisitService.visit_id) == Visit.id")
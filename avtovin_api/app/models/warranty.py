@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -9,6 +9,13 @@ from app.models.base import Base
 
 class Warranty(Base):
     __tablename__ = "warranties"
+    __table_args__ = (
+        # Active warranties by end date: the expiry sweep and the expiring-soon reminders
+        Index(
+            "ix_warranties_active_end_date", "end_date",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid4()))
     contract_number: Mapped[str] = mapped_column(String, unique=True)
@@ -21,13 +28,34 @@ class Warranty(Base):
     year: Mapped[int] = mapped_column(Integer)
     start_date: Mapped[datetime] = mapped_column(DateTime)
     end_date: Mapped[datetime] = mapped_column(DateTime)
+    # Cleared by the worker's expiry sweep once end_date has passed; readers filter on it alone
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     status: Mapped[str] = mapped_column(String, default="pending")  # pending | approved | rejected
     doc_urls: Mapped[str | None] = mapped_column(String, nullable=True)
-    created_by_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
+    expiry_notified_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Set when the sweep (not a manager) cleared is_active; a later end_date revives it
+    expired_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_by_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="warranties", foreign_keys=[user_id])
     car = relationship("Car", back_populates="warranties")
     created_by = relationship("User", back_populates="created_warranties", foreign_keys=[created_by_id])
+
+
+class CarWarrantyStatus(Base):
+    """One row per car with an active warranty, kept by services/warranty_status.py.
+
+    active_until is the latest end_date among the car's active warranties.
+    The visits warranty filter semi/anti-joins this table on its primary key
+    instead of scanning warranties.
+    """
+
+    __tablename__ = "car_warranty_status"
+    __table_args__ = (
+        Index("ix_car_warranty_status_active_until", "active_until"),
+    )
+
+    car_id: Mapped[str] = mapped_column(String, ForeignKey("cars.id", ondelete="CASCADE"), primary_key=True)
+    active_until: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,104 @@
+import time
+
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.otp_service import normalize_phone
+
+# Token bucket stored in one Redis hash per key. Tokens refill continuously at
+# capacity/window per second, which gives sliding-window behaviour without
+# keeping a timestamp per request. Returns {allowed, retry_after_seconds}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, retry_after}
+"""
+
+
+def client_ip(request: Request) -> str:
+    # uvicorn rewrites request.client from X-Forwarded-For, but only for peers in
+    # forwarded_allow_ips (gunicorn.conf.py); nginx overwrites the header
+    return request.client.host if request.client else "unknown"
+
+
+def token_subject(request: Request) -> str | None:
+    """User id from the bearer token, without a DB lookup."""
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(auth[7:], settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+async def take_token(redis, key: str, times: int, seconds: int) -> tuple[bool, int]:
+    allowed, retry_after = await redis.eval(
+        TOKEN_BUCKET_LUA, 1, key, times, times / seconds, time.time(),
+    )
+    return bool(allowed), int(retry_after)
+
+
+class RateLimit:
+    """Dependency allowing `times` requests per `seconds` for each key.
+
+    key="ip" limits by client address, "user" by JWT subject (falling back to the
+    address for anonymous calls), "phone" by the `phone` field of the JSON body,
+    normalized so that spellings of one number share a bucket.
+    Add it to a route's `dependencies` so it runs before the DB session is used.
+    Redis errors fail open: a cache outage must not lock everyone out of login.
+    """
+
+    def __init__(self, scope: str, times: int, seconds: int, key: str = "ip"):
+        self.scope = scope
+        self.times = times
+        self.seconds = seconds
+        self.key = key
+
+    async def _identity(self, request: Request) -> str | None:
+        if self.key == "phone":
+            try:
+                body = await request.json()
+            except ValueError:
+                return None
+            phone = body.get("phone") if isinstance(body, dict) else None
+            return normalize_phone(phone) if isinstance(phone, str) and phone.strip() else None
+        if self.key == "user":
+            return token_subject(request) or client_ip(request)
+        return client_ip(request)
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limit_enabled:
+            return
+        identity = await self._identity(request)
+        if identity is None:
+            return
+        key = f"rl:{self.scope}:{self.key}:{identity}"
+        try:
+            allowed, retry_after = await take_token(request.app.state.redis, key, self.times, self.seconds)
+        except RedisError:
+            return
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много запросов. Попробуйте позже",
+                headers={"Retry-After": str(max(retry_after, 1))},
+            )
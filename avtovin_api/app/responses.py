@@ -0,0 +1,39 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.config import settings
+
+# OPT_UTC_Z writes UTC datetimes with "Z", as pydantic's JSON mode does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def to_jsonable(content: Any) -> Any:
+    if isinstance(content, BaseModel):
+        return content.model_dump(by_alias=True)
+    if isinstance(content, (list, tuple)):
+        return [to_jsonable(item) for item in content]
+    if isinstance(content, dict):
+        return {key: to_jsonable(value) for key, value in content.items()}
+    return content
+
+
+class ModelResponse(ORJSONResponse):
+    """ORJSON response that takes already-built CamelModel objects as content.
+
+    Returning a Response from a route makes FastAPI skip its response_model pass,
+    so models built in the router are not validated a second time. Keep
+    response_model on the decorator — it is still used for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(to_jsonable(content), option=ORJSON_OPTIONS)
+
+
+def prevalidated(content: Any, status_code: int = 200) -> Any:
+    """Wrap router output built from schema objects (see settings.fast_responses)."""
+    if not settings.fast_responses:
+        return content
+    return ModelResponse(content, status_code=status_code)
@@ -1,32 +1,40 @@
-from datetime import datetime, timedelta, timezone
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, delete
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
-from app.models.otp import OtpCode
 from app.models.user import User
+from app.rate_limit import RateLimit
 from app.schemas.auth import (
     SendCodeRequest, SendCodeResponse,
     VerifyCodeRequest, VerifyCodeResponse, UserBrief,
     AdminLoginRequest, AdminLoginResponse, AdminUserBrief,
 )
-from app.services.auth_service import (
-    generate_otp, create_token, verify_password, hash_password,
-    TEST_PHONE,
-)
+from app.services.auth_service import create_token, password_needs_rehash, TEST_PHONE
+from app.services.password_service import verify_password, hash_password
+from app.services.otp_service import store_code, check_code
 from app.services.sms_service import send_verification, check_verification
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# Each send-code may cost a paid SMS; each verify-code is a guess at a 6-digit code
+send_code_limits = [
+    Depends(RateLimit("send-code", times=20, seconds=3600, key="ip")),
+    Depends(RateLimit("send-code", times=5, seconds=3600, key="phone")),
+]
+verify_code_limits = [
+    Depends(RateLimit("verify-code", times=30, seconds=600, key="ip")),
+    Depends(RateLimit("verify-code", times=5, seconds=600, key="phone")),
+]
+login_limits = [Depends(RateLimit("login", times=10, seconds=60, key="ip"))]
+
 
-@router.post("/send-code", response_model=SendCodeResponse)
-async def send_code(body: SendCodeRequest, db: AsyncSession = Depends(get_db)):
+@router.post("/send-code", response_model=SendCodeResponse, dependencies=send_code_limits)
+async def send_code(body: SendCodeRequest, request: Request, db: AsyncSession = Depends(get_db)):
     phone = body.phone
 
-    # Check if test account — keep hardcoded "0000" for testing
+    # Check if test account — keep hardcoded "000000" for testing
     is_test = phone == TEST_PHONE
     if not is_test:
         result = await db.execute(select(User).where(User.phone == phone, User.role == "SC_MANAGER"))
@@ -34,16 +42,9 @@ async def send_code(body: SendCodeRequest, db: AsyncSession = Depends(get_db)):
             is_test = True
 
     if is_test:
-        # Test accounts: save OTP "000000" locally, don't call Twilio
-        await db.execute(delete(OtpCode).where(OtpCode.phone == phone))
-        otp = OtpCode(
-            phone=phone,
-            code="000000",
-            expires_at=datetime.utcnow() + timedelta(minutes=5),
-        )
-        db.add(otp)
-        await db.commit()
-        return SendCodeResponse(message="Код отправлен", expires_in=300)
+        # Test accounts: keep OTP "000000" in Redis (expires by TTL), don't call Twilio
+        expires_in = await store_code(request.app.state.redis, phone, "000000")
+        return SendCodeResponse(message="Код отправлен", expires_in=expires_in)
 
     # Production: send via Twilio Verify SMS
     success = send_verification(phone, channel="sms")
@@ -53,12 +54,12 @@ async def send_code(body: SendCodeRequest, db: AsyncSession = Depends(get_db)):
     return SendCodeResponse(message="Код отправлен", expires_in=300)
 
 
-@router.post("/verify-code", response_model=VerifyCodeResponse)
-async def verify_code(body: VerifyCodeRequest, db: AsyncSession = Depends(get_db)):
+@router.post("/verify-code", response_model=VerifyCodeResponse, dependencies=verify_code_limits)
+async def verify_code(body: VerifyCodeRequest, request: Request, db: AsyncSession = Depends(get_db)):
     if not body.phone or not body.code:
         raise HTTPException(status_code=400, detail="Телефон и код обязательны")
 
-    # Check if test account — verify via local OTP table
+    # Check if test account — verify via the locally issued OTP
     is_test = body.phone == TEST_PHONE
     if not is_test:
         result = await db.execute(select(User).where(User.phone == body.phone, User.role == "SC_MANAGER"))
@@ -66,24 +67,9 @@ async def verify_code(body: VerifyCodeRequest, db: AsyncSession = Depends(get_db
             is_test = True
 
     if is_test:
-        # Test accounts: check code from local DB
-        now = datetime.utcnow()
-        result = await db.execute(
-            select(OtpCode)
-            .where(
-                OtpCode.phone == body.phone,
-                OtpCode.code == body.code,
-                OtpCode.verified == False,  # noqa: E712
-                OtpCode.expires_at > now,
-            )
-            .order_by(OtpCode.created_at.desc())
-            .limit(1)
-        )
-        otp = result.scalar_one_or_none()
-        if not otp:
+        # Test accounts: single Redis lookup; the code is consumed on success
+        if not await check_code(request.app.state.redis, body.phone, body.code):
             raise HTTPException(status_code=401, detail="Неверный или просроченный код")
-        otp.verified = True
-        await db.flush()
     else:
         # Production: verify via Twilio
         valid = check_verification(body.phone, body.code)
@@ -124,7 +110,7 @@ async def verify_code(body: VerifyCodeRequest, db: AsyncSession = Depends(get_db
     )
 
 
-@router.post("/admin-login", response_model=AdminLoginResponse)
+@router.post("/admin-login", response_model=AdminLoginResponse, dependencies=login_limits)
 async def admin_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db)):
     if not body.email or not body.password:
         raise HTTPException(status_code=400, detail="Введите email и пароль")
@@ -135,12 +121,12 @@ async def admin_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db
     if not user or user.role != "ADMIN" or not user.password:
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    if not verify_password(body.password, user.password):
+    if not await verify_password(body.password, user.password):
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    # Auto-upgrade SHA256 → bcrypt
-    if not user.password.startswith("$2"):
-        user.password = hash_password(body.password)
+    # Auto-upgrade SHA256 / outdated bcrypt cost → current bcrypt
+    if password_needs_rehash(user.password):
+        user.password = await hash_password(body.password)
         await db.commit()
 
     token = create_token(user.id, user.role)
@@ -151,7 +137,7 @@ async def admin_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db
     )
 
 
-@router.post("/warranty-login", response_model=AdminLoginResponse)
+@router.post("/warranty-login", response_model=AdminLoginResponse, dependencies=login_limits)
 async def warranty_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db)):
     if not body.email or not body.password:
         raise HTTPException(status_code=400, detail="Введите email и пароль")
@@ -162,12 +148,12 @@ async def warranty_login(body: AdminLoginRequest, db: AsyncSession = Depends(get
     if not user or user.role not in ("WARRANTY_MANAGER", "ADMIN") or not user.password:
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    if not verify_password(body.password, user.password):
+    if not await verify_password(body.password, user.password):
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    # Auto-upgrade SHA256 → bcrypt
-    if not user.password.startswith("$2"):
-        user.password = hash_password(body.password)
+    # Auto-upgrade SHA256 / outdated bcrypt cost → current bcrypt
+    if password_needs_rehash(user.password):
+        user.password = await hash_password(body.password)
         await db.commit()
 
     token = create_token(user.id, user.role)
@@ -178,7 +164,7 @@ async def warranty_login(body: AdminLoginRequest, db: AsyncSession = Depends(get
     )
 
 
-@router.post("/sc-login", response_model=AdminLoginResponse)
+@router.post("/sc-login", response_model=AdminLoginResponse, dependencies=login_limits)
 async def sc_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db)):
     if not body.email or not body.password:
         raise HTTPException(status_code=400, detail="Введите email и пароль")
@@ -189,11 +175,11 @@ async def sc_login(body: AdminLoginRequest, db: AsyncSession = Depends(get_db)):
     if not user or user.role not in ("SC_MANAGER", "ADMIN") or not user.password:
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    if not verify_password(body.password, user.password):
+    if not await verify_password(body.password, user.password):
         raise HTTPException(status_code=401, detail="Неверный email или пароль")
 
-    if not user.password.startswith("$2"):
-        user.password = hash_password(body.password)
+    if password_needs_rehash(user.password):
+        user.password = await hash_password(body.password)
         await db.commit()
 
     token = create_token(user.id, user.role)
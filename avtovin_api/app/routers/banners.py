@@ -2,26 +2,29 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import require_admin
 from app.models.banner import Banner
 from app.models.user import User
+from app.responses import prevalidated
 from app.schemas.banner import BannerOut, BannerCreate, BannerUpdate
+from app.singleflight import singleflight
 
 router = APIRouter(prefix="/api/banners", tags=["banners"])
 
 
 @router.get("", response_model=list[BannerOut])
+@singleflight("banners", redis_lock=True)
 async def list_banners(
     all: str | None = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     query = select(Banner)
     if all != "true":
         query = query.where(Banner.is_active == True)  # noqa: E712
     query = query.order_by(Banner.sort_order)
     result = await db.execute(query)
-    return [BannerOut.model_validate(b) for b in result.scalars().all()]
+    return prevalidated([BannerOut.model_validate(b) for b in result.scalars().all()])
 
 
 @router.post("", response_model=BannerOut, status_code=201)
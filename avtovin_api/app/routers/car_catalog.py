@@ -1,39 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.car_catalog import CarBrand, CarModel, CarGeneration
-from app.schemas.car import BrandOut, ModelOut, GenerationOut
+from app.database import get_read_db
+from app.rate_limit import RateLimit
+from app.responses import prevalidated
+from app.schemas.car import BrandOut, ModelOut, GenerationOut, CatalogSearchHit
+from app.services import catalog_index
+from app.singleflight import singleflight
 
-router = APIRouter(prefix="/api/car-catalog", tags=["car-catalog"])
+router = APIRouter(
+    prefix="/api/car-catalog",
+    tags=["car-catalog"],
+    dependencies=[Depends(RateLimit("catalog", times=120, seconds=60, key="ip"))],
+)
+
+# All reads are served from the worker's in-memory catalog index (loaded at
+# startup); the session is only used when the index has to be reloaded.
+# /brands coalesces within the worker only: a result shared through Redis
+# would outlive a reload on the other workers.
 
 
 @router.get("/brands", response_model=list[BrandOut])
-async def list_brands(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(CarBrand).order_by(CarBrand.name))
-    return [BrandOut.model_validate(b) for b in result.scalars().all()]
+@singleflight("catalog-brands")
+async def list_brands(db: AsyncSession = Depends(get_read_db)):
+    index = await catalog_index.get_index(db)
+    return prevalidated(index.brands)
 
 
 @router.get("/models", response_model=list[ModelOut])
 async def list_models(
     brand_id: str = Query(..., alias="brandId"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(CarModel).where(CarModel.brand_id == brand_id).order_by(CarModel.name)
-    )
-    return [ModelOut.model_validate(m) for m in result.scalars().all()]
+    index = await catalog_index.get_index(db)
+    return prevalidated(index.models_by_brand.get(brand_id, []))
 
 
 @router.get("/generations", response_model=list[GenerationOut])
 async def list_generations(
     model_id: str = Query(..., alias="modelId"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+):
+    index = await catalog_index.get_index(db)
+    return prevalidated(index.generations_by_model.get(model_id, []))
+
+
+@router.get("/search", response_model=list[CatalogSearchHit])
+async def search_catalog(
+    q: str = Query("", max_length=64),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(CarGeneration)
-        .where(CarGeneration.model_id == model_id)
-        .order_by(CarGeneration.year_from.desc())
-    )
-    return [GenerationOut.model_validate(g) for g in result.scalars().all()]
+    index = await catalog_index.get_index(db)
+    return prevalidated(index.search(q, limit))
@@ -1,30 +1,31 @@
+import math
 import re
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from datetime import datetime
-
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import get_current_user, require_sc_manager
 from app.models.car import Car
 from app.models.user import User
-from app.models.warranty import Warranty
-from app.schemas.car import CarCreate, CarUpdate, CarOut, CarByVinOut, CarOwnerBrief, VinDecodeOut
+from app.rate_limit import RateLimit
+from app.responses import prevalidated
+from app.schemas.car import CarCreate, CarUpdate, CarOut, CarByVinOut, VinDecodeOut
+from app.schemas.visit import VisitListOut
+from app.services import archive_service, scan_cache, vin_service
+from app.services.visit_service import visit_out
 
 router = APIRouter(prefix="/api/cars", tags=["cars"])
 
 VIN_REGEX = re.compile(r"^[A-HJ-NPR-Z0-9]{17}$", re.IGNORECASE)
-NHTSA_URL = "https://vpic.nhtsa.dot.gov/api/vehicles/decodevin"
 
 
 @router.get("", response_model=list[CarOut])
 async def list_cars(
     user_id: str | None = Query(None, alias="userId"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     target_user_id = user_id or current_user.id
     if target_user_id != current_user.id and current_user.role != "ADMIN":
@@ -34,12 +35,13 @@ async def list_cars(
         select(Car).where(Car.user_id == target_user_id).order_by(Car.created_at.desc())
     )
     cars = result.scalars().all()
-    return [CarOut.model_validate(c) for c in cars]
+    return prevalidated([CarOut.model_validate(c) for c in cars])
 
 
 @router.post("", response_model=CarOut, status_code=201)
 async def create_car(
     body: CarCreate,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -63,113 +65,51 @@ async def create_car(
     car = Car(**body.model_dump(), user_id=current_user.id)
     db.add(car)
     await db.commit()
+    if car.vin:
+        # The VIN lookup now finds this (newest) car
+        await scan_cache.invalidate(request.app.state.redis, vin=car.vin)
     await db.refresh(car)
     return CarOut.model_validate(car)
 
 
 @router.get("/by-vin", response_model=CarByVinOut)
 async def find_car_by_vin(
+    request: Request,
     vin: str = Query(..., min_length=11),
     _user: User = Depends(require_sc_manager),
+    # Primary, not the replica: a miss is loaded into the scan cache
     db: AsyncSession = Depends(get_db),
 ):
     """Look up existing car by VIN (for SC admin quick-create flow)."""
-    vin_upper = vin.upper().strip()
-    result = await db.execute(
-        select(Car).where(Car.vin == vin_upper).order_by(Car.created_at.desc()).limit(1)
-    )
-    car = result.scalar_one_or_none()
+    car = await scan_cache.car_by_vin(request.app.state.redis, db, vin)
     if not car:
         raise HTTPException(status_code=404, detail="Авто с таким VIN не найдено")
+    return car
 
-    owner_result = await db.execute(select(User).where(User.id == car.user_id))
-    owner = owner_result.scalar_one_or_none()
-    if not owner:
-        raise HTTPException(status_code=404, detail="Владелец не найден")
-
-    now = datetime.utcnow()
-    warr_result = await db.execute(
-        select(Warranty).where(
-            Warranty.car_id == car.id,
-            Warranty.is_active == True,  # noqa: E712
-            Warranty.end_date >= now,
-        ).limit(1)
-    )
-    has_warranty = warr_result.scalar_one_or_none() is not None
-
-    return CarByVinOut(
-        id=car.id, vin=car.vin, brand=car.brand, model=car.model, year=car.year,
-        plate_number=car.plate_number, mileage=car.mileage,
-        has_active_warranty=has_warranty,
-        owner=CarOwnerBrief(id=owner.id, phone=owner.phone, name=owner.name),
-    )
 
-
-@router.get("/decode-vin/{vin}", response_model=VinDecodeOut)
+@router.get(
+    "/decode-vin/{vin}",
+    response_model=VinDecodeOut,
+    dependencies=[Depends(RateLimit("decode-vin", times=30, seconds=60, key="user"))],
+)
 async def decode_vin(vin: str, request: Request):
     if not VIN_REGEX.match(vin):
         raise HTTPException(status_code=400, detail="Неверный формат VIN (17 символов)")
 
-    # Check Redis cache
-    redis = request.app.state.redis
-    cache_key = f"vin:{vin.upper()}"
-    cached = await redis.get(cache_key)
-    if cached:
-        import json
-        return VinDecodeOut(**json.loads(cached))
-
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(f"{NHTSA_URL}/{vin}", params={"format": "json"})
-            data = resp.json()
-    except Exception:
-        raise HTTPException(status_code=500, detail="Ошибка декодирования VIN")
-
-    results = data.get("Results", [])
-    if not results:
+        result = await vin_service.decode(request.app.state.redis, vin)
+    except vin_service.VinUpstreamError:
+        raise HTTPException(status_code=503, detail="Сервис декодирования VIN временно недоступен")
+    if result is None:
         raise HTTPException(status_code=404, detail="VIN не найден")
-
-    values = {r["Variable"]: r["Value"] for r in results if r.get("Value") and r["Value"].strip()}
-
-    brand = values.get("Make")
-    model = values.get("Model")
-    year_str = values.get("Model Year")
-    year = int(year_str) if year_str and year_str.isdigit() else None
-
-    elec = (values.get("ElectrificationLevel") or "").lower()
-    fuel = (values.get("FuelTypePrimary") or "").lower()
-    if "bev" in elec or "electric" in fuel:
-        engine_type = "ELECTRIC"
-    elif "hybrid" in elec or "hybrid" in fuel:
-        engine_type = "HYBRID"
-    else:
-        engine_type = "ICE"
-
-    if not brand and not model:
-        raise HTTPException(status_code=404, detail="VIN не найден")
-
-    result = VinDecodeOut(
-        vin=vin.upper(),
-        brand=brand,
-        model=model,
-        year=year,
-        engine_type=engine_type,
-        fuel_type=values.get("FuelTypePrimary"),
-        vehicle_type=values.get("BodyClass"),
-        manufacturer=values.get("Manufacturer"),
-    )
-
-    # Cache for 24 hours
-    import json
-    await redis.setex(cache_key, 86400, json.dumps(result.model_dump(by_alias=True)))
-
-    return result
+    return prevalidated(result)
 
 
 @router.put("/{car_id}", response_model=CarOut)
 async def update_car(
     car_id: str,
     body: CarUpdate,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -186,6 +126,7 @@ async def update_car(
         setattr(car, field, value)
 
     await db.commit()
+    await scan_cache.invalidate(request.app.state.redis, car.id)
     await db.refresh(car)
     return CarOut.model_validate(car)
 
@@ -194,7 +135,7 @@ async def update_car(
 async def get_car(
     car_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(select(Car).where(Car.id == car_id))
     car = result.scalar_one_or_none()
@@ -203,9 +144,37 @@ async def get_car(
     return CarOut.model_validate(car)
 
 
+@router.get("/{car_id}/visits", response_model=VisitListOut)
+async def list_car_visits(
+    car_id: str,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Full visit history of a car, newest first, including archived months."""
+    result = await db.execute(select(Car.user_id).where(Car.id == car_id))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Автомобиль не найден")
+    if current_user.role == "USER" and owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+
+    visits, total = await archive_service.car_visits_page(
+        db, lambda model: [model.car_id == car_id], (page - 1) * limit, limit,
+    )
+    return prevalidated(VisitListOut(
+        visits=[visit_out(v) for v in visits],
+        total=total,
+        page=page,
+        total_pages=math.ceil(total / limit) if total else 1,
+    ))
+
+
 @router.delete("/{car_id}")
 async def delete_car(
     car_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -219,4 +188,5 @@ async def delete_car(
 
     await db.delete(car)
     await db.commit()
+    await scan_cache.invalidate(request.app.state.redis, car_id)
     return {"message": "Автомобиль удалён"}
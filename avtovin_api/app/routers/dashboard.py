@@ -1,20 +1,22 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_read_db
 from app.dependencies import require_admin
 from app.models.car import Car
 from app.models.service_center import ServiceCenter
 from app.models.settlement import Settlement
 from app.models.user import User
 from app.models.visit import Visit
+from app.responses import prevalidated
 from app.schemas.dashboard import DashboardOut, PartnersOut, UnpaidOut
 from app.schemas.visit import (
     VisitOut, VisitServiceOut,
     CarBriefForVisit, UserBriefForVisit, ScBriefForVisit,
 )
+from app.services import archive_service, ledger_service
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -22,7 +24,7 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 @router.get("/stats", response_model=DashboardOut)
 async def get_stats(
     _user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     total_users = (await db.execute(
         select(func.count(User.id)).where(User.role == "USER")
@@ -48,15 +50,8 @@ async def get_stats(
         )
     )).scalar() or 0
 
-    total_visits = (await db.execute(select(func.count(Visit.id)))).scalar() or 0
-
-    total_revenue = (await db.execute(
-        select(func.coalesce(func.sum(Visit.service_fee), 0))
-    )).scalar() or 0
-
-    total_cashback = (await db.execute(
-        select(func.coalesce(func.sum(Visit.cashback), 0))
-    )).scalar() or 0
+    # All-time figures: archived months count too
+    total_visits, total_revenue, total_cashback = await archive_service.visit_totals(db)
 
     total_balance = (await db.execute(
         select(func.coalesce(func.sum(User.balance), 0))
@@ -105,7 +100,7 @@ async def get_stats(
             service_center=sc_brief,
         ))
 
-    return DashboardOut(
+    return prevalidated(DashboardOut(
         total_users=total_users,
         total_cars=total_cars,
         partners=PartnersOut(
@@ -118,4 +113,16 @@ async def get_stats(
         total_cashback_balance=total_balance,
         unpaid_settlements=UnpaidOut(count=unpaid_count, amount=unpaid_amount),
         recent_visits=recent_out,
-    )
+    ))
+
+
+@router.get("/ledger-drift")
+async def get_ledger_drift(
+    request: Request,
+    _user: User = Depends(require_admin),
+):
+    """Result of the last ledger reconciliation run by the worker."""
+    report = await ledger_service.get_drift_report(request.app.state.redis)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Сверка баланса ещё не выполнялась")
+    return report
@@ -10,9 +10,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database import get_db
 from app.dependencies import get_current_user, require_sc_manager
-from app.models.car import Car
 from app.models.service_center import ServiceCenter
 from app.models.user import User
+from app.services import scan_cache
 from app.services.event_service import publish_event, subscribe_events
 
 router = APIRouter(prefix="/api/events", tags=["events"])
@@ -34,9 +34,12 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     await websocket.accept()
     redis = websocket.app.state.redis
     pubsub = await subscribe_events(redis, user_id)
+    # Client frames are ignored, but reading them is how a disconnect — including the
+    # 1012 close sent while a worker drains on shutdown — reaches this loop
+    disconnected = asyncio.create_task(_wait_disconnect(websocket))
 
     try:
-        while True:
+        while not disconnected.done():
             message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
             if message and message["type"] == "message":
                 data = message["data"]
@@ -48,10 +51,18 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     except WebSocketDisconnect:
         pass
     finally:
+        disconnected.cancel()
         await pubsub.unsubscribe(f"events:{user_id}")
         await pubsub.close()
 
 
+async def _wait_disconnect(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
 class NotifyRequest(BaseModel):
     carId: str
 
@@ -63,26 +74,19 @@ async def notify_scan(
     current_user: User = Depends(require_sc_manager),
     db: AsyncSession = Depends(get_db),
 ):
-    # Find car and owner
-    result = await db.execute(select(Car).where(Car.id == body.carId))
-    car = result.scalar_one_or_none()
+    redis = request.app.state.redis
+    # Find car and owner (cached by the by-vin lookup that preceded the scan)
+    car = await scan_cache.car_by_id(redis, db, body.carId)
     if not car:
         raise HTTPException(status_code=404, detail="Авто не найдено")
 
     # Find SC name
-    sc_name = "Сервисный центр"
-    if current_user.service_center:
-        sc_name = current_user.service_center.name
-    else:
-        result = await db.execute(
-            select(ServiceCenter).where(ServiceCenter.manager_id == current_user.id)
-        )
-        sc = result.scalar_one_or_none()
-        if sc:
-            sc_name = sc.name
+    result = await db.execute(
+        select(ServiceCenter.name).where(ServiceCenter.manager_id == current_user.id)
+    )
+    sc_name = result.scalar_one_or_none() or "Сервисный центр"
 
-    redis = request.app.state.redis
-    await publish_event(redis, car.user_id, "scan:started", {
+    await publish_event(redis, car.owner.id, "scan:started", {
         "carId": car.id,
         "carName": f"{car.brand} {car.model}",
         "serviceCenterName": sc_name,
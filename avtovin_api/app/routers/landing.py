@@ -1,17 +1,18 @@
-import os
-import uuid
-
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from pydantic import BaseModel
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.landing_partner import LandingPartner
 from app.dependencies import require_admin
+from app.rate_limit import RateLimit
+from app.services.image_service import save_image
 
 router = APIRouter(prefix="/api/landing", tags=["landing"])
 
+public_limits = [Depends(RateLimit("landing", times=120, seconds=60, key="ip"))]
+
 
 # ── Schemas ──────────────────────────────────────────────
 
@@ -41,8 +42,8 @@ class PartnerUpdate(BaseModel):
 
 # ── Public endpoints (no auth) ───────────────────────────
 
-@router.get("/cities")
-async def get_landing_cities(db: AsyncSession = Depends(get_db)):
+@router.get("/cities", dependencies=public_limits)
+async def get_landing_cities(db: AsyncSession = Depends(get_read_db)):
     """Public: get unique cities from active landing partners."""
     result = await db.execute(
         select(LandingPartner.city, func.count(LandingPartner.id).label("count"))
@@ -54,10 +55,10 @@ async def get_landing_cities(db: AsyncSession = Depends(get_db)):
     return [{"name": row.city, "count": row.count} for row in rows]
 
 
-@router.get("/partners")
+@router.get("/partners", dependencies=public_limits)
 async def get_landing_partners(
     city: str | None = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Public: get active partners for landing page, optionally filtered by city."""
     q = (
@@ -77,7 +78,7 @@ async def get_landing_partners(
 @router.get("/admin/partners")
 async def admin_list_partners(
     admin=Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Admin: list ALL partners (including inactive)."""
     result = await db.execute(
@@ -138,7 +139,7 @@ async def admin_delete_partner(
     return {"ok": True}
 
 
-UPLOAD_DIR = "/app/uploads/logos"
+MAX_LOGO_SIZE = 5 * 1024 * 1024  # 5MB
 
 
 @router.post("/admin/upload-logo")
@@ -146,15 +147,9 @@ async def upload_logo(
     file: UploadFile = File(...),
     admin=Depends(require_admin),
 ):
-    """Admin: upload a partner logo, returns the public URL."""
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(file.filename or "logo.png")[1] or ".png"
-    filename = f"{uuid.uuid4().hex}{ext}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
-    return {"url": f"/uploads/logos/{filename}"}
+    """Admin: upload a partner logo, returns the public URL and its resized variants."""
+    stored, variants = await save_image(file, "logos", MAX_LOGO_SIZE)
+    return {"url": stored.url, "variants": variants}
 
 
 # ── Helpers ──────────────────────────────────────────────
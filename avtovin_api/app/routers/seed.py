@@ -1,19 +1,29 @@
+import hashlib
 import json
 import os
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.dependencies import require_admin
 from app.models.app_settings import AppSettings
-from app.models.car_catalog import CarBrand, CarModel, CarGeneration
+from app.models.banner import Banner
+from app.models.car import Car
+from app.models.car_catalog import CarBrand, CarModel
+from app.models.landing_partner import LandingPartner
 from app.models.service import Service
 from app.models.service_center import ServiceCenter, ServiceCenterAddress, ServiceCenterService
 from app.models.user import User
-from app.services.auth_service import hash_password
+from app.services import catalog_index, image_service
+from app.services.catalog_sync import sync_catalog
+from app.services.password_service import hash_password
 
 CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "car_catalog.json")
+# Bundled logos, copied into the uploads volume by entrypoint.sh
+BRAND_LOGOS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "static", "brand-logos")
+BRAND_LOGOS_URL = "/uploads/brand-logos/"
 
 router = APIRouter(prefix="/api", tags=["seed"])
 
@@ -28,7 +38,7 @@ async def seed_data(db: AsyncSession = Depends(get_db)):
     # Admin
     admin = User(
         phone="+77777777777", email="admin@silkroadauto.kz", name="Админ",
-        password=hash_password("admin123"), role="ADMIN",
+        password=await hash_password("admin123"), role="ADMIN",
     )
     db.add(admin)
 
@@ -120,51 +130,62 @@ async def seed_data(db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/seed-catalog")
-async def seed_catalog(db: AsyncSession = Depends(get_db)):
-    count = (await db.execute(select(func.count(CarBrand.id)))).scalar()
-    if count and count > 0:
-        return {"message": "Catalog already seeded", "brands": count}
-
-    return await _do_seed_catalog(db)
+async def seed_catalog(request: Request, db: AsyncSession = Depends(get_db)):
+    """Add catalog brands/models missing from the DB; existing rows are kept."""
+    return await _sync_catalog(request, db, prune=False)
 
 
 @router.post("/reseed-catalog")
-async def reseed_catalog(db: AsyncSession = Depends(get_db)):
-    """Drop all catalog data and re-seed with full database."""
-    await db.execute(select(CarGeneration).execution_options(synchronize_session="fetch"))
-    await db.execute(CarGeneration.__table__.delete())
-    await db.execute(CarModel.__table__.delete())
-    await db.execute(CarBrand.__table__.delete())
-    await db.commit()
-    return await _do_seed_catalog(db)
+async def reseed_catalog(request: Request, db: AsyncSession = Depends(get_db)):
+    """Sync the DB with data/car_catalog.json, also removing brands/models no longer in it.
+
+    Matching is by name, so ids stay stable; models with generations are never removed.
+    """
+    return await _sync_catalog(request, db, prune=True)
+
+
+@router.post("/seed-image-variants")
+async def seed_image_variants(
+    _user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """Generate WebP/AVIF variants for images uploaded before the image pipeline existed."""
+    urls = []
+    for column in (Banner.image_url, Car.photo_url, CarBrand.logo_url, ServiceCenter.logo_url, LandingPartner.logo_url):
+        urls += (await db.execute(select(column).where(column.isnot(None)).distinct())).scalars().all()
+    return await image_service.backfill(urls)
 
 
 def _load_catalog_from_file() -> dict:
     """Load brand -> (logo_url, [models]) catalog from data/car_catalog.json."""
     with open(CATALOG_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
-    return {name: (v.get("icon"), v.get("models", [])) for name, v in data.items()}
-
+    return {name: (_versioned_logo(v.get("icon")), v.get("models", [])) for name, v in data.items()}
 
-async def _do_seed_catalog(db: AsyncSession):
-    catalog = _load_catalog_from_file()
-    brand_count = 0
-    model_count = 0
 
-    for brand_name, (logo_url, model_names) in catalog.items():
-        brand = CarBrand(name=brand_name, logo_url=logo_url)
-        db.add(brand)
-        await db.flush()
-        brand_count += 1
+def _versioned_logo(url: str | None) -> str | None:
+    """Add the file's content hash (?v=) so the URL can be cached as immutable."""
+    if not url or not url.startswith(BRAND_LOGOS_URL):
+        return url
+    try:
+        with open(os.path.join(BRAND_LOGOS_DIR, url[len(BRAND_LOGOS_URL):]), "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        return url
+    return f"{url}?v={digest}"
 
-        for model_name in model_names:
-            car_model = CarModel(name=model_name, brand_id=brand.id)
-            db.add(car_model)
-            model_count += 1
 
+async def _sync_catalog(request: Request, db: AsyncSession, prune: bool):
+    changes = await sync_catalog(db, _load_catalog_from_file(), prune=prune)
     await db.commit()
+    if any(changes.values()):
+        await catalog_index.publish_reload(request.app.state.redis)
+
+    brand_count = (await db.execute(select(func.count(CarBrand.id)))).scalar()
+    model_count = (await db.execute(select(func.count(CarModel.id)))).scalar()
     return {
-        "message": "Catalog seeded",
+        "message": "Catalog synced",
         "brands": brand_count,
         "models": model_count,
+        **changes,
     }
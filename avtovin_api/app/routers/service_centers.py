@@ -5,19 +5,22 @@ from sqlalchemy import select, delete, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import get_current_user, require_admin, require_sc_manager
 from app.models.service import Service
 from app.models.service_center import ServiceCenter, ServiceCenterAddress, ServiceCenterService
 from app.models.settlement import Settlement
 from app.models.user import User
 from app.models.visit import Visit
+from app.rate_limit import RateLimit
+from app.responses import prevalidated
 from app.schemas.service_center import (
     ServiceCenterOut, ServiceCenterCreate, ServiceCenterUpdate,
     AddressOut, ScServiceOut, ScDashboardOut, ScStatsOut,
     FinancesOut, MonthDataOut, FinanceVisitOut, SettlementBriefOut,
     UploadReceiptRequest, ManagerBrief, ServiceBrief, ScServiceDetail, ScCountOut,
 )
+from app.services.receipt_service import InvalidReceipt, store_receipt_base64
 
 router = APIRouter(prefix="/api/service-centers", tags=["service-centers"])
 
@@ -56,12 +59,16 @@ MONTH_NAMES = [
 ]
 
 
-@router.get("", response_model=list[ServiceCenterOut])
+@router.get(
+    "",
+    response_model=list[ServiceCenterOut],
+    dependencies=[Depends(RateLimit("catalog", times=120, seconds=60, key="ip"))],
+)
 async def list_service_centers(
     city: str | None = None,
     search: str | None = None,
     type: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     query = select(ServiceCenter).where(ServiceCenter.is_active == True).options(  # noqa: E712
         selectinload(ServiceCenter.addresses),
@@ -91,7 +98,7 @@ async def list_service_centers(
         for sc_id, cnt in count_result.all():
             visit_counts[sc_id] = cnt
 
-    return [_sc_out(sc, visit_counts.get(sc.id, 0)) for sc in scs]
+    return prevalidated([_sc_out(sc, visit_counts.get(sc.id, 0)) for sc in scs])
 
 
 @router.post("", response_model=ServiceCenterOut, status_code=201)
@@ -147,13 +154,13 @@ async def create_service_center(
 
     await db.commit()
     await db.refresh(sc, ["addresses", "manager", "services"])
-    return _sc_out(sc, 0)
+    return prevalidated(_sc_out(sc, 0), status_code=201)
 
 
 @router.get("/my", response_model=ScDashboardOut)
 async def get_my_service_center(
     current_user: User = Depends(require_sc_manager),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(ServiceCenter)
@@ -202,7 +209,7 @@ async def get_my_service_center(
 @router.get("/my/finances", response_model=FinancesOut)
 async def get_my_finances(
     current_user: User = Depends(require_sc_manager),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(ServiceCenter).where(ServiceCenter.manager_id == current_user.id)
@@ -297,6 +304,11 @@ async def upload_receipt(
         raise HTTPException(status_code=404, detail="СЦ не найден")
     if not body.receiptBase64:
         raise HTTPException(status_code=400, detail="Прикрепите чек")
+    # Stored once even when it covers several settlements
+    try:
+        receipt_key = await store_receipt_base64(body.receiptBase64)
+    except InvalidReceipt as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if body.settlementId:
         result = await db.execute(
@@ -309,7 +321,7 @@ async def upload_receipt(
         if not settlement:
             raise HTTPException(status_code=404, detail="Расчёт не найден")
 
-        settlement.receipt_url = body.receiptBase64
+        settlement.receipt_key = receipt_key
         settlement.receipt_status = "PENDING"
         await db.commit()
         return {"success": True, "settlementId": settlement.id}
@@ -348,7 +360,7 @@ async def upload_receipt(
             total_commission=total_commission,
             total_cashback_redeemed=total_cashback,
             net_amount=total_commission,
-            receipt_url=body.receiptBase64,
+            receipt_key=receipt_key,
             receipt_status="PENDING",
         )
         db.add(new_settlement)
@@ -357,7 +369,7 @@ async def upload_receipt(
         return {"success": True, "settlementId": new_settlement.id}
 
     for s in settlements:
-        s.receipt_url = body.receiptBase64
+        s.receipt_key = receipt_key
         s.receipt_status = "PENDING"
     await db.commit()
     return {"success": True, "updatedCount": len(settlements)}
@@ -366,7 +378,7 @@ async def upload_receipt(
 @router.get("/{sc_id}", response_model=ServiceCenterOut)
 async def get_service_center(
     sc_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(ServiceCenter).where(ServiceCenter.id == sc_id)
@@ -384,7 +396,7 @@ async def get_service_center(
         select(func.count(Visit.id)).where(Visit.service_center_id == sc.id)
     )).scalar() or 0
 
-    return _sc_out(sc, cnt)
+    return prevalidated(_sc_out(sc, cnt))
 
 
 @router.put("/{sc_id}", response_model=ServiceCenterOut)
@@ -452,7 +464,7 @@ async def update_service_center(
         select(func.count(Visit.id)).where(Visit.service_center_id == sc.id)
     )).scalar() or 0
 
-    return _sc_out(sc, cnt)
+    return prevalidated(_sc_out(sc, cnt))
 
 
 @router.delete("/{sc_id}")
@@ -475,7 +487,7 @@ async def delete_service_center(
 async def get_sc_services(
     sc_id: str,
     _user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(ServiceCenterService)
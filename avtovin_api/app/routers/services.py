@@ -2,19 +2,20 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import require_admin
 from app.models.service import Service
 from app.models.user import User
+from app.responses import prevalidated
 from app.schemas.service import ServiceOut, ServiceCreate, ServiceUpdate
 
 router = APIRouter(prefix="/api/services", tags=["services"])
 
 
 @router.get("", response_model=list[ServiceOut])
-async def list_services(db: AsyncSession = Depends(get_db)):
+async def list_services(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Service).order_by(Service.name))
-    return [ServiceOut.model_validate(s) for s in result.scalars().all()]
+    return prevalidated([ServiceOut.model_validate(s) for s in result.scalars().all()])
 
 
 @router.post("", response_model=ServiceOut, status_code=201)
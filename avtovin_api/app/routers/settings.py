@@ -3,18 +3,20 @@ from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import require_admin
 from app.models.app_settings import AppSettings
 from app.models.user import User
+from app.singleflight import singleflight
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
 
 @router.get("")
+@singleflight("settings", redis_lock=True)
 async def get_settings(
     key: str = Query(""),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if not key:
         raise HTTPException(status_code=400, detail="key parameter required")
@@ -3,13 +3,15 @@ from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import require_admin
 from app.models.service_center import ServiceCenter
 from app.models.settlement import Settlement
 from app.models.user import User
 from app.models.visit import Visit
+from app.responses import prevalidated
 from app.schemas.settlement import SettlementOut, SettlementCreate, SettlementUpdate, ScBriefForSettlement
+from app.services.receipt_service import receipt_urls
 
 router = APIRouter(prefix="/api/settlements", tags=["settlements"])
 
@@ -19,6 +21,7 @@ def _settlement_out(s: Settlement) -> SettlementOut:
     if s.service_center:
         sc_brief = ScBriefForSettlement(name=s.service_center.name, type=s.service_center.type)
     out = SettlementOut.model_validate(s)
+    out.receipt_url, out.receipt_thumb_url = receipt_urls(s.receipt_key)
     out.service_center = sc_brief
     return out
 
@@ -27,7 +30,7 @@ def _settlement_out(s: Settlement) -> SettlementOut:
 async def list_settlements(
     is_paid: str | None = Query(None, alias="isPaid"),
     _user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     query = select(Settlement).options(
         selectinload(Settlement.service_center)
@@ -38,7 +41,7 @@ async def list_settlements(
         query = query.where(Settlement.is_paid == False)  # noqa: E712
 
     result = await db.execute(query)
-    return [_settlement_out(s) for s in result.scalars().all()]
+    return prevalidated([_settlement_out(s) for s in result.scalars().all()])
 
 
 @router.post("", status_code=201)
@@ -98,7 +101,7 @@ async def create_settlements(
 async def get_settlement(
     settlement_id: str,
     _user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(Settlement).where(Settlement.id == settlement_id)
@@ -107,7 +110,7 @@ async def get_settlement(
     settlement = result.scalar_one_or_none()
     if not settlement:
         raise HTTPException(status_code=404, detail="Не найдено")
-    return _settlement_out(settlement)
+    return prevalidated(_settlement_out(settlement))
 
 
 @router.put("/{settlement_id}", response_model=SettlementOut)
@@ -0,0 +1,127 @@
+import os
+import uuid
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import RedirectResponse
+
+from app.dependencies import get_current_user
+from app.models.user import User
+from app.routers.landing import MAX_LOGO_SIZE
+from app.routers.warranties import ALLOWED_EXTENSIONS, MAX_FILE_SIZE, UPLOAD_SUBDIR
+from app.schemas.upload import PresignUploadRequest, PresignUploadOut, DownloadUrlOut, ImageUploadOut
+from app.services.image_service import FORMATS, IMAGE_EXTENSIONS, pick_width, save_image, variant_key
+from app.services.storage import PresignNotSupported, get_storage
+
+router = APIRouter(prefix="/api/uploads", tags=["uploads"])
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# kind -> (allowed extensions, max size, roles allowed to upload; None = any user)
+UPLOAD_KINDS = {
+    UPLOAD_SUBDIR: (ALLOWED_EXTENSIONS, MAX_FILE_SIZE, {"WARRANTY_MANAGER", "ADMIN"}),
+    "logos": (IMAGE_EXTENSIONS, MAX_LOGO_SIZE, {"ADMIN"}),
+    "banners": (IMAGE_EXTENSIONS, MAX_IMAGE_SIZE, {"ADMIN"}),
+    "car-photos": (IMAGE_EXTENSIONS, MAX_IMAGE_SIZE, None),
+}
+IMAGE_KINDS = {"logos", "banners", "car-photos"}
+# The bucket serves files with the Content-Type they were uploaded with, so
+# presigned uploads get it from the (already allowed) extension
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+
+
+def _check_kind(kind: str, user: User) -> tuple[set[str], int]:
+    spec = UPLOAD_KINDS.get(kind)
+    if not spec:
+        raise HTTPException(status_code=400, detail="Неизвестный тип загрузки")
+    extensions, max_size, roles = spec
+    if roles is not None and user.role not in roles:
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+    return extensions, max_size
+
+
+@router.post("/presign", response_model=PresignUploadOut)
+async def presign_upload(
+    body: PresignUploadRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Direct-to-storage upload: the client POSTs the file to the bucket, not to the API."""
+    extensions, max_size = _check_kind(body.kind, current_user)
+
+    ext = os.path.splitext(body.filename)[1].lower()
+    if ext not in extensions:
+        raise HTTPException(status_code=400, detail=f"Недопустимый формат: {ext}")
+    if body.size > max_size:
+        raise HTTPException(status_code=413, detail=f"Файл слишком большой (макс. {max_size // (1024 * 1024)}МБ)")
+    content_type = CONTENT_TYPES[ext]
+    if body.content_type.split(";")[0].strip().lower() != content_type:
+        raise HTTPException(status_code=400, detail=f"Тип файла не соответствует формату {ext}")
+
+    storage = get_storage()
+    key = f"{body.kind}/{uuid.uuid4().hex}{ext}"
+    try:
+        post = storage.presign_upload(key, content_type, max_size)
+    except PresignNotSupported:
+        raise HTTPException(status_code=409, detail="Прямая загрузка недоступна, используйте загрузку через API")
+    return PresignUploadOut(key=key, url=post["url"], fields=post["fields"], public_url=storage.public_url(key))
+
+
+@router.post("/image", response_model=ImageUploadOut)
+async def upload_image(
+    kind: str = Query(...),
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+):
+    """Upload an image (logo, banner, car photo); WebP/AVIF variants are generated alongside."""
+    if kind not in IMAGE_KINDS:
+        raise HTTPException(status_code=400, detail="Неизвестный тип загрузки")
+    _, max_size = _check_kind(kind, current_user)
+    stored, variants = await save_image(file, kind, max_size)
+    return ImageUploadOut(url=stored.url, variants=variants)
+
+
+@router.get("/variant", include_in_schema=False)
+async def image_variant(
+    request: Request,
+    src: str = Query(...),
+    w: int = Query(..., ge=1, le=4096),
+):
+    """Redirect to the best stored variant of an uploaded image for width w and the client's Accept."""
+    storage = get_storage()
+    key = storage.key_from_url(src)
+    if not key or key.split("/", 1)[0] not in IMAGE_KINDS | {"brand-logos"}:
+        raise HTTPException(status_code=400, detail="Неверный адрес изображения")
+
+    target = key
+    if os.path.splitext(key)[1].lower() in IMAGE_EXTENSIONS:
+        accept = request.headers.get("accept", "")
+        fmt = next((f for f in FORMATS if f"image/{f}" in accept), None)
+        if fmt:
+            candidate = variant_key(key, pick_width(w), fmt)
+            try:
+                if await storage.exists(candidate):
+                    target = candidate
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Неверный адрес изображения")
+    return RedirectResponse(
+        storage.public_url(target), headers={"Cache-Control": "public, max-age=86400", "Vary": "Accept"},
+    )
+
+
+@router.get("/download-url", response_model=DownloadUrlOut)
+async def download_url(
+    key: str = Query(...),
+    _user: User = Depends(get_current_user),
+):
+    """Short-lived URL for a stored file (presigned when the bucket is private)."""
+    if key.split("/", 1)[0] not in UPLOAD_KINDS:
+        raise HTTPException(status_code=400, detail="Неизвестный тип загрузки")
+    try:
+        return DownloadUrlOut(url=get_storage().presign_download(key))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный ключ")
@@ -1,24 +1,35 @@
 import math
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import get_current_user, require_admin
-from app.models.user import User
 from app.models.car import Car
-from app.models.visit import Visit
-from app.models.balance import BalanceTransaction
+from app.models.user import User
+from app.responses import prevalidated
 from app.schemas.user import (
     UserOut, UserUpdate, UserListOut,
     FcmTokenRequest, BalanceOut, TransactionOut,
     CarInfoBrief, UserCountOut, VisitBrief, VisitScBrief,
 )
+from app.services import archive_service, ledger_service, scan_cache
+from app.services.visit_service import latest_visits
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
+PROFILE_VISITS_PER_CAR = 5
+
+
+def _car_brief(car: Car, **extra) -> CarInfoBrief:
+    # Built from the car's columns: reading car.visits would lazy-load the whole history
+    return CarInfoBrief(
+        **{k: getattr(car, k) for k in CarInfoBrief.model_fields if k not in ("visits", "has_more_visits")},
+        **extra,
+    )
+
 
 @router.get("", response_model=UserListOut)
 async def list_users(
@@ -27,7 +38,7 @@ async def list_users(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     _user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     query = select(User)
     count_query = select(func.count(User.id))
@@ -66,38 +77,39 @@ async def list_users(
         )
         users_out.append(uo)
 
-    return UserListOut(
+    return prevalidated(UserListOut(
         users=users_out,
         total=total,
         page=page,
         total_pages=total_pages,
-    )
+    ))
 
 
 @router.get("/{user_id}", response_model=UserOut)
 async def get_user(
     user_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.id != user_id and current_user.role != "ADMIN":
         raise HTTPException(status_code=403, detail="Доступ запрещён")
 
     result = await db.execute(
-        select(User).where(User.id == user_id).options(
-            selectinload(User.cars)
-            .selectinload(Car.visits)
-            .selectinload(Visit.service_center)
-        )
+        select(User).where(User.id == user_id).options(selectinload(User.cars))
     )
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
+    # Latest visits per car (one extra to know whether there are more), not the whole history
+    car_ids = [car.id for car in user.cars]
+    latest = await latest_visits(db, car_ids, PROFILE_VISITS_PER_CAR + 1)
+    with_archive = await archive_service.cars_with_archived_visits(db, car_ids)
+
     cars_out = []
     for car in user.cars:
         visits_out = []
-        for v in car.visits:
+        for v in latest[car.id][:PROFILE_VISITS_PER_CAR]:
             sc_brief = None
             if v.service_center:
                 sc_brief = VisitScBrief(
@@ -117,23 +129,26 @@ async def get_user(
                 created_at=v.created_at,
                 service_center=sc_brief,
             ))
-        car_brief = CarInfoBrief.model_validate(car)
-        car_brief.visits = visits_out
-        cars_out.append(car_brief)
+        cars_out.append(_car_brief(
+            car,
+            visits=visits_out,
+            has_more_visits=len(latest[car.id]) > PROFILE_VISITS_PER_CAR or car.id in with_archive,
+        ))
 
-    return UserOut(
+    return prevalidated(UserOut(
         id=user.id, phone=user.phone, email=user.email, name=user.name,
         role=user.role, balance=user.balance, fcm_token=user.fcm_token,
         salon_name=user.salon_name, created_at=user.created_at,
         updated_at=user.updated_at, cars=cars_out,
         count=UserCountOut(cars=len(user.cars)),
-    )
+    ))
 
 
 @router.put("/{user_id}", response_model=UserOut)
 async def update_user(
     user_id: str,
     body: UserUpdate,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -148,27 +163,44 @@ async def update_user(
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
     update_data = body.model_dump(exclude_unset=True)
+    if "balance" in update_data:
+        # Balance only changes through the ledger, as an admin adjustment
+        balance = update_data.pop("balance")
+        if balance is not None and balance != user.balance:
+            if current_user.role != "ADMIN":
+                raise HTTPException(status_code=403, detail="Доступ запрещён")
+            await ledger_service.set_balance(db, user, balance)
     if "password" in update_data:
         if update_data["password"]:
-            from app.services.auth_service import hash_password
-            update_data["password"] = hash_password(update_data["password"])
+            from app.services.password_service import hash_password
+            update_data["password"] = await hash_password(update_data["password"])
         else:
             del update_data["password"]
     for field, value in update_data.items():
         setattr(user, field, value)
+    # Scan cache entries carry the owner's name and phone
+    owner_changed = "name" in update_data or "phone" in update_data
+    car_ids = [car.id for car in user.cars]
 
     await db.commit()
+    if owner_changed:
+        await scan_cache.invalidate(request.app.state.redis, *car_ids)
     # Re-query to refresh all columns (commit expired them) and keep cars loaded
     result = await db.execute(
         select(User).where(User.id == user_id).options(selectinload(User.cars))
     )
     user = result.scalar_one()
-    return UserOut.model_validate(user)
+    # Cars without visits; GET /api/users/{id} has them
+    return UserOut(
+        **{k: getattr(user, k) for k in UserOut.model_fields if k not in ("cars", "count")},
+        cars=[_car_brief(car) for car in user.cars],
+    )
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: str,
+    request: Request,
     _user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -177,19 +209,24 @@ async def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
+    car_ids = (await db.execute(select(Car.id).where(Car.user_id == user.id))).scalars().all()
     await db.delete(user)
     await db.commit()
+    await scan_cache.invalidate(request.app.state.redis, *car_ids)
     return {"message": "Пользователь удалён"}
 
 
 @router.delete("/me")
 async def delete_my_account(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Delete current user's account and all related data."""
+    car_ids = (await db.execute(select(Car.id).where(Car.user_id == current_user.id))).scalars().all()
     await db.delete(current_user)
     await db.commit()
+    await scan_cache.invalidate(request.app.state.redis, *car_ids)
     return {"message": "Аккаунт удалён"}
 
 
@@ -199,7 +236,7 @@ async def get_balance(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.id != user_id and current_user.role != "ADMIN":
         raise HTTPException(status_code=403, detail="Нет доступа")
@@ -209,40 +246,18 @@ async def get_balance(
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    count_q = select(func.count(BalanceTransaction.id)).where(BalanceTransaction.user_id == user_id)
-    total = (await db.execute(count_q)).scalar() or 0
+    txns, total = await archive_service.transactions_page(db, user_id, (page - 1) * limit, limit)
     total_pages = math.ceil(total / limit) if total else 1
 
-    # Calculate totals
-    earned_q = select(func.coalesce(func.sum(BalanceTransaction.amount), 0)).where(
-        BalanceTransaction.user_id == user_id, BalanceTransaction.type == "CASHBACK_EARN"
-    )
-    total_earned = (await db.execute(earned_q)).scalar() or 0
-
-    spent_q = select(func.coalesce(func.sum(BalanceTransaction.amount), 0)).where(
-        BalanceTransaction.user_id == user_id, BalanceTransaction.type == "CASHBACK_SPEND"
-    )
-    total_spent = abs((await db.execute(spent_q)).scalar() or 0)
-
-    q = (
-        select(BalanceTransaction)
-        .where(BalanceTransaction.user_id == user_id)
-        .order_by(BalanceTransaction.created_at.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-    )
-    result = await db.execute(q)
-    txns = result.scalars().all()
-
-    return BalanceOut(
+    return prevalidated(BalanceOut(
         balance=user.balance,
-        total_earned=total_earned,
-        total_spent=total_spent,
+        total_earned=user.total_earned,
+        total_spent=user.total_spent,
         transactions=[TransactionOut.model_validate(t) for t in txns],
         total=total,
         page=page,
         total_pages=total_pages,
-    )
+    ))
 
 
 @router.post("/fcm-token")
@@ -7,40 +7,20 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import get_current_user, require_sc_manager
+from app.models.archive import ArchivedVisit
 from app.models.car import Car
 from app.models.service_center import ServiceCenter
 from app.models.user import User
 from app.models.visit import Visit
-from app.models.warranty import Warranty
-from app.schemas.visit import (
-    VisitOut, VisitCreate, VisitListOut, VisitServiceOut,
-    CarBriefForVisit, UserBriefForVisit, ScBriefForVisit,
-)
+from app.responses import prevalidated
+from app.schemas.visit import VisitOut, VisitCreate, VisitListOut
+from app.services import archive_service, scan_cache
+from app.services.warranty_status import active_warranty
 from app.services.event_service import publish_event
-from app.services.visit_service import create_visit
-
-
-def _visit_out(v: Visit) -> VisitOut:
-    car_brief = None
-    if v.car:
-        user_brief = None
-        if v.car.user:
-            user_brief = UserBriefForVisit(name=v.car.user.name, phone=v.car.user.phone)
-        car_brief = CarBriefForVisit(
-            brand=v.car.brand, model=v.car.model,
-            plate_number=v.car.plate_number, user=user_brief,
-        )
-    sc_brief = None
-    if v.service_center:
-        sc_brief = ScBriefForVisit(name=v.service_center.name, type=v.service_center.type)
-    return VisitOut(
-        **{c.key: getattr(v, c.key) for c in Visit.__table__.columns},
-        services=[VisitServiceOut.model_validate(s) for s in v.services],
-        car=car_brief,
-        service_center=sc_brief,
-    )
+from app.services.visit_service import create_visit, visit_out
+
 
 router = APIRouter(prefix="/api/visits", tags=["visits"])
 
@@ -53,56 +33,51 @@ async def list_visits(
     service_center_id: str | None = Query(None, alias="serviceCenterId"),
     warranty: str | None = Query(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = select(Visit).options(
-        selectinload(Visit.services),
-        selectinload(Visit.car).selectinload(Car.user),
-        selectinload(Visit.service_center),
-    )
-    count_query = select(func.count(Visit.id))
-
-    # USER can only see visits for their cars
-    if current_user.role == "USER":
-        car_ids_q = select(Car.id).where(Car.user_id == current_user.id)
-        query = query.where(Visit.car_id.in_(car_ids_q))
-        count_query = count_query.where(Visit.car_id.in_(car_ids_q))
+    now = datetime.utcnow()
+
+    def conditions(model) -> list:
+        # model is Visit or ArchivedVisit: car history also covers archived months
+        where = []
+        # USER can only see visits for their cars
+        if current_user.role == "USER":
+            where.append(model.car_id.in_(select(Car.id).where(Car.user_id == current_user.id)))
+        if car_id:
+            where.append(model.car_id == car_id)
+        if service_center_id:
+            where.append(model.service_center_id == service_center_id)
+        # Filter by whether the visited car has an active warranty (semi/anti-join on car_warranty_status)
+        if warranty in ("true", "false"):
+            has_warranty = active_warranty(model.car_id, now)
+            where.append(has_warranty if warranty == "true" else ~has_warranty)
+        return where
 
     if car_id:
-        query = query.where(Visit.car_id == car_id)
-        count_query = count_query.where(Visit.car_id == car_id)
-
-    if service_center_id:
-        query = query.where(Visit.service_center_id == service_center_id)
-        count_query = count_query.where(Visit.service_center_id == service_center_id)
-
-    # Filter by whether the visited car has an active warranty
-    if warranty in ("true", "false"):
-        now = datetime.utcnow()
-        warranty_cars_q = select(Warranty.car_id).where(
-            Warranty.is_active == True,  # noqa: E712
-            Warranty.end_date >= now,
+        visits, total = await archive_service.car_visits_page(db, conditions, (page - 1) * limit, limit)
+    else:
+        total = (await db.execute(select(func.count(Visit.id)).where(*conditions(Visit)))).scalar() or 0
+        result = await db.execute(
+            select(Visit)
+            .options(
+                selectinload(Visit.services),
+                selectinload(Visit.car).selectinload(Car.user),
+                selectinload(Visit.service_center),
+            )
+            .where(*conditions(Visit))
+            .order_by(Visit.created_at.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
         )
-        if warranty == "true":
-            query = query.where(Visit.car_id.in_(warranty_cars_q))
-            count_query = count_query.where(Visit.car_id.in_(warranty_cars_q))
-        else:
-            query = query.where(Visit.car_id.notin_(warranty_cars_q))
-            count_query = count_query.where(Visit.car_id.notin_(warranty_cars_q))
-
-    total = (await db.execute(count_query)).scalar() or 0
+        visits = result.scalars().all()
     total_pages = math.ceil(total / limit) if total else 1
 
-    query = query.order_by(Visit.created_at.desc()).offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    visits = result.scalars().all()
-
-    return VisitListOut(
-        visits=[_visit_out(v) for v in visits],
+    return prevalidated(VisitListOut(
+        visits=[visit_out(v) for v in visits],
         total=total,
         page=page,
         total_pages=total_pages,
-    )
+    ))
 
 
 @router.post("", response_model=VisitOut, status_code=201)
@@ -116,14 +91,12 @@ async def create_visit_endpoint(
         raise HTTPException(status_code=400, detail="serviceCenterId обязателен")
 
     car_id = body.car_id
+    redis = request.app.state.redis
 
     # Quick-create by VIN: resolve existing car or create user+car
     if not car_id and body.vin:
-        vin_upper = body.vin.upper().strip()
-        result = await db.execute(
-            select(Car).where(Car.vin == vin_upper).order_by(Car.created_at.desc()).limit(1)
-        )
-        existing_car = result.scalar_one_or_none()
+        vin_upper = scan_cache.normalize_vin(body.vin)
+        existing_car = await scan_cache.car_by_vin(redis, db, vin_upper)
         if existing_car:
             car_id = existing_car.id
         else:
@@ -177,6 +150,8 @@ async def create_visit_endpoint(
         await db.commit()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # The visit moved the car's mileage
+    await scan_cache.invalidate(redis, car_id)
 
     # Reload with services, car (with user), and service_center
     await db.refresh(visit, ["services", "car", "service_center"])
@@ -187,7 +162,6 @@ async def create_visit_endpoint(
     car = visit.car
     sc = visit.service_center
 
-    redis = request.app.state.redis
     await publish_event(redis, car.user_id, "visit:created", {
         "visitId": visit.id,
         "carName": f"{car.brand} {car.model}",
@@ -200,14 +174,14 @@ async def create_visit_endpoint(
         "description": visit.description,
     })
 
-    return _visit_out(visit)
+    return prevalidated(visit_out(visit), status_code=201)
 
 
 @router.get("/{visit_id}", response_model=VisitOut)
 async def get_visit(
     visit_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(Visit)
@@ -219,6 +193,16 @@ async def get_visit(
         )
     )
     visit = result.scalar_one_or_none()
+    if not visit:
+        # Visits from closed months live in the archive
+        visit = (await db.execute(
+            select(ArchivedVisit)
+            .where(ArchivedVisit.id == visit_id)
+            .options(
+                selectinload(ArchivedVisit.car).selectinload(Car.user),
+                selectinload(ArchivedVisit.service_center),
+            )
+        )).scalar_one_or_none()
     if not visit:
         raise HTTPException(status_code=404, detail="Визит не найден")
 
@@ -226,4 +210,4 @@ async def get_visit(
     if current_user.role == "USER" and visit.car.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Нет доступа")
 
-    return _visit_out(visit)
+    return prevalidated(visit_out(visit))
@@ -1,27 +1,27 @@
-import asyncio
-import os
 import re
-import uuid
 from datetime import datetime, timezone
 from dateutil.relativedelta import relativedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from redis.exceptions import RedisError
 from sqlalchemy import select, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import get_current_user, require_admin, require_warranty_manager
 from app.models.car import Car
 from app.models.user import User
 from app.models.warranty import Warranty
+from app.responses import prevalidated
 from app.schemas.warranty import (
     WarrantyOut, WarrantyCreate, WarrantyUpdate,
     SearchUserOut, SearchCarOut, UserBriefForWarranty,
 )
-
-UPLOAD_DIR = "/app/uploads/warranty-docs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+from app.services import scan_cache, warranty_status
+from app.services.job_queue import enqueue
+from app.services.upload_service import save_uploads
+from app.services.warranty_notifications import UPLOAD_SUBDIR, get_report
 
 ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
@@ -36,7 +36,7 @@ async def list_warranties(
     filter: str = "all",
     status: str | None = Query(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     query = select(Warranty).options(selectinload(Warranty.user), selectinload(Warranty.created_by))
 
@@ -57,11 +57,11 @@ async def list_warranties(
     if status:
         query = query.where(Warranty.status == status)
 
-    now = datetime.utcnow()
+    # is_active is cleared by the worker's expiry sweep once end_date passes
     if filter == "active":
-        query = query.where(Warranty.is_active == True, Warranty.end_date >= now)  # noqa: E712
+        query = query.where(Warranty.is_active == True)  # noqa: E712
     elif filter == "expired":
-        query = query.where(or_(Warranty.is_active == False, Warranty.end_date < now))  # noqa: E712
+        query = query.where(Warranty.is_active == False)  # noqa: E712
 
     query = query.order_by(Warranty.created_at.desc())
     result = await db.execute(query)
@@ -75,12 +75,13 @@ async def list_warranties(
         if w.created_by:
             wo.created_by = UserBriefForWarranty(phone=w.created_by.phone, name=w.created_by.name)
         out.append(wo)
-    return out
+    return prevalidated(out)
 
 
 @router.post("", response_model=WarrantyOut, status_code=201)
 async def create_warranty(
     body: WarrantyCreate,
+    request: Request,
     current_user: User = Depends(require_warranty_manager),
     db: AsyncSession = Depends(get_db),
 ):
@@ -150,47 +151,27 @@ async def create_warranty(
         created_by_id=current_user.id,
     )
     db.add(warranty)
+    await warranty_status.refresh(db, car_id)
+    await warranty_status.count_active(db, current_user.id, 1)
     await db.commit()
-    await db.refresh(warranty)
+    # The car's warranty flag changed (and a car created here may now answer its VIN)
+    await scan_cache.invalidate(request.app.state.redis, car_id, vin=body.vin)
+    # Reload with the relations WarrantyOut nests (no lazy loads under asyncio)
+    result = await db.execute(
+        select(Warranty)
+        .options(selectinload(Warranty.user), selectinload(Warranty.created_by))
+        .where(Warranty.id == warranty.id)
+    )
+    warranty = result.scalar_one()
 
-    # Fire-and-forget Telegram notification
-    async def _send_tg():
-        try:
-            from app.services.telegram_service import (
-                send_telegram, send_telegram_documents, format_warranty_message,
-            )
-            msg = format_warranty_message(
-                contract_number=body.contract_number,
-                client_name=body.client_name,
-                phone=body.phone or "",
-                brand=body.brand or "",
-                model=body.model or "",
-                year=body.year or 0,
-                vin=body.vin or "",
-                start_date=start_date.strftime("%d.%m.%Y"),
-                end_date=end_date.strftime("%d.%m.%Y"),
-                manager_name=current_user.name,
-            )
-            await send_telegram(msg)
-
-            # Send all attached documents in one message
-            if body.doc_urls:
-                file_paths = []
-                for url in body.doc_urls.split(","):
-                    url = url.strip()
-                    if not url:
-                        continue
-                    filename = url.split("/")[-1]
-                    filepath = os.path.join(UPLOAD_DIR, filename)
-                    if os.path.exists(filepath):
-                        file_paths.append(filepath)
-                if file_paths:
-                    caption = f"📎 {body.contract_number} — {body.client_name}"
-                    await send_telegram_documents(file_paths, caption)
-        except Exception:
-            pass
-
-    asyncio.create_task(_send_tg())
+    # Telegram message and documents are sent by the background worker
+    try:
+        await enqueue(
+            request.app.state.redis, "warranty.created",
+            warranty_id=warranty.id, phone=body.phone or "", manager_name=current_user.name,
+        )
+    except RedisError as e:
+        print(f"[WARRANTY] Could not queue Telegram notification for {warranty.id}: {e}")
 
     return WarrantyOut.model_validate(warranty)
 
@@ -199,6 +180,7 @@ async def create_warranty(
 async def update_warranty(
     warranty_id: str,
     body: WarrantyUpdate,
+    request: Request,
     _user: User = Depends(require_warranty_manager),
     db: AsyncSession = Depends(get_db),
 ):
@@ -216,17 +198,35 @@ async def update_warranty(
         if dup.scalar_one_or_none():
             raise HTTPException(status_code=409, detail="Договор с таким номером уже существует")
 
+    old_car_id, was_active, old_end_date = warranty.car_id, warranty.is_active, warranty.end_date
     for field, value in data.items():
         setattr(warranty, field, value)
-
+    if warranty.end_date != old_end_date:
+        # A new term gets its own expiring-soon reminder
+        warranty.expiry_notified_at = None
+    if "is_active" in data:
+        # The manager's choice replaces the sweep's
+        warranty.expired_at = None
+    elif warranty.end_date != old_end_date:
+        warranty_status.revive(warranty)
+
+    await warranty_status.refresh(db, old_car_id, warranty.car_id)
+    await warranty_status.count_active(db, warranty.created_by_id, int(bool(warranty.is_active)) - int(was_active))
     await db.commit()
-    await db.refresh(warranty)
-    return WarrantyOut.model_validate(warranty)
+    await scan_cache.invalidate(request.app.state.redis, old_car_id, warranty.car_id)
+    result = await db.execute(
+        select(Warranty)
+        .options(selectinload(Warranty.user), selectinload(Warranty.created_by))
+        .where(Warranty.id == warranty.id)
+        .execution_options(populate_existing=True)
+    )
+    return WarrantyOut.model_validate(result.scalar_one())
 
 
 @router.delete("/{warranty_id}")
 async def delete_warranty(
     warranty_id: str,
+    request: Request,
     _user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -236,7 +236,11 @@ async def delete_warranty(
         raise HTTPException(status_code=404, detail="Гарантия не найдена")
 
     await db.delete(warranty)
+    await warranty_status.refresh(db, warranty.car_id)
+    if warranty.is_active:
+        await warranty_status.count_active(db, warranty.created_by_id, -1)
     await db.commit()
+    await scan_cache.invalidate(request.app.state.redis, warranty.car_id)
     return {"message": "Удалено"}
 
 
@@ -246,64 +250,49 @@ async def upload_warranty_docs(
     _user: User = Depends(require_warranty_manager),
 ):
     """Upload tech passport / ID documents. Returns list of saved file paths."""
-    saved = []
-    for f in files:
-        ext = os.path.splitext(f.filename or "")[1].lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(status_code=400, detail=f"Недопустимый формат: {ext}")
-
-        content = await f.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="Файл слишком большой (макс. 10МБ)")
-
-        filename = f"{uuid.uuid4().hex}{ext}"
-        filepath = os.path.join(UPLOAD_DIR, filename)
-        with open(filepath, "wb") as out:
-            out.write(content)
-
-        saved.append({"filename": filename, "url": f"/uploads/warranty-docs/{filename}"})
-
-    return saved
+    saved = await save_uploads(files, UPLOAD_SUBDIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE)
+    return [{"filename": s.filename, "url": s.url} for s in saved]
 
 
-@router.post("/{warranty_id}/send-docs")
+@router.post("/{warranty_id}/send-docs", status_code=202)
 async def send_warranty_docs_to_telegram(
     warranty_id: str,
+    request: Request,
     _user: User = Depends(require_warranty_manager),
     db: AsyncSession = Depends(get_db),
 ):
-    """Send uploaded documents attached to a warranty to Telegram."""
+    """Queue the documents attached to a warranty for delivery to Telegram."""
     result = await db.execute(select(Warranty).where(Warranty.id == warranty_id))
     warranty = result.scalar_one_or_none()
     if not warranty:
         raise HTTPException(status_code=404, detail="Гарантия не найдена")
 
-    if not warranty.doc_urls:
+    urls = [u.strip() for u in (warranty.doc_urls or "").split(",") if u.strip()]
+    if not urls:
         return {"message": "Нет прикреплённых документов"}
 
-    from app.services.telegram_service import send_telegram_documents
-    urls = [u.strip() for u in warranty.doc_urls.split(",") if u.strip()]
-    file_paths = []
-    for url in urls:
-        filename = url.split("/")[-1]
-        filepath = os.path.join(UPLOAD_DIR, filename)
-        if os.path.exists(filepath):
-            file_paths.append(filepath)
+    job_id = await enqueue(request.app.state.redis, "warranty.send_docs", warranty_id=warranty.id)
+    return {"message": f"{len(urls)} документов поставлено в очередь на отправку", "jobId": job_id}
 
-    if not file_paths:
-        return {"message": "Файлы не найдены на сервере"}
 
-    caption = f"📎 {warranty.contract_number} — {warranty.client_name}"
-    ok = await send_telegram_documents(file_paths, caption)
-
-    return {"message": f"Отправлено {len(file_paths)}/{len(urls)} документов" if ok else "Ошибка отправки"}
+@router.get("/{warranty_id}/telegram-status")
+async def warranty_telegram_status(
+    warranty_id: str,
+    request: Request,
+    _user: User = Depends(require_warranty_manager),
+):
+    """Per-file result of the last Telegram delivery of the warranty's documents."""
+    report = await get_report(request.app.state.redis, warranty_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Отправка не найдена")
+    return report
 
 
 @router.get("/search-users", response_model=list[SearchUserOut])
 async def search_users(
     phone: str = Query(""),
     _user: User = Depends(require_warranty_manager),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if len(phone) < 3:
         return []
@@ -1,45 +1,64 @@
-from datetime import datetime, timezone
+import math
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, func, and_
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.dependencies import require_admin
 from app.models.user import User
 from app.models.warranty import Warranty
-from app.services.auth_service import hash_password
-from app.schemas.warranty import WarrantyManagerOut, WarrantyManagerCreate
+from app.responses import prevalidated
+from app.services.password_service import hash_password
+from app.schemas.warranty import WarrantyManagerOut, WarrantyManagerCreate, WarrantyManagerListOut
 
 router = APIRouter(prefix="/api/warranty-managers", tags=["warranty-managers"])
 
 
-@router.get("", response_model=list[WarrantyManagerOut])
+@router.get("", response_model=WarrantyManagerListOut)
 async def list_warranty_managers(
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
     _user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(User)
-        .where(User.role == "WARRANTY_MANAGER")
-        .options(selectinload(User.created_warranties))
+    is_manager = User.role == "WARRANTY_MANAGER"
+    total = (await db.execute(select(func.count(User.id)).where(is_manager))).scalar() or 0
+    total_warranties = (await db.execute(
+        select(func.count(Warranty.id)).join(User, User.id == Warranty.created_by_id).where(is_manager)
+    )).scalar() or 0
+
+    # Counted per manager on the page (index on created_by_id); the active count is kept on users
+    created = (
+        select(func.count(Warranty.id))
+        .where(Warranty.created_by_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
     )
-    managers = result.scalars().all()
-    now = datetime.utcnow()
-
-    return [
-        WarrantyManagerOut(
-            id=m.id, phone=m.phone, email=m.email,
-            name=m.name, salon_name=m.salon_name, city=m.city,
-            created_at=m.created_at,
-            total_warranties=len(m.created_warranties),
-            active_warranties=sum(
-                1 for w in m.created_warranties if w.is_active and w.end_date >= now
-            ),
-        )
-        for m in managers
-    ]
+    rows = (await db.execute(
+        select(User, created)
+        .where(is_manager)
+        .order_by(User.created_at.desc(), User.id)
+        .offset((page - 1) * limit)
+        .limit(limit)
+    )).all()
+
+    return prevalidated(WarrantyManagerListOut(
+        managers=[
+            WarrantyManagerOut(
+                id=m.id, phone=m.phone, email=m.email,
+                name=m.name, salon_name=m.salon_name, city=m.city,
+                created_at=m.created_at,
+                total_warranties=created_count,
+                active_warranties=m.active_warranties,
+            )
+            for m, created_count in rows
+        ],
+        total=total,
+        page=page,
+        total_pages=math.ceil(total / limit) if total else 1,
+        total_warranties=total_warranties,
+    ))
 
 
 @router.post("", response_model=WarrantyManagerOut, status_code=201)
@@ -64,7 +83,7 @@ async def create_warranty_manager(
         phone=body.phone,
         name=body.name,
         email=body.email,
-        password=hash_password(body.password),
+        password=await hash_password(body.password),
         role="WARRANTY_MANAGER",
         salon_name=body.salon_name,
         city=body.city,
@@ -95,7 +114,7 @@ async def update_warranty_manager(
 
     data = body.model_dump(exclude_unset=True)
     if "password" in data and data["password"]:
-        data["password"] = hash_password(data["password"])
+        data["password"] = await hash_password(data["password"])
     elif "password" in data:
         del data["password"]
 
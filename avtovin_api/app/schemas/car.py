@@ -91,3 +91,12 @@ class GenerationOut(CamelModel):
     year_to: int | None = None
     engine_types: str | None = None
     model_id: str
+
+
+class CatalogSearchHit(CamelModel):
+    kind: str  # "brand" | "model"
+    id: str
+    name: str
+    brand_id: str | None = None
+    brand_name: str | None = None
+    logo_url: str | None = None
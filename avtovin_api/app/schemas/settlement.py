@@ -18,6 +18,7 @@ class SettlementOut(CamelModel):
     net_amount: int
     is_paid: bool = False
     receipt_url: str | None = None
+    receipt_thumb_url: str | None = None
     receipt_status: str = "NONE"
     created_at: datetime | None = None
     service_center: ScBriefForSettlement | None = None
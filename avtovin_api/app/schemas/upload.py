@@ -0,0 +1,26 @@
+from app.schemas.base import CamelModel
+
+
+class PresignUploadRequest(CamelModel):
+    kind: str  # "warranty-docs" | "logos" | "banners" | "car-photos"
+    filename: str
+    content_type: str
+    size: int
+
+
+class PresignUploadOut(CamelModel):
+    key: str
+    # Browser form POST: send `fields` plus the file as multipart to `url`
+    url: str
+    fields: dict[str, str]
+    public_url: str
+
+
+class DownloadUrlOut(CamelModel):
+    url: str
+
+
+class ImageUploadOut(CamelModel):
+    url: str
+    # format -> width -> URL, e.g. variants["webp"][320]
+    variants: dict[str, dict[int, str]]
@@ -37,7 +37,9 @@ class CarInfoBrief(CamelModel):
     last_service_mileage: int | None = None
     photo_url: str | None = None
     created_at: datetime | None = None
+    # Latest visits only; the full history is GET /api/cars/{id}/visits
     visits: list[VisitBrief] = []
+    has_more_visits: bool = False
 
 
 class UserCountOut(CamelModel):
@@ -70,6 +70,7 @@ class VisitOut(CamelModel):
     services: list[VisitServiceOut] = []
     car: CarBriefForVisit | None = None
     service_center: ScBriefForVisit | None = None
+    archived: bool = False
 
 
 class VisitListOut(CamelModel):
@@ -87,6 +87,15 @@ class WarrantyManagerOut(CamelModel):
     active_warranties: int = 0
 
 
+class WarrantyManagerListOut(CamelModel):
+    managers: list[WarrantyManagerOut]
+    total: int
+    page: int
+    total_pages: int
+    # Warranties created by all managers, not just this page
+    total_warranties: int = 0
+
+
 class WarrantyManagerCreate(CamelModel):
     phone: str
     name: str
@@ -0,0 +1,211 @@
+"""Cold tier for visits and balance transactions from closed months.
+
+Once a month is older than settings.archive_after_months and no unpaid
+settlement covers it, the worker moves its visits (with their
+visit_services inlined as JSON) and balance transactions into the
+*_archive tables, one month per transaction. On Postgres the month's
+partitions are then dropped whole (no DELETE, nothing to vacuum), so the
+hot tables and their indexes only hold recent data.
+
+Readers that need the full history go through the merged queries here:
+car_visits_page() for a car's visits and transactions_page() for a user's
+ledger. Both page over hot and archived rows as one list, newest first.
+"""
+
+from datetime import date, datetime
+from typing import Callable
+
+import redis.asyncio as aioredis
+from sqlalchemy import delete, false, func, insert, select, text, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import settings
+from app.database import async_session
+from app.models.archive import ArchivedBalanceTransaction, ArchivedVisit
+from app.models.balance import BalanceTransaction
+from app.models.car import Car
+from app.models.settlement import Settlement
+from app.models.visit import Visit, VisitService
+from app.services.job_queue import periodic
+from app.services.partition_service import (
+    LOCK_TIMEOUT, PARTITIONED_TABLES, add_months, month_start, months_between, partition_name,
+)
+
+VISIT_COLUMNS = [c.key for c in Visit.__table__.columns]
+SERVICE_COLUMNS = [c.key for c in VisitService.__table__.columns]
+TXN_COLUMNS = [c.key for c in BalanceTransaction.__table__.columns]
+# Months archived per worker run, oldest first
+MONTHS_PER_RUN = 3
+
+
+async def archivable_months(db: AsyncSession, now: datetime | None = None) -> list[date]:
+    """Months before the cutoff that still have hot rows and no unpaid settlement."""
+    cutoff = add_months(month_start(now or datetime.utcnow()), -settings.archive_after_months)
+    oldest = [
+        (await db.execute(select(func.min(Visit.created_at)).where(Visit.created_at < cutoff))).scalar(),
+        (await db.execute(
+            select(func.min(BalanceTransaction.created_at)).where(BalanceTransaction.created_at < cutoff)
+        )).scalar(),
+    ]
+    oldest = [d for d in oldest if d is not None]
+    if not oldest:
+        return []
+
+    months = []
+    for month in months_between(min(oldest), add_months(cutoff, -1)):
+        open_settlement = (await db.execute(
+            select(Settlement.id).where(
+                Settlement.is_paid == False,  # noqa: E712
+                Settlement.period_start < add_months(month, 1),
+                Settlement.period_end >= month,
+            ).limit(1)
+        )).scalar()
+        if open_settlement is None:
+            months.append(month)
+    return months
+
+
+async def archive_month(db: AsyncSession, month: date) -> tuple[int, int]:
+    """Move one month to the archive tables (caller commits); returns (visits, transactions)."""
+    start, end = month_start(month), add_months(month_start(month), 1)
+    visits_t, services_t, txns_t = Visit.__table__, VisitService.__table__, BalanceTransaction.__table__
+
+    moved_visits, last_id = 0, ""
+    while True:
+        rows = (await db.execute(
+            select(visits_t)
+            .where(visits_t.c.created_at >= start, visits_t.c.created_at < end, visits_t.c.id > last_id)
+            .order_by(visits_t.c.id)
+            .limit(settings.archive_batch_size)
+        )).mappings().all()
+        if not rows:
+            break
+        ids = [r["id"] for r in rows]
+        services: dict[str, list[dict]] = {}
+        for s in (await db.execute(select(services_t).where(services_t.c.visit_id.in_(ids)))).mappings():
+            services.setdefault(s["visit_id"], []).append({k: s[k] for k in SERVICE_COLUMNS})
+        await db.execute(insert(ArchivedVisit.__table__), [
+            {**{k: r[k] for k in VISIT_COLUMNS}, "services": services.get(r["id"], [])} for r in rows
+        ])
+        await db.execute(delete(services_t).where(services_t.c.visit_id.in_(ids)))
+        moved_visits += len(rows)
+        last_id = ids[-1]
+
+    in_month = (txns_t.c.created_at >= start) & (txns_t.c.created_at < end)
+    moved_txns = (await db.execute(
+        insert(ArchivedBalanceTransaction.__table__).from_select(
+            TXN_COLUMNS, select(*(txns_t.c[k] for k in TXN_COLUMNS)).where(in_month),
+        )
+    )).rowcount
+
+    if (await db.connection()).dialect.name == "postgresql":
+        await db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        for table in PARTITIONED_TABLES:
+            await db.execute(text(f"DROP TABLE IF EXISTS {partition_name(table, start)}"))
+    # Whatever is left: rows of the month in a DEFAULT partition (or the whole month off Postgres)
+    await db.execute(delete(visits_t).where(visits_t.c.created_at >= start, visits_t.c.created_at < end))
+    await db.execute(delete(txns_t).where(in_month))
+    return moved_visits, moved_txns
+
+
+@periodic("archive.closed_months", seconds=settings.archive_check_interval)
+async def archive_job(redis: aioredis.Redis):
+    async with async_session() as db:
+        months = (await archivable_months(db))[:MONTHS_PER_RUN]
+    for month in months:
+        async with async_session() as db:
+            visits, txns = await archive_month(db, month)
+            await db.commit()
+        print(f"[ARCHIVE] {month:%Y-%m}: {visits} visits, {txns} transactions moved to the archive")
+
+
+async def car_visits_page(
+    db: AsyncSession,
+    conditions: Callable[[type], list],
+    offset: int,
+    limit: int,
+) -> tuple[list[Visit | ArchivedVisit], int]:
+    """One page of hot and archived visits, newest first, plus the total.
+
+    conditions(model) returns the filters for Visit or ArchivedVisit (both
+    have the same columns).
+    """
+    page = union_all(
+        select(Visit.id, Visit.created_at, false().label("archived")).where(*conditions(Visit)),
+        select(ArchivedVisit.id, ArchivedVisit.created_at, true().label("archived")).where(*conditions(ArchivedVisit)),
+    ).subquery()
+    total = (await db.execute(select(func.count()).select_from(page))).scalar() or 0
+    rows = (await db.execute(
+        select(page.c.id, page.c.archived)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )).all()
+
+    hot_ids = [r.id for r in rows if not r.archived]
+    cold_ids = [r.id for r in rows if r.archived]
+    loaded: dict[str, Visit | ArchivedVisit] = {}
+    if hot_ids:
+        for v in (await db.execute(select(Visit).where(Visit.id.in_(hot_ids)).options(
+            selectinload(Visit.services),
+            selectinload(Visit.car).selectinload(Car.user),
+            selectinload(Visit.service_center),
+        ))).scalars():
+            loaded[v.id] = v
+    if cold_ids:
+        for v in (await db.execute(select(ArchivedVisit).where(ArchivedVisit.id.in_(cold_ids)).options(
+            selectinload(ArchivedVisit.car).selectinload(Car.user),
+            selectinload(ArchivedVisit.service_center),
+        ))).scalars():
+            loaded[v.id] = v
+    return [loaded[r.id] for r in rows if r.id in loaded], total
+
+
+async def cars_with_archived_visits(db: AsyncSession, car_ids: list[str]) -> set[str]:
+    """Which of the cars have archived visits (an EXISTS per car, not a count)."""
+    if not car_ids:
+        return set()
+    has_archived = select(ArchivedVisit.id).where(ArchivedVisit.car_id == Car.id).exists()
+    return set((await db.execute(select(Car.id).where(Car.id.in_(car_ids), has_archived))).scalars())
+
+
+async def visit_totals(db: AsyncSession) -> tuple[int, int, int]:
+    """(visits, service fees, cashback) over hot and archived visits."""
+    totals = [0, 0, 0]
+    for model in (Visit, ArchivedVisit):
+        row = (await db.execute(select(
+            func.count(model.id),
+            func.coalesce(func.sum(model.service_fee), 0),
+            func.coalesce(func.sum(model.cashback), 0),
+        ))).one()
+        totals = [t + (n or 0) for t, n in zip(totals, row)]
+    return totals[0], totals[1], totals[2]
+
+
+def _transactions(user_id: str):
+    cols = lambda t: [t.c[k] for k in TXN_COLUMNS]  # noqa: E731
+    hot, cold = BalanceTransaction.__table__, ArchivedBalanceTransaction.__table__
+    return union_all(
+        select(*cols(hot)).where(hot.c.user_id == user_id),
+        select(*cols(cold)).where(cold.c.user_id == user_id),
+    ).subquery()
+
+
+async def transactions_page(db: AsyncSession, user_id: str, offset: int, limit: int) -> tuple[list[dict], int]:
+    """One page of a user's hot and archived balance transactions, newest first, plus the total."""
+    txns = _transactions(user_id)
+    total = (await db.execute(select(func.count()).select_from(txns))).scalar() or 0
+    rows = (await db.execute(
+        select(txns).order_by(txns.c.created_at.desc(), txns.c.id.desc()).offset(offset).limit(limit)
+    )).mappings().all()
+    return [dict(r) for r in rows], total
+
+
+def all_transactions():
+    """Hot and archived transactions as one selectable (for the ledger audit)."""
+    cols = lambda t: [t.c[k] for k in ("user_id", "amount", "type")]  # noqa: E731
+    return union_all(
+        select(*cols(BalanceTransaction.__table__)),
+        select(*cols(ArchivedBalanceTransaction.__table__)),
+    ).subquery()
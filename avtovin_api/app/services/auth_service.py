@@ -35,4 +35,11 @@ def verify_password(plain: str, hashed: str) -> bool:
 
 
 def hash_password(plain: str) -> str:
-    return bcrypt.hash(plain)
+    return bcrypt.using(rounds=settings.bcrypt_rounds).hash(plain)
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    # Legacy SHA256 hashes and bcrypt hashes made with a different cost
+    if not hashed.startswith("$2"):
+        return True
+    return bcrypt.using(rounds=settings.bcrypt_rounds).needs_update(hashed)
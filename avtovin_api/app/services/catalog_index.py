@@ -0,0 +1,187 @@
+"""In-memory car catalog: brand/model/generation lists and prefix autocomplete.
+
+The catalog only changes on (re)seed, so each worker loads it once from the
+DB and answers dropdown and search requests from memory. Search keys are
+kept in one sorted list; a prefix query is a bisect to the first key plus a
+scan while keys still match, which gives trie-style lookups without a node
+per character. Names and queries go through the same Cyrillic-to-Latin
+transliteration and phonetic folding, so "тойота", "toyota" and "Тойота"
+find the same brand.
+
+Reseeding publishes on CATALOG_RELOAD_CHANNEL; every worker drops its index
+and lazily reloads it on the next request.
+"""
+
+import asyncio
+import re
+from bisect import bisect_left
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car_catalog import CarBrand, CarModel, CarGeneration
+from app.schemas.car import BrandOut, ModelOut, GenerationOut, CatalogSearchHit
+
+CATALOG_RELOAD_CHANNEL = "catalog:reload"
+
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "iu",
+    "я": "ia", "і": "i", "ә": "a", "ө": "o", "ү": "u", "ұ": "u", "қ": "k", "ғ": "g",
+    "ң": "n", "һ": "h",
+}
+# Applied in order after transliteration: spellings that sound alike collapse
+_FOLDS = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"[cq]"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"[wf]"), "v"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+]
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+# Common Russian spellings that transliteration alone does not map onto the brand
+_BRAND_ALIASES = {
+    "Hyundai": ("хендай", "хундай", "хендэ"),
+    "Chevrolet": ("шевроле",),
+    "Peugeot": ("пежо",),
+    "Renault": ("рено",),
+    "Porsche": ("порше",),
+    "Mitsubishi": ("мицубиси",),
+    "Chery": ("чери",),
+    "Geely": ("джили",),
+    "Jeep": ("джип",),
+}
+
+
+def search_key(text: str) -> str:
+    text = "".join(_CYRILLIC.get(ch, ch) for ch in text.lower())
+    text = _NON_ALNUM.sub(" ", text)
+    for pattern, repl in _FOLDS:
+        text = pattern.sub(repl, text)
+    return " ".join(text.split())
+
+
+def _word_suffixes(key: str) -> list[str]:
+    """'toiota korola' -> ['toiota korola', 'korola'] so inner words match too."""
+    words = key.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class CatalogIndex:
+    def __init__(self, brands: list[CarBrand], models: list[CarModel], generations: list[CarGeneration]):
+        self.brands = sorted((BrandOut.model_validate(b) for b in brands), key=lambda b: b.name)
+        self.models_by_brand: dict[str, list[ModelOut]] = {}
+        for m in sorted(models, key=lambda m: m.name):
+            self.models_by_brand.setdefault(m.brand_id, []).append(ModelOut.model_validate(m))
+        self.generations_by_model: dict[str, list[GenerationOut]] = {}
+        for g in sorted(generations, key=lambda g: g.year_from, reverse=True):
+            self.generations_by_model.setdefault(g.model_id, []).append(GenerationOut.model_validate(g))
+
+        brand_by_id = {b.id: b for b in self.brands}
+        self.hits: list[CatalogSearchHit] = []
+        pairs: list[tuple[str, int]] = []
+        for b in self.brands:
+            names = (b.name, *_BRAND_ALIASES.get(b.name, ()))
+            pairs += [(k, len(self.hits)) for name in names for k in _word_suffixes(search_key(name))]
+            self.hits.append(CatalogSearchHit(kind="brand", id=b.id, name=b.name, logo_url=b.logo_url))
+        for brand_id, brand_models in self.models_by_brand.items():
+            brand = brand_by_id.get(brand_id)
+            if brand is None:
+                continue
+            brand_key = search_key(brand.name)
+            for m in brand_models:
+                # "vaz lada vesta", "lada vesta", "vesta": brand-qualified and bare model queries
+                keys = set(_word_suffixes(f"{brand_key} {search_key(m.name)}"))
+                pairs += [(k, len(self.hits)) for k in keys]
+                self.hits.append(CatalogSearchHit(
+                    kind="model", id=m.id, name=m.name,
+                    brand_id=brand.id, brand_name=brand.name, logo_url=brand.logo_url,
+                ))
+        pairs.sort()
+        self._keys = [k for k, _ in pairs]
+        self._refs = [i for _, i in pairs]
+
+    def search(self, query: str, limit: int = 20) -> list[CatalogSearchHit]:
+        q = search_key(query)
+        if not q:
+            return []
+        found: dict[int, bool] = {}  # hit index -> key matched exactly
+        i = bisect_left(self._keys, q)
+        while i < len(self._keys) and self._keys[i].startswith(q) and len(found) < 500:
+            ref = self._refs[i]
+            found[ref] = found.get(ref, False) or self._keys[i] == q
+            i += 1
+        ranked = sorted(
+            found,
+            key=lambda ref: (not found[ref], self.hits[ref].kind != "brand", len(self.hits[ref].name), ref),
+        )
+        return [self.hits[ref] for ref in ranked[:limit]]
+
+
+_index: CatalogIndex | None = None
+# Bumped by invalidate() so a load that raced with a reseed is not kept
+_generation = 0
+_load_lock = asyncio.Lock()
+
+
+async def load(db: AsyncSession) -> CatalogIndex:
+    brands = (await db.execute(select(CarBrand))).scalars().all()
+    models = (await db.execute(select(CarModel))).scalars().all()
+    generations = (await db.execute(select(CarGeneration))).scalars().all()
+    return CatalogIndex(brands, models, generations)
+
+
+async def get_index(db: AsyncSession) -> CatalogIndex:
+    """The worker's index; the session is only used when it has to be (re)loaded."""
+    global _index
+    index = _index
+    if index is None:
+        async with _load_lock:
+            index = _index
+            if index is None:
+                generation = _generation
+                index = await load(db)
+                if generation == _generation:
+                    _index = index
+    return index
+
+
+def invalidate():
+    global _index, _generation
+    _generation += 1
+    _index = None
+
+
+async def publish_reload(redis: aioredis.Redis):
+    invalidate()
+    try:
+        await redis.publish(CATALOG_RELOAD_CHANNEL, "1")
+    except RedisError as e:
+        print(f"[CATALOG] Failed to notify workers about reload: {e}")
+
+
+async def listen_for_reloads(redis: aioredis.Redis):
+    """Background task per worker: drop the index when another worker reseeds."""
+    reconnecting = False
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(CATALOG_RELOAD_CHANNEL)
+            if reconnecting:
+                # Anything published while we were not subscribed is unknown, so reload
+                invalidate()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    invalidate()
+        except RedisError as e:
+            print(f"[CATALOG] Reload listener error: {e}, reconnecting")
+            reconnecting = True
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,92 @@
+"""Set-based sync of the brand/model catalog (data/car_catalog.json) into the DB.
+
+Rows are matched on their natural keys (brand name, brand + model name), so
+existing brands and models keep their ids across reseeds. New rows go in with
+multi-row INSERT ... ON CONFLICT statements, changed logos are updated in the
+same statement, and with prune=True rows that left the file are deleted —
+except models that still have generations, and brands that still have
+models. Everything runs in the caller's transaction.
+"""
+
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car_catalog import CarBrand, CarModel, CarGeneration
+
+# Stays well under Postgres' 32767 bind parameters per statement
+CHUNK_SIZE = 1000
+
+
+def _insert(db: AsyncSession, model):
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+
+
+def _chunks(rows: list, size: int = CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def sync_catalog(db: AsyncSession, catalog: dict[str, tuple[str | None, list[str]]], prune: bool = False) -> dict:
+    """catalog maps brand name -> (logo_url, [model names]); returns change counts."""
+    brands_upserted = 0
+    for chunk in _chunks([
+        {"id": str(uuid4()), "name": name, "logo_url": logo_url}
+        for name, (logo_url, _) in catalog.items()
+    ]):
+        stmt = _insert(db, CarBrand).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CarBrand.name],
+            set_={"logo_url": stmt.excluded.logo_url},
+            where=CarBrand.logo_url.is_distinct_from(stmt.excluded.logo_url),
+        ).returning(CarBrand.id)
+        brands_upserted += len((await db.execute(stmt)).all())
+
+    brand_ids = dict((await db.execute(select(CarBrand.name, CarBrand.id))).all())
+    wanted_models = {
+        (brand_ids[name], model_name)
+        for name, (_, model_names) in catalog.items()
+        for model_name in model_names
+    }
+
+    models_added = 0
+    for chunk in _chunks(sorted(wanted_models)):
+        stmt = _insert(db, CarModel).values([
+            {"id": str(uuid4()), "brand_id": brand_id, "name": model_name}
+            for brand_id, model_name in chunk
+        ])
+        stmt = stmt.on_conflict_do_nothing(index_elements=[CarModel.brand_id, CarModel.name]).returning(CarModel.id)
+        models_added += len((await db.execute(stmt)).all())
+
+    models_removed = brands_removed = 0
+    if prune:
+        with_generations = select(CarGeneration.model_id).distinct()
+        rows = await db.execute(
+            select(CarModel.id, CarModel.brand_id, CarModel.name).where(CarModel.id.not_in(with_generations))
+        )
+        stale_models = [model_id for model_id, brand_id, name in rows if (brand_id, name) not in wanted_models]
+        for chunk in _chunks(stale_models):
+            result = await db.execute(CarModel.__table__.delete().where(CarModel.__table__.c.id.in_(chunk)))
+            models_removed += result.rowcount
+
+        with_models = select(CarModel.brand_id).distinct()
+        stale_brands = [
+            brand_id for name, brand_id in brand_ids.items() if name not in catalog
+        ]
+        for chunk in _chunks(stale_brands):
+            result = await db.execute(
+                CarBrand.__table__.delete().where(
+                    CarBrand.__table__.c.id.in_(chunk), CarBrand.__table__.c.id.not_in(with_models),
+                )
+            )
+            brands_removed += result.rowcount
+
+    return {
+        "brands_upserted": brands_upserted,
+        "models_added": models_added,
+        "models_removed": models_removed,
+        "brands_removed": brands_removed,
+    }
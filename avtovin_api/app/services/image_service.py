@@ -0,0 +1,165 @@
+"""Resized WebP/AVIF variants of uploaded images.
+
+Images are stored as uploaded and, next to the original, re-encoded at every
+width in VARIANT_WIDTHS:
+    logos/<hash>.png -> logos/<hash>_w320.webp, logos/<hash>_w320.avif, ...
+Variants never upscale (a 200px logo's _w640 is 200px wide), so every name
+exists for every processed image and clients can build variant URLs from the
+original URL; GET /api/uploads/variant picks one from a width and the Accept
+header. Decoding and encoding are CPU-bound and hold the GIL, so they run in
+a process pool whose pending cap sheds load like password_service.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.services.storage import get_storage
+from app.services.upload_service import StoredFile, save_upload
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+# Preferred first; the original format is the fallback for clients that take neither
+FORMATS = {
+    "avif": ("AVIF", {"quality": 55, "speed": 8}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+# Decompression bomb guard for the workers
+MAX_PIXELS = 40_000_000
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def variant_key(key: str, width: int, fmt: str) -> str:
+    return f"{os.path.splitext(key)[0]}_w{width}.{fmt}"
+
+
+def pick_width(width: int) -> int:
+    return next((w for w in VARIANT_WIDTHS if w >= width), VARIANT_WIDTHS[-1])
+
+
+def variant_urls(key: str) -> dict[str, dict[int, str]]:
+    storage = get_storage()
+    return {
+        fmt: {w: storage.public_url(variant_key(key, w, fmt)) for w in VARIANT_WIDTHS}
+        for fmt in FORMATS
+    }
+
+
+def _render(src_path: str, out_dir: str, widths: tuple[int, ...], formats: tuple[str, ...]) -> list[tuple[int, str, str]]:
+    """Runs in a pool process; returns (width, format, temp file) per variant."""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(src_path) as src:
+            img = ImageOps.exif_transpose(src)
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    out = []
+    aspect = img.height / img.width
+    # Largest first, each step resized from the previous one
+    for width in sorted(widths, reverse=True):
+        if img.width > width:
+            img = img.resize((width, max(1, round(width * aspect))), Image.LANCZOS)
+        for fmt in formats:
+            pil_format, options = FORMATS[fmt]
+            fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".variant-")
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, pil_format, **options)
+            out.append((width, fmt, tmp_path))
+    return out
+
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # forkserver: children start from a clean process, not a copy of the
+        # worker with its event loop, DB pool and sockets
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.image_workers, mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _executor
+
+
+async def generate_variants(key: str) -> list[str]:
+    """Create (or skip, if present) every variant of a stored image; returns their keys."""
+    global _pending
+    storage = get_storage()
+    keys = [variant_key(key, w, fmt) for w in VARIANT_WIDTHS for fmt in FORMATS]
+    # Variants are stored largest first, so the smallest one marks a finished run
+    if await storage.exists(keys[len(FORMATS) - 1]):
+        return keys  # same content was processed before
+
+    src_path = await storage.local_path(key)
+    if src_path is None:
+        raise InvalidImage(f"{key} not found")
+    if _pending >= settings.image_max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер перегружен, попробуйте позже",
+            headers={"Retry-After": "5"},
+        )
+    _pending += 1
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            _pool(), _render, src_path, storage.staging_dir(), VARIANT_WIDTHS, tuple(FORMATS),
+        )
+    finally:
+        _pending -= 1
+    for width, fmt, tmp_path in rendered:
+        await storage.put_file(variant_key(key, width, fmt), tmp_path, f"image/{fmt}")
+    return keys
+
+
+async def save_image(upload: UploadFile, subdir: str, max_size: int) -> tuple[StoredFile, dict[str, dict[int, str]]]:
+    """Store an uploaded image with its variants; returns the original and the variant URLs."""
+    stored = await save_upload(upload, subdir, IMAGE_EXTENSIONS, max_size, default_ext=".png")
+    try:
+        await generate_variants(stored.key)
+    except InvalidImage:
+        await get_storage().delete(stored.key)
+        raise HTTPException(status_code=400, detail="Файл не является изображением")
+    return stored, variant_urls(stored.key)
+
+
+async def backfill(urls: list[str]) -> dict:
+    """Generate missing variants for already stored images (skips external URLs)."""
+    storage = get_storage()
+    keys = {
+        key for key in map(storage.key_from_url, urls)
+        if key and os.path.splitext(key)[1].lower() in IMAGE_EXTENSIONS
+    }
+    # Bounded so the backfill stays under the pending cap next to live uploads
+    semaphore = asyncio.Semaphore(settings.image_workers)
+    failed = 0
+
+    async def one(key: str):
+        nonlocal failed
+        async with semaphore:
+            try:
+                await generate_variants(key)
+            except InvalidImage as e:
+                print(f"[IMAGES] Skipping {key}: {e}")
+                failed += 1
+
+    await asyncio.gather(*(one(key) for key in sorted(keys)))
+    return {"images": len(keys), "failed": failed}
+
+
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
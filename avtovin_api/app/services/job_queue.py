@@ -0,0 +1,207 @@
+"""Background jobs: a Redis list queue drained by the worker process (app/worker.py).
+
+API handlers enqueue a job name with a JSON payload and return at once. Each
+worker process moves a job into its own processing list while it runs and
+keeps a heartbeat key alive; the lists of workers whose heartbeat expired
+(they died or stopped mid-job) are put back on the queue by the others. Failed
+jobs are retried with exponential backoff through a delayed sorted set and
+dropped, with a log line, after MAX_ATTEMPTS. Periodic jobs run under a
+Redis lock, so with several worker replicas each runs once per interval.
+
+Handlers are plain coroutines registered with @job / @periodic and called as
+handler(redis, **payload); they open their own DB sessions.
+"""
+
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+QUEUE_KEY = "jobs:queue"
+PROCESSING_KEY = "jobs:processing:{}"
+HEARTBEAT_KEY = "jobs:heartbeat:{}"
+WORKERS_KEY = "jobs:workers"
+DELAYED_KEY = "jobs:delayed"
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 5
+HEARTBEAT_SECONDS = 30
+
+# The consumers of one worker process share its processing list
+WORKER_ID = uuid4().hex
+
+Handler = Callable[..., Awaitable]
+
+_handlers: dict[str, Handler] = {}
+# name -> (interval seconds, handler)
+_periodic: dict[str, tuple[float, Handler]] = {}
+
+def job(name: str):
+    def register(fn: Handler) -> Handler:
+        _handlers[name] = fn
+        return fn
+    return register
+
+
+def periodic(name: str, seconds: float):
+    def register(fn: Handler) -> Handler:
+        _periodic[name] = (seconds, fn)
+        return fn
+    return register
+
+
+async def enqueue(redis: aioredis.Redis, name: str, **payload) -> str:
+    job_id = uuid4().hex
+    await redis.lpush(QUEUE_KEY, json.dumps({"id": job_id, "name": name, "payload": payload, "attempts": 0}))
+    return job_id
+
+
+async def enqueue_many(redis: aioredis.Redis, name: str, payloads: list[dict]) -> int:
+    """One round trip for a batch of jobs of the same kind."""
+    if not payloads:
+        return 0
+    await redis.lpush(QUEUE_KEY, *(
+        json.dumps({"id": uuid4().hex, "name": name, "payload": p, "attempts": 0}) for p in payloads
+    ))
+    return len(payloads)
+
+
+async def run_job(redis: aioredis.Redis, raw: str, worker_id: str = WORKER_ID):
+    """Run one popped job, scheduling a retry on failure, and ack it."""
+    item = json.loads(raw)
+    handler = _handlers.get(item["name"])
+    try:
+        if handler is None:
+            print(f"[JOBS] No handler for {item['name']}, dropping {item['id']}")
+        else:
+            await handler(redis, **item["payload"])
+    except Exception as e:
+        item["attempts"] += 1
+        if item["attempts"] < MAX_ATTEMPTS:
+            delay = RETRY_BASE_SECONDS * 2 ** (item["attempts"] - 1)
+            print(f"[JOBS] {item['name']} {item['id']} failed ({e!r}), retry {item['attempts']} in {delay}s")
+            await redis.zadd(DELAYED_KEY, {json.dumps(item): time.time() + delay})
+        else:
+            print(f"[JOBS] {item['name']} {item['id']} failed {item['attempts']} times, dropping: {e!r}")
+    finally:
+        await redis.lrem(PROCESSING_KEY.format(worker_id), 1, raw)
+
+
+async def process_next(redis: aioredis.Redis, timeout: float = 0, worker_id: str = WORKER_ID) -> bool:
+    """Pop and run one job; timeout 0 does not block. Returns whether a job ran."""
+    processing = PROCESSING_KEY.format(worker_id)
+    if timeout:
+        raw = await redis.blmove(QUEUE_KEY, processing, timeout, "RIGHT", "LEFT")
+    else:
+        raw = await redis.lmove(QUEUE_KEY, processing, "RIGHT", "LEFT")
+    if raw is None:
+        return False
+    await run_job(redis, raw, worker_id)
+    return True
+
+
+async def promote_delayed(redis: aioredis.Redis) -> int:
+    """Move retries whose time has come back onto the queue."""
+    moved = 0
+    for raw in await redis.zrangebyscore(DELAYED_KEY, "-inf", time.time(), start=0, num=100):
+        # zrem decides the owner when several workers promote at once
+        if await redis.zrem(DELAYED_KEY, raw):
+            await redis.lpush(QUEUE_KEY, raw)
+            moved += 1
+    return moved
+
+
+async def heartbeat(redis: aioredis.Redis, worker_id: str = WORKER_ID):
+    """Register the worker and keep its processing list its own for HEARTBEAT_SECONDS."""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.sadd(WORKERS_KEY, worker_id)
+        pipe.set(HEARTBEAT_KEY.format(worker_id), "1", ex=HEARTBEAT_SECONDS)
+        await pipe.execute()
+
+
+async def recover(redis: aioredis.Redis, worker_id: str = WORKER_ID) -> int:
+    """Requeue the jobs of workers whose heartbeat has expired; live workers' lists are left alone."""
+    moved = 0
+    for other in await redis.smembers(WORKERS_KEY):
+        if other == worker_id or await redis.exists(HEARTBEAT_KEY.format(other)):
+            continue
+        while await redis.lmove(PROCESSING_KEY.format(other), QUEUE_KEY, "RIGHT", "RIGHT") is not None:
+            moved += 1
+        await redis.srem(WORKERS_KEY, other)
+    return moved
+
+
+async def _run_periodic(redis: aioredis.Redis, name: str, handler: Handler):
+    try:
+        await handler(redis)
+    except Exception as e:
+        print(f"[JOBS] Periodic {name} failed: {e!r}")
+
+
+_running: dict[str, asyncio.Task] = {}
+
+
+async def run_due_periodic(redis: aioredis.Redis, last_run: dict[str, float]) -> list[asyncio.Task]:
+    """Start periodic jobs whose interval passed and whose cluster-wide lock we get.
+
+    Each runs as its own task (a long reconciliation must not stall retries),
+    and a job still running from the last interval is not started again.
+    """
+    started = []
+    now = time.monotonic()
+    for name, (seconds, handler) in _periodic.items():
+        if name in _running or now - last_run.get(name, float("-inf")) < seconds:
+            continue
+        last_run[name] = now
+        if not await redis.set(f"jobs:periodic:{name}", "1", nx=True, px=int(seconds * 1000)):
+            continue  # another replica ran it this interval
+        task = asyncio.create_task(_run_periodic(redis, name, handler))
+        _running[name] = task
+        task.add_done_callback(lambda _, name=name: _running.pop(name, None))
+        started.append(task)
+    return started
+
+
+async def run_worker(redis: aioredis.Redis, concurrency: int):
+    print(
+        f"[JOBS] Worker {WORKER_ID} started: {concurrency} consumers, "
+        f"{len(_handlers)} jobs, {len(_periodic)} periodic"
+    )
+    await heartbeat(redis)
+
+    async def consume():
+        while True:
+            try:
+                await process_next(redis, timeout=5)
+            except RedisError as e:
+                print(f"[JOBS] Redis error: {e}, retrying")
+                await asyncio.sleep(1)
+
+    async def schedule():
+        last_run: dict[str, float] = {}
+        last_recover = float("-inf")
+        while True:
+            try:
+                await heartbeat(redis)
+                if time.monotonic() - last_recover >= HEARTBEAT_SECONDS:
+                    last_recover = time.monotonic()
+                    recovered = await recover(redis)
+                    if recovered:
+                        print(f"[JOBS] Requeued {recovered} unfinished jobs of stopped workers")
+                await promote_delayed(redis)
+                await run_due_periodic(redis, last_run)
+            except RedisError as e:
+                print(f"[JOBS] Redis error in scheduler: {e}")
+            await asyncio.sleep(1)
+
+    try:
+        await asyncio.gather(schedule(), *(consume() for _ in range(concurrency)))
+    finally:
+        # Stopping: hand the jobs cut off mid-run to the other workers (or the next start) now
+        try:
+            await redis.delete(HEARTBEAT_KEY.format(WORKER_ID))
+        except RedisError:
+            pass
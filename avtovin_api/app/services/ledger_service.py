@@ -0,0 +1,178 @@
+"""Cashback ledger: balance_transactions rows plus running counters on users.
+
+Every balance change goes through post(), which inserts the transaction and
+bumps users.balance / total_earned / total_spent in one UPDATE in the same DB
+transaction, so the counters move with the rows and concurrent visits cannot
+lose each other's increments. Reads (the balance endpoint, dashboards) use
+the counters and never sum the ledger.
+
+reconcile() is the audit: run periodically by the worker, it recomputes the
+three counters from the transactions (hot and archived), users split into
+id-range chunks that are checked in parallel, and reports (does not fix)
+every user that drifted.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import redis.asyncio as aioredis
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.balance import BalanceTransaction
+from app.models.user import User
+from app.services.archive_service import all_transactions
+from app.services.job_queue import periodic
+
+EARN = "CASHBACK_EARN"
+SPEND = "CASHBACK_SPEND"
+ADJUSTMENT = "ADJUSTMENT"
+DRIFT_KEY = "ledger:drift"
+# Users listed in the stored report; the count covers all of them
+DRIFT_REPORT_LIMIT = 100
+
+
+class InsufficientBalance(ValueError):
+    pass
+
+
+async def post(
+    db: AsyncSession,
+    user_id: str,
+    amount: int,
+    type: str,
+    description: str,
+    visit_id: str | None = None,
+) -> BalanceTransaction:
+    """Record a transaction and move the user's counters with it (caller commits).
+
+    A debit that would take the balance below zero is refused by the UPDATE
+    itself, so two concurrent spends cannot both pass a stale check.
+    """
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            balance=User.balance + amount,
+            total_earned=User.total_earned + (amount if type == EARN else 0),
+            total_spent=User.total_spent + (-amount if type == SPEND else 0),
+        )
+        .returning(User.balance)
+        .execution_options(synchronize_session="fetch")
+    )
+    if amount < 0 and type != ADJUSTMENT:
+        stmt = stmt.where(User.balance >= -amount)
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise InsufficientBalance("Недостаточно кэшбэка на балансе")
+
+    txn = BalanceTransaction(
+        user_id=user_id, amount=amount, type=type, description=description, visit_id=visit_id,
+    )
+    db.add(txn)
+    return txn
+
+
+async def set_balance(db: AsyncSession, user: User, balance: int, description: str = "Корректировка баланса"):
+    """Admin correction: post the difference as an ADJUSTMENT instead of overwriting."""
+    if balance != user.balance:
+        await post(db, user.id, balance - user.balance, ADJUSTMENT, description)
+
+
+@dataclass
+class Drift:
+    user_id: str
+    balance: int
+    expected_balance: int
+    total_earned: int
+    expected_earned: int
+    total_spent: int
+    expected_spent: int
+
+
+async def _chunk_bounds(db: AsyncSession, chunk_size: int) -> list[str]:
+    """Every chunk_size-th user id: chunk i covers (bounds[i-1], bounds[i]]."""
+    numbered = select(User.id, func.row_number().over(order_by=User.id).label("n")).subquery()
+    bounds = list((await db.execute(
+        select(numbered.c.id).where(numbered.c.n % chunk_size == 0).order_by(numbered.c.id)
+    )).scalars())
+    last = (await db.execute(select(func.max(User.id)))).scalar()
+    if last is not None and (not bounds or bounds[-1] != last):
+        bounds.append(last)
+    return bounds
+
+
+async def _check_chunk(low: str | None, high: str) -> list[Drift]:
+    in_chunk = lambda col: and_(col > low, col <= high) if low is not None else col <= high  # noqa: E731
+    txns = all_transactions()  # archived months still count towards the balance
+    sums = (
+        select(
+            txns.c.user_id,
+            func.sum(txns.c.amount).label("balance"),
+            func.sum(case((txns.c.type == EARN, txns.c.amount), else_=0)).label("earned"),
+            func.sum(case((txns.c.type == SPEND, -txns.c.amount), else_=0)).label("spent"),
+        )
+        .where(in_chunk(txns.c.user_id))
+        .group_by(txns.c.user_id)
+        .subquery()
+    )
+    expected_balance = func.coalesce(sums.c.balance, 0)
+    expected_earned = func.coalesce(sums.c.earned, 0)
+    expected_spent = func.coalesce(sums.c.spent, 0)
+    query = (
+        select(
+            User.id, User.balance, expected_balance,
+            User.total_earned, expected_earned, User.total_spent, expected_spent,
+        )
+        .outerjoin(sums, sums.c.user_id == User.id)
+        .where(in_chunk(User.id))
+        .where(
+            (User.balance != expected_balance)
+            | (User.total_earned != expected_earned)
+            | (User.total_spent != expected_spent)
+        )
+    )
+    async with async_session() as db:
+        return [Drift(*row) for row in (await db.execute(query)).all()]
+
+
+async def reconcile(chunk_size: int | None = None, concurrency: int | None = None) -> tuple[int, list[Drift]]:
+    """Recompute every user's counters from the ledger; returns (users checked, drifts)."""
+    chunk_size = chunk_size or settings.ledger_reconcile_chunk_size
+    sem = asyncio.Semaphore(concurrency or settings.ledger_reconcile_concurrency)
+
+    async with async_session() as db:
+        bounds = await _chunk_bounds(db, chunk_size)
+        checked = (await db.execute(select(func.count(User.id)))).scalar() or 0
+
+    async def run(low: str | None, high: str) -> list[Drift]:
+        async with sem:
+            return await _check_chunk(low, high)
+
+    chunks = await asyncio.gather(*(run(bounds[i - 1] if i else None, high) for i, high in enumerate(bounds)))
+    return checked, [d for chunk in chunks for d in chunk]
+
+
+@periodic("ledger.reconcile", seconds=settings.ledger_reconcile_interval)
+async def reconcile_job(redis: aioredis.Redis):
+    started = datetime.utcnow()
+    checked, drifts = await reconcile()
+    report = {
+        "checkedAt": started.isoformat(),
+        "users": checked,
+        "drifted": len(drifts),
+        "drifts": [asdict(d) for d in drifts[:DRIFT_REPORT_LIMIT]],
+    }
+    await redis.set(DRIFT_KEY, json.dumps(report))
+    if drifts:
+        print(f"[LEDGER] {len(drifts)} of {checked} users drifted from their transactions, e.g. {drifts[0]}")
+    else:
+        print(f"[LEDGER] {checked} users reconciled, no drift")
+
+
+async def get_drift_report(redis: aioredis.Redis) -> dict | None:
+    raw = await redis.get(DRIFT_KEY)
+    return json.loads(raw) if raw else None
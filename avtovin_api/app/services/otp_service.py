@@ -0,0 +1,49 @@
+import re
+
+import redis.asyncio as aioredis
+
+OTP_TTL_SECONDS = 300
+MAX_ATTEMPTS = 5
+
+# Compare-and-delete in one round trip: a correct code is consumed, a wrong one
+# burns an attempt and the code is dropped after MAX_ATTEMPTS misses.
+_CHECK_OTP_LUA = """
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then
+    return 0
+end
+if code == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+if redis.call('HINCRBY', KEYS[1], 'attempts', 1) >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_phone(phone: str) -> str:
+    """+7XXXXXXXXXX, the form OTPs are issued for, from "+7 700 ...", "8700..." or "7700..."."""
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 11 and digits[0] in "78":
+        return "+7" + digits[1:]
+    return digits or phone.strip()
+
+
+def _key(phone: str) -> str:
+    return f"otp:{phone}"
+
+
+async def store_code(redis: aioredis.Redis, phone: str, code: str) -> int:
+    """Save a locally issued OTP (replacing any previous one); returns its TTL."""
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(_key(phone))
+        pipe.hset(_key(phone), mapping={"code": code, "attempts": 0})
+        pipe.expire(_key(phone), OTP_TTL_SECONDS)
+        await pipe.execute()
+    return OTP_TTL_SECONDS
+
+
+async def check_code(redis: aioredis.Redis, phone: str, code: str) -> bool:
+    return bool(await redis.eval(_CHECK_OTP_LUA, 1, _key(phone), code, MAX_ATTEMPTS))
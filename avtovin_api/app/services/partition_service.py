@@ -0,0 +1,142 @@
+"""Monthly range partitions of visits and balance_transactions (Postgres).
+
+Both tables are partitioned by created_at (migration 0005): a query bounded
+by time only touches the months it covers, every month has its own small
+indexes, and an old month can be detached and archived as a whole. Each
+table also has a DEFAULT partition so an insert outside the prepared months
+(a backdated import, or a worker down for longer than it plans ahead) still
+succeeds; it should stay empty.
+
+The worker creates partitions ahead of time (settings.partition_months_ahead)
+so inserts never wait on DDL. CREATE ... PARTITION OF needs a short exclusive
+lock on the parent, so it runs with a lock_timeout, one table and month per
+transaction, and a busy table is simply retried on the next run. A month that
+already has rows in the DEFAULT partition cannot be created over them: its
+table is built standalone, the rows are moved into it and it is attached.
+"""
+
+from datetime import date, datetime
+
+import redis.asyncio as aioredis
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.database import engine
+from app.services.job_queue import periodic
+
+PARTITIONED_TABLES = ("visits", "balance_transactions")
+LOCK_TIMEOUT = "2s"
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table: str) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+
+
+def months_between(first: date, last: date) -> list[date]:
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+async def _create_partition(conn: AsyncConnection, table: str, month: date):
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    default = default_partition_name(table)
+    in_month = f"created_at >= '{start}' AND created_at < '{end}'"
+    stray = (await conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_month} LIMIT 1"))).scalar()
+    if stray is None:
+        await conn.execute(text(create_partition_sql(table, month)))
+        return
+    # The month's rows are in the DEFAULT partition, which PARTITION OF would reject
+    name = partition_name(table, month)
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await conn.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_month} RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+    ))
+    # Attaching builds the parent's indexes on it
+    await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int | None = None) -> list[str]:
+    """Create missing partitions from this month through months_ahead; returns the ones created.
+
+    Each table and month commits on its own, so one that fails (a busy table)
+    does not hold back the others; it is reported and retried on the next run.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    this_month = month_start(datetime.utcnow())
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = set((await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ), {"table": table})).scalars())
+        await conn.commit()
+        for month in months_between(this_month, add_months(this_month, months_ahead)):
+            name = partition_name(table, month)
+            if name in existing:
+                continue
+            try:
+                await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                await _create_partition(conn, table, month)
+                await conn.commit()
+            except DBAPIError as e:
+                # Usually the lock_timeout on a busy table; the next run catches up
+                await conn.rollback()
+                print(f"[PARTITIONS] Could not create {name} yet: {e.orig}")
+                continue
+            created.append(name)
+    return created
+
+
+async def default_partition_rows(conn: AsyncConnection) -> dict[str, int]:
+    """Rows that fell outside the monthly partitions, per table (should all be 0)."""
+    counts = {}
+    for table in PARTITIONED_TABLES:
+        counts[table] = (await conn.execute(
+            text(f"SELECT count(*) FROM {default_partition_name(table)}")
+        )).scalar()
+    return counts
+
+
+@periodic("partitions.ensure", seconds=settings.partition_check_interval)
+async def ensure_partitions_job(redis: aioredis.Redis):
+    async with engine.connect() as conn:
+        if conn.dialect.name != "postgresql":
+            return
+        created = await ensure_partitions(conn)
+        if created:
+            print(f"[PARTITIONS] Created {', '.join(created)}")
+        stray = {t: n for t, n in (await default_partition_rows(conn)).items() if n}
+        if stray:
+            print(f"[PARTITIONS] Rows outside monthly partitions (default partition): {stray}")
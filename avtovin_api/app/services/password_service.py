@@ -0,0 +1,44 @@
+"""Async bcrypt: hashing runs in a small dedicated thread pool so a login never
+blocks the event loop. bcrypt releases the GIL, so the pool gives real
+parallelism; its size bounds CPU spent on hashing per worker, and the pending
+cap turns a login storm into fast 503s instead of an ever-growing queue."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import auth_service
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt",
+)
+_pending = 0
+
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер перегружен, попробуйте позже",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(plain: str) -> str:
+    return await _run(auth_service.hash_password, plain)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _run(auth_service.verify_password, plain, hashed)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,9 @@
 import os
 
+import redis.asyncio as aioredis
+
 from app.config import settings
+from app.services.job_queue import job
 
 _firebase_initialized = False
 
@@ -40,3 +43,9 @@ async def send_push(fcm_token: str, title: str, body: str, data: dict | None = N
         return True
     except Exception:
         return False
+
+
+@job("push.send")
+async def send_push_job(redis: aioredis.Redis, fcm_token: str, title: str, body: str, data: dict | None = None):
+    """Worker side of bulk pushes queued with enqueue_many (a failed send is not retried)."""
+    await send_push(fcm_token, title, body, data)
@@ -0,0 +1,130 @@
+"""Payment receipts uploaded by service centers.
+
+The app sends receipts as base64 (raw or a data: URL). They are decoded once
+and stored content-addressed under receipts/; settlements only keep the
+storage key, so a bulk upload covering several settlements stores one file
+and listing settlements no longer ships the blobs. Image receipts also get a
+small JPEG thumbnail for the admin list.
+"""
+
+import asyncio
+import base64
+import binascii
+import io
+import os
+import tempfile
+
+from app.services.storage import get_storage
+from app.services.upload_service import save_bytes
+
+RECEIPT_SUBDIR = "receipts"
+THUMB_SUBDIR = "receipts/thumbs"
+MAX_RECEIPT_SIZE = 10 * 1024 * 1024
+THUMB_SIZE = (320, 320)
+
+IMAGE_EXTENSIONS = {".jpg", ".png", ".webp"}
+
+
+class InvalidReceipt(Exception):
+    pass
+
+
+def _b64decode(value: str) -> bytes:
+    if value.startswith("data:"):
+        value = value.partition(",")[2]
+    return base64.b64decode("".join(value.split()), validate=True)
+
+
+def decode_base64(value: str) -> bytes:
+    try:
+        data = _b64decode(value)
+    except (binascii.Error, ValueError):
+        raise InvalidReceipt("Чек не является корректным base64")
+    if not data:
+        raise InvalidReceipt("Прикрепите чек")
+    if len(data) > MAX_RECEIPT_SIZE:
+        raise InvalidReceipt(f"Файл слишком большой (макс. {MAX_RECEIPT_SIZE // (1024 * 1024)}МБ)")
+    return data
+
+
+def sniff(data: bytes) -> tuple[str, str]:
+    """(extension, content type) from the file signature; the client's label is not trusted."""
+    if data.startswith(b"%PDF"):
+        return ".pdf", "application/pdf"
+    if data.startswith(b"\xff\xd8\xff"):
+        return ".jpg", "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png", "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return ".heic", "image/heic"
+    raise InvalidReceipt("Чек должен быть изображением или PDF")
+
+
+def thumbnail_key(key: str) -> str | None:
+    stem, ext = os.path.splitext(os.path.basename(key))
+    return f"{THUMB_SUBDIR}/{stem}.jpg" if ext in IMAGE_EXTENSIONS else None
+
+
+def receipt_urls(key: str | None) -> tuple[str | None, str | None]:
+    """(receipt url, thumbnail url) for a stored receipt key."""
+    if not key:
+        return None, None
+    storage = get_storage()
+    thumb = thumbnail_key(key)
+    return storage.public_url(key), storage.public_url(thumb) if thumb else None
+
+
+def _make_thumbnail(data: bytes, staging_dir: str) -> str | None:
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail(THUMB_SIZE)
+            fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix=".thumb-")
+            with os.fdopen(fd, "wb") as out:
+                img.save(out, "JPEG", quality=80, optimize=True)
+    except (OSError, ValueError) as e:
+        print(f"[RECEIPT] Thumbnail failed: {e}")
+        return None
+    return tmp_path
+
+
+async def store_receipt(data: bytes) -> str:
+    """Store a decoded receipt (and its thumbnail) and return the storage key."""
+    ext, content_type = sniff(data)
+    stored = await save_bytes(data, RECEIPT_SUBDIR, ext, content_type)
+
+    thumb = thumbnail_key(stored.key)
+    storage = get_storage()
+    if thumb and not await storage.exists(thumb):
+        tmp_path = await asyncio.to_thread(_make_thumbnail, data, storage.staging_dir())
+        if tmp_path:
+            await storage.put_file(thumb, tmp_path, "image/jpeg")
+    return stored.key
+
+
+async def store_receipt_base64(value: str) -> str:
+    return await store_receipt(decode_base64(value))
+
+
+async def store_legacy_receipt(value: str) -> str:
+    """Storage key for an old settlements.receipt_url value (see migrate.backfill_receipts).
+
+    Unlike uploads nothing is rejected: a blob that does not decode or is not
+    a known receipt type is stored byte for byte as application/octet-stream.
+    """
+    key = get_storage().key_from_url(value)
+    if key:
+        return key
+    try:
+        data = _b64decode(value) or value.encode()
+    except (binascii.Error, ValueError):
+        data = value.encode()
+    try:
+        return await store_receipt(data)
+    except InvalidReceipt:
+        stored = await save_bytes(data, RECEIPT_SUBDIR, ".bin", "application/octet-stream")
+        return stored.key
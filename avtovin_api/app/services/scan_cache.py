@@ -0,0 +1,114 @@
+"""Scan-session cache for the service center's VIN scan flow.
+
+Scanning a VIN runs GET /api/cars/by-vin, then POST /api/events/notify for
+the found car, then POST /api/visits with the same VIN. The first lookup
+loads the car, its owner and the active-warranty flag in one query and
+keeps them in Redis for settings.scan_cache_seconds under both the VIN and
+the car id; the other two calls read that entry instead of querying again.
+Lookups that may fill the cache take a primary session, never the replica.
+
+Misses are not cached (the visit may be about to create the car). Writes
+that change an entry's data (car edits and deletes, warranties, visits,
+owner edits and deletes) or add a car under a cached VIN call invalidate().
+Redis failures fall back to the database.
+"""
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.car import Car
+from app.models.user import User
+from app.schemas.car import CarByVinOut, CarOwnerBrief
+from app.services.warranty_status import active_warranty
+
+VIN_KEY = "scan:vin:{}"
+CAR_KEY = "scan:car:{}"
+
+
+def normalize_vin(vin: str) -> str:
+    return vin.upper().strip()
+
+
+async def _load(db: AsyncSession, where) -> CarByVinOut | None:
+    row = (await db.execute(
+        select(Car, User, active_warranty(Car.id))
+        .join(User, User.id == Car.user_id)
+        .where(where)
+        .order_by(Car.created_at.desc())
+        .limit(1)
+    )).first()
+    if row is None:
+        return None
+    car, owner, warranty = row
+    return CarByVinOut(
+        id=car.id, vin=car.vin, brand=car.brand, model=car.model, year=car.year,
+        plate_number=car.plate_number, mileage=car.mileage,
+        has_active_warranty=bool(warranty),
+        owner=CarOwnerBrief(id=owner.id, phone=owner.phone, name=owner.name),
+    )
+
+
+async def _cached(redis: aioredis.Redis, key: str) -> CarByVinOut | None:
+    try:
+        raw = await redis.get(key)
+    except RedisError as e:
+        print(f"[SCAN] Cache read failed: {e}")
+        return None
+    return CarByVinOut.model_validate_json(raw) if raw else None
+
+
+async def _store(redis: aioredis.Redis, entry: CarByVinOut, vin: str | None = None):
+    """Cache the entry under its car id, and under vin when it answers that VIN."""
+    raw = entry.model_dump_json()
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(CAR_KEY.format(entry.id), raw, ex=settings.scan_cache_seconds)
+            if vin:
+                pipe.set(VIN_KEY.format(vin), raw, ex=settings.scan_cache_seconds)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"[SCAN] Cache write failed: {e}")
+
+
+async def car_by_vin(redis: aioredis.Redis, db: AsyncSession, vin: str) -> CarByVinOut | None:
+    """The newest car with this VIN, its owner and warranty flag (db: a primary session)."""
+    vin = normalize_vin(vin)
+    entry = await _cached(redis, VIN_KEY.format(vin))
+    if entry is None:
+        entry = await _load(db, Car.vin == vin)
+        if entry is not None:
+            await _store(redis, entry, vin)
+    return entry
+
+
+async def car_by_id(redis: aioredis.Redis, db: AsyncSession, car_id: str) -> CarByVinOut | None:
+    """Same entry by car id (db: a primary session)."""
+    entry = await _cached(redis, CAR_KEY.format(car_id))
+    if entry is None:
+        entry = await _load(db, Car.id == car_id)
+        if entry is not None:
+            # Not under its VIN: the VIN key answers only the newest car with it
+            await _store(redis, entry)
+    return entry
+
+
+async def invalidate(redis: aioredis.Redis, *car_ids: str, vin: str | None = None):
+    """Drop the entries of these cars, and of a VIN a new car now answers (call after commit)."""
+    keys = [CAR_KEY.format(car_id) for car_id in car_ids]
+    if vin:
+        keys.append(VIN_KEY.format(normalize_vin(vin)))
+    if not keys:
+        return
+    try:
+        # A car's VIN key is found through its entry, so a changed VIN is dropped too
+        cached = await redis.mget(keys[:len(car_ids)]) if car_ids else []
+        for raw in cached:
+            cached_vin = CarByVinOut.model_validate_json(raw).vin if raw else None
+            if cached_vin:
+                keys.append(VIN_KEY.format(normalize_vin(cached_vin)))
+        await redis.delete(*keys)
+    except RedisError as e:
+        print(f"[SCAN] Cache invalidation failed for {car_ids or vin}: {e}")
@@ -0,0 +1,179 @@
+"""Where uploaded files live: the local uploads volume or an S3-compatible bucket.
+
+Files are addressed by key ("warranty-docs/<name>.pdf"); the URL stored in
+the DB is public_url(key). With STORAGE_BACKEND=s3 (AWS, MinIO, ...) clients
+can upload and download directly against the bucket via presigned URLs, so
+file bytes never pass through the API workers and any number of API nodes
+can share one store. boto3 is only imported when the S3 backend is used.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from app.config import settings
+
+LOCAL_URL_PREFIX = "/uploads/"
+
+
+class PresignNotSupported(Exception):
+    pass
+
+
+def _safe_join(root: str, key: str) -> str:
+    path = os.path.normpath(os.path.join(root, key))
+    if not path.startswith(os.path.normpath(root) + os.sep):
+        raise ValueError(f"Invalid storage key: {key}")
+    return path
+
+
+class LocalStorage:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return _safe_join(self.root, key)
+
+    def public_url(self, key: str) -> str:
+        return LOCAL_URL_PREFIX + key
+
+    def key_from_url(self, url: str) -> str | None:
+        url = url.split("?", 1)[0]  # ?v= cache busters
+        return url[len(LOCAL_URL_PREFIX):] if url.startswith(LOCAL_URL_PREFIX) else None
+
+    def staging_dir(self) -> str:
+        # Same filesystem as the final location, so put_file is a rename
+        path = os.path.join(self.root, ".staging")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    async def put_file(self, key: str, src_path: str, content_type: str | None = None):
+        """Move a finished file into place (src_path is consumed)."""
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.chmod(src_path, 0o644)
+        os.replace(src_path, dest)
+
+    async def local_path(self, key: str) -> str | None:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    async def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def presign_upload(self, key: str, content_type: str, max_size: int) -> dict:
+        raise PresignNotSupported()
+
+    def presign_download(self, key: str) -> str:
+        return self.public_url(key)
+
+
+class S3Storage:
+    def __init__(self):
+        import boto3
+        from botocore.config import Config
+
+        def client(endpoint_url: str):
+            return boto3.client(
+                "s3",
+                endpoint_url=endpoint_url or None,
+                region_name=settings.s3_region,
+                aws_access_key_id=settings.s3_access_key or None,
+                aws_secret_access_key=settings.s3_secret_key or None,
+                config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+            )
+
+        self.bucket = settings.s3_bucket
+        self.client = client(settings.s3_endpoint_url)
+        # Presigned URLs embed the host they were signed for, so sign with the
+        # address browsers use (e.g. public MinIO URL vs http://minio:9000)
+        self.presign_client = client(settings.s3_public_endpoint_url or settings.s3_endpoint_url)
+        self.expires = settings.s3_presign_expires
+        self._cache_dir = os.path.join(tempfile.gettempdir(), "avtovin-storage-cache")
+
+    def public_url(self, key: str) -> str:
+        if settings.s3_public_url:
+            return f"{settings.s3_public_url.rstrip('/')}/{key}"
+        # Private bucket: the stored URL stays API-relative and is resolved per request
+        return LOCAL_URL_PREFIX + key
+
+    def key_from_url(self, url: str) -> str | None:
+        url = url.split("?", 1)[0]
+        base = settings.s3_public_url.rstrip("/") + "/" if settings.s3_public_url else None
+        if base and url.startswith(base):
+            return url[len(base):]
+        return url[len(LOCAL_URL_PREFIX):] if url.startswith(LOCAL_URL_PREFIX) else None
+
+    def staging_dir(self) -> str:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        return self._cache_dir
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    async def put_file(self, key: str, src_path: str, content_type: str | None = None):
+        extra = {"ContentType": content_type} if content_type else {}
+        try:
+            await asyncio.to_thread(self.client.upload_file, src_path, self.bucket, key, ExtraArgs=extra)
+        finally:
+            os.unlink(src_path)
+
+    async def local_path(self, key: str) -> str | None:
+        """Download into a local cache (for code that needs a real file, e.g. Telegram)."""
+        from botocore.exceptions import ClientError
+
+        path = _safe_join(self._cache_dir, key)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.part"
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, key, tmp)
+        except ClientError:
+            return None
+        os.replace(tmp, path)
+        return path
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    def presign_upload(self, key: str, content_type: str, max_size: int) -> dict:
+        """Browser-style POST policy: the bucket itself enforces type and size."""
+        return self.presign_client.generate_presigned_post(
+            self.bucket, key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+            ExpiresIn=self.expires,
+        )
+
+    def presign_download(self, key: str) -> str:
+        if settings.s3_public_url:
+            return self.public_url(key)
+        return self.presign_client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.expires,
+        )
+
+
+_storage: LocalStorage | S3Storage | None = None
+
+
+def get_storage() -> LocalStorage | S3Storage:
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "s3":
+            _storage = S3Storage()
+        else:
+            _storage = LocalStorage(settings.upload_dir)
+    return _storage
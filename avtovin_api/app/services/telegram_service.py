@@ -1,76 +1,181 @@
+"""Telegram delivery to the configured group chat.
+
+Documents go out in media groups of up to 10 (Telegram's limit), one group
+after another, with files streamed from disk by httpx rather than read into
+memory; every handle is closed however the request ends. A token bucket
+keeps us under the per-chat rate limit and 429 answers are retried after
+the retry_after Telegram asks for. When a group is rejected its files are
+retried one by one, so the report says which file failed.
+"""
+
+import asyncio
 import json
+import os
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+
 import httpx
 
 from app.config import settings
 
+MEDIA_GROUP_SIZE = 10
+CAPTION_LIMIT = 1024
+MAX_RETRIES = 3
+
+
+@dataclass
+class FileStatus:
+    name: str
+    status: str  # sent | failed | missing
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TokenBucket:
+    """rate tokens per second, bursting up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1):
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# Each media group item counts as a message; groups of 10 must fit in one burst
+_bucket = TokenBucket(rate=settings.telegram_messages_per_minute / 60, capacity=MEDIA_GROUP_SIZE)
+_client: httpx.AsyncClient | None = None
+
+
+def is_configured() -> bool:
+    return bool(settings.telegram_bot_token and settings.telegram_chat_id)
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(60, connect=5))
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _call(method: str, messages: int, data: dict, paths: dict[str, str] | None = None) -> str | None:
+    """POST to the Bot API; returns None on success or the error description."""
+    url = f"https://api.telegram.org/bot{settings.telegram_bot_token}/{method}"
+    error = None
+    for _ in range(MAX_RETRIES):
+        await _bucket.acquire(messages)
+        try:
+            with ExitStack() as stack:
+                files = {
+                    field: (os.path.basename(path), stack.enter_context(open(path, "rb")))
+                    for field, path in (paths or {}).items()
+                }
+                resp = await _http().post(url, data=data, files=files or None)
+        except (OSError, httpx.HTTPError) as e:
+            error = str(e) or type(e).__name__
+            continue
+        if resp.status_code == 200:
+            return None
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        error = body.get("description") or f"HTTP {resp.status_code}"
+        if resp.status_code != 429:
+            return error
+        await asyncio.sleep(body.get("parameters", {}).get("retry_after", 1))
+    return error
+
 
 async def send_telegram(text: str) -> bool:
     """Send a message to the configured Telegram group chat."""
-    if not settings.telegram_bot_token or not settings.telegram_chat_id:
+    if not is_configured():
         return False
+    error = await _call("sendMessage", 1, {
+        "chat_id": settings.telegram_chat_id, "text": text, "parse_mode": "HTML",
+    })
+    if error:
+        print(f"[TELEGRAM] sendMessage failed: {error}")
+    return error is None
 
-    url = f"https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage"
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(url, json={
-                "chat_id": settings.telegram_chat_id,
-                "text": text,
-                "parse_mode": "HTML",
-            })
-            return resp.status_code == 200
-    except Exception:
-        return False
 
+async def _send_document(path: str, caption: str) -> str | None:
+    return await _call("sendDocument", 1, {
+        "chat_id": settings.telegram_chat_id, "caption": caption[:CAPTION_LIMIT],
+    }, {"document": path})
 
-async def send_telegram_documents(file_paths: list[str], caption: str = "") -> bool:
-    """Send multiple documents in a single Telegram message using sendMediaGroup."""
-    if not settings.telegram_bot_token or not settings.telegram_chat_id:
-        return False
-    if not file_paths:
-        return False
 
-    # Single file — use sendDocument for simplicity
-    if len(file_paths) == 1:
-        url = f"https://api.telegram.org/bot{settings.telegram_bot_token}/sendDocument"
-        try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                with open(file_paths[0], "rb") as f:
-                    fname = file_paths[0].split("/")[-1]
-                    resp = await client.post(url, data={
-                        "chat_id": settings.telegram_chat_id,
-                        "caption": caption[:1024] if caption else "",
-                    }, files={"document": (fname, f)})
-                return resp.status_code == 200
-        except Exception:
-            return False
-
-    # Multiple files — sendMediaGroup (up to 10 at a time)
-    url = f"https://api.telegram.org/bot{settings.telegram_bot_token}/sendMediaGroup"
-    try:
-        media = []
-        files_dict = {}
-        for i, fp in enumerate(file_paths[:10]):
-            attach_key = f"file{i}"
-            fname = fp.split("/")[-1]
-            files_dict[attach_key] = (fname, open(fp, "rb"))
-            item = {"type": "document", "media": f"attach://{attach_key}"}
-            if i == 0 and caption:
-                item["caption"] = caption[:1024]
-            media.append(item)
-
-        async with httpx.AsyncClient(timeout=60) as client:
-            resp = await client.post(url, data={
-                "chat_id": settings.telegram_chat_id,
-                "media": json.dumps(media),
-            }, files=files_dict)
-
-        # Close all file handles
-        for fh in files_dict.values():
-            fh[1].close()
-
-        return resp.status_code == 200
-    except Exception:
-        return False
+async def _send_group(paths: list[str], caption: str) -> list[FileStatus]:
+    if len(paths) == 1:
+        error = await _send_document(paths[0], caption)
+    else:
+        media = [{"type": "document", "media": f"attach://file{i}"} for i in range(len(paths))]
+        if caption:
+            media[0]["caption"] = caption[:CAPTION_LIMIT]
+        error = await _call("sendMediaGroup", len(paths), {
+            "chat_id": settings.telegram_chat_id, "media": json.dumps(media),
+        }, {f"file{i}": path for i, path in enumerate(paths)})
+        if error:
+            # Find out which file was refused
+            print(f"[TELEGRAM] sendMediaGroup failed ({error}), sending files one by one")
+            statuses = []
+            for i, path in enumerate(paths):
+                file_error = await _send_document(path, caption if i == 0 else "")
+                statuses.append(FileStatus(os.path.basename(path), "failed" if file_error else "sent", file_error))
+            return statuses
+    return [FileStatus(os.path.basename(p), "failed" if error else "sent", error) for p in paths]
+
+
+async def send_telegram_documents(file_paths: list[str | None], caption: str = "", names: list[str] | None = None) -> list[FileStatus]:
+    """Send documents in media groups of 10; returns a status per input file.
+
+    A None path (file not found in storage) is reported as missing; names,
+    when given, label the entries instead of the local file names.
+    """
+    statuses: list[FileStatus | None] = [None] * len(file_paths)
+    present = []
+    for i, path in enumerate(file_paths):
+        if path:
+            present.append(i)
+        else:
+            statuses[i] = FileStatus("", "missing")
+
+    if not is_configured():
+        for i in present:
+            statuses[i] = FileStatus(os.path.basename(file_paths[i]), "failed", "Telegram не настроен")
+    else:
+        chunks = [present[i:i + MEDIA_GROUP_SIZE] for i in range(0, len(present), MEDIA_GROUP_SIZE)]
+        for n, chunk in enumerate(chunks, 1):
+            part = f"{caption} ({n}/{len(chunks)})" if caption and len(chunks) > 1 else caption
+            for i, status in zip(chunk, await _send_group([file_paths[i] for i in chunk], part)):
+                statuses[i] = status
+
+    if names:
+        for status, label in zip(statuses, names):
+            status.name = label
+    return statuses
 
 
 def format_warranty_message(
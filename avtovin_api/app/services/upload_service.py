@@ -0,0 +1,114 @@
+"""Saving multipart uploads to the configured storage backend.
+
+By the time a handler runs, Starlette has spooled each part to a temporary
+file (BodySizeLimitMiddleware has already capped the request as a whole).
+save_upload copies a part into the backend's staging dir in one worker
+thread: 1MB chunks, sha256 computed on the way, aborting as soon as the
+per-file limit is passed. Files are keyed by content hash, so re-uploading
+the same document reuses the stored copy, and only appear in storage once
+complete.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+
+from app.services.storage import get_storage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredFile:
+    key: str
+    filename: str
+    url: str
+    sha256: str
+    size: int
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+def _copy_hashed(src: BinaryIO, staging_dir: str, max_size: int) -> tuple[str, str, int]:
+    """Stream src into a staging file; returns (tmp_path, sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLarge()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+async def save_upload(
+    upload: UploadFile, subdir: str, allowed_extensions: set[str], max_size: int,
+    default_ext: str = "",
+) -> StoredFile:
+    ext = os.path.splitext(upload.filename or "")[1].lower() or default_ext
+    if ext not in allowed_extensions:
+        raise HTTPException(status_code=400, detail=f"Недопустимый формат: {ext}")
+
+    storage = get_storage()
+    try:
+        tmp_path, sha256, size = await asyncio.to_thread(_copy_hashed, upload.file, storage.staging_dir(), max_size)
+    except FileTooLarge:
+        raise HTTPException(
+            status_code=413, detail=f"Файл слишком большой (макс. {max_size // (1024 * 1024)}МБ)",
+        )
+
+    return await _store(tmp_path, sha256, size, subdir, ext, upload.content_type)
+
+
+async def save_bytes(data: bytes, subdir: str, ext: str, content_type: str | None = None) -> StoredFile:
+    """Store content that is already in memory (e.g. decoded base64)."""
+    storage = get_storage()
+    tmp_path, sha256, size = await asyncio.to_thread(_copy_hashed, io.BytesIO(data), storage.staging_dir(), len(data))
+    return await _store(tmp_path, sha256, size, subdir, ext, content_type)
+
+
+async def _store(tmp_path: str, sha256: str, size: int, subdir: str, ext: str, content_type: str | None) -> StoredFile:
+    storage = get_storage()
+    filename = f"{sha256[:32]}{ext}"
+    key = f"{subdir}/{filename}"
+    if await storage.exists(key):
+        os.unlink(tmp_path)  # same content already stored
+    else:
+        await storage.put_file(key, tmp_path, content_type)
+    return StoredFile(key=key, filename=filename, url=storage.public_url(key), sha256=sha256, size=size)
+
+
+async def save_uploads(
+    uploads: list[UploadFile], subdir: str, allowed_extensions: set[str], max_size: int,
+) -> list[StoredFile]:
+    """Save several files in parallel threads; the request fails if any file does."""
+    for upload in uploads:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        if ext not in allowed_extensions:
+            raise HTTPException(status_code=400, detail=f"Недопустимый формат: {ext}")
+
+    results = await asyncio.gather(
+        *(save_upload(u, subdir, allowed_extensions, max_size) for u in uploads),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        # Files that did get saved stay: they are content-addressed and a retry
+        # of the same upload maps onto them
+        raise errors[0]
+    return results
@@ -0,0 +1,270 @@
+"""VIN decoding: offline WMI/model-year decoder backed by NHTSA vPIC.
+
+Lookups go process LRU -> Redis -> NHTSA. Decoded VINs are cached for a long
+time (a VIN never changes its make) and served stale while a background
+refresh runs; "not found" answers are cached briefly so repeated typos do not
+hit NHTSA. Concurrent lookups of one VIN share a single upstream request, and
+when NHTSA is down the offline decoder answers with make and model year.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import httpx
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.schemas.car import VinDecodeOut
+
+NHTSA_URL = "https://vpic.nhtsa.dot.gov/api/vehicles/decodevin"
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+FOUND_FRESH_SECONDS = 7 * 86400
+FOUND_STALE_SECONDS = 30 * 86400
+NOT_FOUND_SECONDS = 3600
+# Offline answers served while NHTSA is failing are only kept in-process
+OFFLINE_SECONDS = 60
+
+# Position 10 of the VIN; the cycle repeats every 30 years
+_YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+
+
+class VinUpstreamError(Exception):
+    pass
+
+
+def _load_json(name: str) -> dict:
+    with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Catalog brand names keyed by lowercase, so NHTSA's "TOYOTA" becomes "Toyota"
+_CATALOG_BRANDS = {name.strip().lower(): name for name in _load_json("car_catalog.json")}
+_CATALOG_BRANDS.update({"lada": "ВАЗ (Lada)", "mercedes": "Mercedes-Benz"})
+_WMI = {
+    code: brand for code, brand in _load_json("vin_wmi.json").items()
+    if brand.lower() in _CATALOG_BRANDS
+}
+
+
+def catalog_brand(make: str | None) -> str | None:
+    if not make:
+        return make
+    return _CATALOG_BRANDS.get(make.strip().lower(), make)
+
+
+def model_year(vin: str, today: datetime | None = None) -> int | None:
+    """Latest year matching the VIN year code that is not after next model year."""
+    idx = _YEAR_CODES.find(vin[9].upper())
+    if idx < 0:
+        return None
+    latest = (today or datetime.utcnow()).year + 1
+    year = 1980 + idx
+    while year + 30 <= latest:
+        year += 30
+    return year
+
+
+def decode_offline(vin: str) -> VinDecodeOut | None:
+    vin = vin.upper()
+    brand = _WMI.get(vin[:3])
+    if not brand:
+        return None
+    return VinDecodeOut(vin=vin, brand=brand, year=model_year(vin))
+
+
+def _parse_nhtsa(vin: str, data: dict) -> VinDecodeOut | None:
+    results = data.get("Results", [])
+    values = {r["Variable"]: r["Value"] for r in results if r.get("Value") and r["Value"].strip()}
+
+    brand = values.get("Make")
+    model = values.get("Model")
+    if not brand and not model:
+        return None
+
+    year_str = values.get("Model Year")
+    year = int(year_str) if year_str and year_str.isdigit() else None
+
+    elec = (values.get("ElectrificationLevel") or "").lower()
+    fuel = (values.get("FuelTypePrimary") or "").lower()
+    if "bev" in elec or "electric" in fuel:
+        engine_type = "ELECTRIC"
+    elif "hybrid" in elec or "hybrid" in fuel:
+        engine_type = "HYBRID"
+    else:
+        engine_type = "ICE"
+
+    offline = decode_offline(vin)
+    return VinDecodeOut(
+        vin=vin,
+        brand=catalog_brand(brand) or (offline.brand if offline else None),
+        model=model,
+        year=year or (offline.year if offline else None),
+        engine_type=engine_type,
+        fuel_type=values.get("FuelTypePrimary"),
+        vehicle_type=values.get("BodyClass"),
+        manufacturer=values.get("Manufacturer"),
+    )
+
+
+# --- upstream ---------------------------------------------------------------
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(5, connect=2),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_nhtsa(vin: str) -> VinDecodeOut | None:
+    """Decode via vPIC; None when NHTSA does not know the VIN."""
+    try:
+        resp = await _http().get(f"{NHTSA_URL}/{vin}", params={"format": "json"})
+        resp.raise_for_status()
+        data = resp.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise VinUpstreamError(str(e)) from e
+    return _parse_nhtsa(vin, data)
+
+
+# --- caches -----------------------------------------------------------------
+# An entry is {"v": payload or None, "fresh": unix time it stays fresh until}.
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+
+    def get(self, key: str) -> dict | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        entry, expires = item
+        if expires <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: dict, ttl: float):
+        self._data[key] = (entry, time.time() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+_lru = _LRU(maxsize=2048)
+_inflight: dict[str, asyncio.Task] = {}
+_background: set[asyncio.Task] = set()
+
+
+def _cache_key(vin: str) -> str:
+    return f"vin:v2:{vin}"
+
+
+async def _redis_get(redis: aioredis.Redis, vin: str) -> dict | None:
+    try:
+        raw = await redis.get(_cache_key(vin))
+    except RedisError:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _store(redis: aioredis.Redis, vin: str, result: VinDecodeOut | None) -> dict:
+    now = time.time()
+    if result is None:
+        entry, fresh, ttl = {"v": None}, NOT_FOUND_SECONDS, NOT_FOUND_SECONDS
+    else:
+        entry = {"v": result.model_dump(by_alias=True)}
+        fresh, ttl = FOUND_FRESH_SECONDS, FOUND_FRESH_SECONDS + FOUND_STALE_SECONDS
+    entry["fresh"] = now + fresh
+    _lru.set(vin, entry, ttl)
+    try:
+        await redis.setex(_cache_key(vin), ttl, json.dumps(entry))
+    except RedisError:
+        pass
+    return entry
+
+
+async def _load(redis: aioredis.Redis, vin: str) -> dict:
+    try:
+        result = await fetch_nhtsa(vin)
+    except VinUpstreamError as e:
+        print(f"[VIN] NHTSA decode failed for {vin}: {e}")
+        stale = _lru.get(vin)
+        if stale is not None and stale["v"] is not None and not stale.get("offline"):
+            # Failed background refresh: keep serving the stale answer, retry later
+            stale = {**stale, "fresh": time.time() + OFFLINE_SECONDS}
+            _lru.set(vin, stale, FOUND_STALE_SECONDS)
+            return stale
+        offline = decode_offline(vin)
+        entry = {"v": offline.model_dump(by_alias=True) if offline else None, "offline": True}
+        _lru.set(vin, entry, OFFLINE_SECONDS)
+        return entry
+    return await _store(redis, vin, result)
+
+
+def _load_once(redis: aioredis.Redis, vin: str) -> asyncio.Task:
+    """Start (or join) the single upstream lookup for this VIN."""
+    task = _inflight.get(vin)
+    if task is None:
+        task = asyncio.create_task(_load(redis, vin))
+        _inflight[vin] = task
+        task.add_done_callback(lambda _: _inflight.pop(vin, None))
+    return task
+
+
+def _revalidate(redis: aioredis.Redis, vin: str):
+    if vin in _inflight:
+        return
+    task = _load_once(redis, vin)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def decode(redis: aioredis.Redis, vin: str) -> VinDecodeOut | None:
+    """Decoded VIN, or None when NHTSA does not know it.
+
+    Raises VinUpstreamError when NHTSA is unreachable and the offline table
+    does not know the manufacturer either.
+    """
+    vin = vin.upper()
+
+    entry = _lru.get(vin)
+    if entry is None:
+        entry = await _redis_get(redis, vin)
+        if entry is not None:
+            stale_for = FOUND_STALE_SECONDS if entry["v"] is not None else 0
+            _lru.set(vin, entry, max(entry["fresh"] - time.time(), 0) + stale_for)
+    if entry is not None and entry.get("fresh", 0) <= time.time() and not entry.get("offline"):
+        # Stale: answer now, refresh in the background
+        _revalidate(redis, vin)
+    if entry is None:
+        # shield: a client disconnect must not cancel the lookup other callers wait on
+        entry = await asyncio.shield(_load_once(redis, vin))
+
+    if entry["v"] is None:
+        if entry.get("offline"):
+            raise VinUpstreamError("NHTSA unavailable")
+        return None
+    return VinDecodeOut.model_validate(entry["v"])
@@ -1,15 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import String, column, func, select, true, values
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.balance import BalanceTransaction
+from app.models.archive import ArchivedVisit
 from app.models.car import Car
 from app.models.service import Service
 from app.models.service_center import ServiceCenter, ServiceCenterService
 from app.models.user import User
 from app.models.visit import Visit, VisitService
+from app.schemas.visit import CarBriefForVisit, ScBriefForVisit, UserBriefForVisit, VisitOut, VisitServiceOut
+from app.services import ledger_service
 
 
 async def create_visit(
@@ -214,26 +216,77 @@ async def _finalize_visit(
         if mileage:
             car.last_service_mileage = mileage
 
-    # Balance transactions
+    # Ledger: transactions and the owner's balance counters move together.
+    # Spend first: cashback earned on this visit cannot pay for it.
+    if cashback_used > 0:
+        await ledger_service.post(db, owner.id, -cashback_used, ledger_service.SPEND, "Списание кэшбэка", visit.id)
     if cashback > 0:
-        db.add(BalanceTransaction(
-            user_id=owner.id,
-            amount=cashback,
-            type="CASHBACK_EARN",
-            description=f"Кэшбэк за визит",
-            visit_id=visit.id,
-        ))
+        await ledger_service.post(db, owner.id, cashback, ledger_service.EARN, "Кэшбэк за визит", visit.id)
 
-    if cashback_used > 0:
-        db.add(BalanceTransaction(
-            user_id=owner.id,
-            amount=-cashback_used,
-            type="CASHBACK_SPEND",
-            description=f"Списание кэшбэка",
-            visit_id=visit.id,
-        ))
+    await db.flush()
 
-    # Update user balance
-    owner.balance += (cashback - cashback_used)
 
-    await db.flush()
+async def latest_visits(db: AsyncSession, car_ids: list[str], per_car: int) -> dict[str, list[Visit]]:
+    """The per_car most recent visits of each car (with service center), newest first.
+
+    On Postgres a LATERAL ... LIMIT per car reads only those rows from the
+    (car_id, created_at) index, however long the cars' histories are.
+    Elsewhere (SQLite in tests) a row_number() window ranks all their visits.
+    """
+    if not car_ids:
+        return {}
+    if (await db.connection()).dialect.name == "postgresql":
+        cars = values(column("car_id", String), name="cars").data([(car_id,) for car_id in car_ids])
+        latest = (
+            select(Visit.id, Visit.created_at)
+            .where(Visit.car_id == cars.c.car_id)
+            .order_by(Visit.created_at.desc(), Visit.id.desc())
+            .limit(per_car)
+            .lateral()
+        )
+        picked = select(latest.c.id, latest.c.created_at).select_from(cars).join(latest, true()).subquery()
+    else:
+        ranked = (
+            select(
+                Visit.id, Visit.created_at,
+                func.row_number().over(
+                    partition_by=Visit.car_id, order_by=(Visit.created_at.desc(), Visit.id.desc()),
+                ).label("rn"),
+            )
+            .where(Visit.car_id.in_(car_ids))
+            .subquery()
+        )
+        picked = select(ranked.c.id, ranked.c.created_at).where(ranked.c.rn <= per_car).subquery()
+    result = await db.execute(
+        select(Visit)
+        .join(picked, (picked.c.id == Visit.id) & (picked.c.created_at == Visit.created_at))
+        .options(selectinload(Visit.service_center))
+        .order_by(Visit.car_id, Visit.created_at.desc(), Visit.id.desc())
+    )
+    by_car: dict[str, list[Visit]] = {car_id: [] for car_id in car_ids}
+    for visit in result.scalars():
+        by_car[visit.car_id].append(visit)
+    return by_car
+
+
+def visit_out(v: Visit | ArchivedVisit) -> VisitOut:
+    """API shape of a hot or archived visit (car, owner and service center loaded)."""
+    car_brief = None
+    if v.car:
+        user_brief = None
+        if v.car.user:
+            user_brief = UserBriefForVisit(name=v.car.user.name, phone=v.car.user.phone)
+        car_brief = CarBriefForVisit(
+            brand=v.car.brand, model=v.car.model,
+            plate_number=v.car.plate_number, user=user_brief,
+        )
+    sc_brief = None
+    if v.service_center:
+        sc_brief = ScBriefForVisit(name=v.service_center.name, type=v.service_center.type)
+    return VisitOut(
+        **{c.key: getattr(v, c.key) for c in Visit.__table__.columns},
+        services=[VisitServiceOut.model_validate(s) for s in v.services],
+        car=car_brief,
+        service_center=sc_brief,
+        archived=isinstance(v, ArchivedVisit),
+    )
@@ -0,0 +1,96 @@
+"""Warranty notifications to the Telegram group, run by the background worker.
+
+create_warranty and the send-docs endpoint only enqueue. The worker sends the
+summary message, then the attached documents, and keeps a per-file delivery
+report that GET /api/warranties/{id}/telegram-status returns. The two steps
+are separate jobs so a retry of the documents never repeats the message.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models.warranty import Warranty
+from app.services import telegram_service
+from app.services.job_queue import enqueue, job
+from app.services.storage import get_storage
+
+UPLOAD_SUBDIR = "warranty-docs"
+REPORT_TTL = 7 * 86400
+
+
+def report_key(warranty_id: str) -> str:
+    return f"tg:delivery:{warranty_id}"
+
+
+async def doc_local_path(url: str) -> str | None:
+    """Local file for a stored document URL (downloaded first when storage is remote)."""
+    storage = get_storage()
+    key = storage.key_from_url(url) or f"{UPLOAD_SUBDIR}/{url.split('/')[-1]}"
+    try:
+        return await storage.local_path(key)
+    except ValueError:
+        return None
+
+
+async def _load(warranty_id: str) -> Warranty | None:
+    async with async_session() as db:
+        return (await db.execute(select(Warranty).where(Warranty.id == warranty_id))).scalar_one_or_none()
+
+
+@job("warranty.created")
+async def warranty_created(redis: aioredis.Redis, warranty_id: str, phone: str = "", manager_name: str | None = None):
+    warranty = await _load(warranty_id)
+    if warranty is None or not telegram_service.is_configured():
+        return
+    msg = telegram_service.format_warranty_message(
+        contract_number=warranty.contract_number,
+        client_name=warranty.client_name,
+        phone=phone,
+        brand=warranty.brand,
+        model=warranty.model,
+        year=warranty.year,
+        vin=warranty.vin,
+        start_date=warranty.start_date.strftime("%d.%m.%Y"),
+        end_date=warranty.end_date.strftime("%d.%m.%Y"),
+        manager_name=manager_name,
+    )
+    if not await telegram_service.send_telegram(msg):
+        raise RuntimeError("Telegram message not delivered")
+    if warranty.doc_urls:
+        await enqueue(redis, "warranty.send_docs", warranty_id=warranty_id)
+
+
+@job("warranty.send_docs")
+async def send_docs(redis: aioredis.Redis, warranty_id: str):
+    warranty = await _load(warranty_id)
+    if warranty is None:
+        return
+    urls = [u.strip() for u in (warranty.doc_urls or "").split(",") if u.strip()]
+    paths = [await doc_local_path(url) for url in urls]
+    statuses = await telegram_service.send_telegram_documents(
+        paths, f"📎 {warranty.contract_number} — {warranty.client_name}",
+        names=[os.path.basename(url) for url in urls],
+    )
+
+    sent = sum(s.status == "sent" for s in statuses)
+    report = {
+        "total": len(statuses),
+        "sent": sent,
+        "files": [s.to_dict() for s in statuses],
+        "updatedAt": datetime.utcnow().isoformat(),
+    }
+    await redis.setex(report_key(warranty_id), REPORT_TTL, json.dumps(report))
+    failed = [s for s in statuses if s.status == "failed"]
+    if failed and not sent and telegram_service.is_configured():
+        # Nothing got through (Telegram down?): let the queue retry the whole batch
+        raise RuntimeError(f"{len(failed)} documents not delivered: {failed[0].error}")
+
+
+async def get_report(redis: aioredis.Redis, warranty_id: str) -> dict | None:
+    raw = await redis.get(report_key(warranty_id))
+    return json.loads(raw) if raw else None
@@ -0,0 +1,174 @@
+"""Warranty status kept ahead of the readers.
+
+Readers never compute "active" from end_date. Three things are kept ahead
+of them:
+
+- warranties.is_active: the worker's expiry sweep clears it, in batches,
+  once end_date has passed, so filters read the flag alone. It records
+  expired_at, so that extending the warranty (revive()) makes it active
+  again, unlike one a manager deactivated;
+- users.active_warranties: each warranty manager's count of active
+  warranties they created, moved by every write that changes one;
+- car_warranty_status: one row per car with an active warranty (the
+  latest end_date among them in active_until). Warranty writes call
+  refresh() for the cars they touch and the sweep drops rows whose
+  active_until has passed. active_warranty() semi/anti-joins it and also
+  checks active_until, so a car whose sweep is pending is already out.
+
+The reminder job pushes owners whose warranty ends within
+settings.warranty_expiry_notice_days, once per warranty, queued in bulk.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import redis.asyncio as aioredis
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.user import User
+from app.models.warranty import CarWarrantyStatus, Warranty
+from app.services.job_queue import enqueue_many, periodic
+
+
+def active_warranty(car_id_column, now: datetime | None = None):
+    """EXISTS for "the car has an active warranty"; negate it for the anti-join."""
+    return select(CarWarrantyStatus.car_id).where(
+        CarWarrantyStatus.car_id == car_id_column,
+        CarWarrantyStatus.active_until >= (now or datetime.utcnow()),
+    ).exists()
+
+
+async def refresh(db: AsyncSession, *car_ids: str):
+    """Recompute the status rows of these cars from their warranties (caller commits)."""
+    car_ids = [c for c in set(car_ids) if c]
+    if not car_ids:
+        return
+    await db.execute(delete(CarWarrantyStatus).where(CarWarrantyStatus.car_id.in_(car_ids)))
+    await db.execute(insert(CarWarrantyStatus).from_select(
+        ["car_id", "active_until"],
+        select(Warranty.car_id, func.max(Warranty.end_date))
+        .where(
+            Warranty.car_id.in_(car_ids),
+            Warranty.is_active == True,  # noqa: E712
+            Warranty.end_date >= datetime.utcnow(),
+        )
+        .group_by(Warranty.car_id),
+    ))
+
+
+async def count_active(db: AsyncSession, manager_id: str, delta: int):
+    """Move a manager's active warranty counter (caller commits)."""
+    if delta:
+        await db.execute(
+            update(User)
+            .where(User.id == manager_id)
+            .values(active_warranties=User.active_warranties + delta)
+            .execution_options(synchronize_session="fetch")
+        )
+
+
+async def expire_batch(db: AsyncSession, now: datetime, limit: int) -> int:
+    """Deactivate up to limit ended warranties and their managers' counts (caller commits)."""
+    due = (
+        select(Warranty.id)
+        .where(Warranty.is_active == True, Warranty.end_date < now)  # noqa: E712
+        .limit(limit)
+        .scalar_subquery()
+    )
+    expired = (await db.execute(
+        update(Warranty)
+        .where(Warranty.id.in_(due))
+        .values(is_active=False, expired_at=now)
+        .returning(Warranty.created_by_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    for manager_id, n in Counter(expired).items():
+        await count_active(db, manager_id, -n)
+    return len(expired)
+
+
+def revive(warranty: Warranty, now: datetime | None = None):
+    """Reactivate a sweep-expired warranty whose end_date has moved into the future."""
+    if warranty.expired_at is not None and warranty.end_date >= (now or datetime.utcnow()):
+        warranty.is_active = True
+        warranty.expired_at = None
+
+
+async def sweep(db: AsyncSession, now: datetime | None = None) -> int:
+    """Drop the rows of cars whose last active warranty has ended (caller commits)."""
+    result = await db.execute(
+        delete(CarWarrantyStatus).where(CarWarrantyStatus.active_until < (now or datetime.utcnow()))
+    )
+    return result.rowcount
+
+
+@periodic("warranties.status_sweep", seconds=settings.warranty_sweep_interval)
+async def sweep_job(redis: aioredis.Redis):
+    now = datetime.utcnow()
+    expired = 0
+    # One transaction per batch keeps row locks short next to warranty edits
+    while True:
+        async with async_session() as db:
+            n = await expire_batch(db, now, settings.warranty_sweep_batch_size)
+            await db.commit()
+        expired += n
+        if n < settings.warranty_sweep_batch_size:
+            break
+    async with async_session() as db:
+        cars = await sweep(db, now)
+        await db.commit()
+    if expired or cars:
+        print(f"[WARRANTY] {expired} warranties expired, {cars} cars no longer have an active warranty")
+
+
+def _reminder(fcm_token: str, warranty_id: str, contract_number: str, end_date: datetime) -> dict:
+    return {
+        "fcm_token": fcm_token,
+        "title": "Гарантия скоро закончится",
+        "body": f"Гарантия по договору {contract_number} действует до {end_date:%d.%m.%Y}",
+        "data": {"type": "warranty_expiring", "warrantyId": warranty_id},
+    }
+
+
+async def queue_expiry_reminders(redis: aioredis.Redis, now: datetime | None = None) -> int:
+    """Queue pushes for warranties ending soon that have not been reminded; returns pushes queued."""
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(days=settings.warranty_expiry_notice_days)
+    queued = 0
+    while True:
+        async with async_session() as db:
+            rows = (await db.execute(
+                select(Warranty.id, Warranty.contract_number, Warranty.end_date, User.fcm_token)
+                .join(User, User.id == Warranty.user_id)
+                .where(
+                    Warranty.is_active == True,  # noqa: E712
+                    Warranty.end_date >= now,
+                    Warranty.end_date < horizon,
+                    Warranty.expiry_notified_at.is_(None),
+                )
+                .order_by(Warranty.end_date)
+                .limit(settings.warranty_sweep_batch_size)
+            )).all()
+            if not rows:
+                return queued
+            # Queued before marking: a crash in between repeats a reminder rather than losing it
+            queued += await enqueue_many(redis, "push.send", [
+                _reminder(r.fcm_token, r.id, r.contract_number, r.end_date) for r in rows if r.fcm_token
+            ])
+            await db.execute(
+                update(Warranty)
+                .where(Warranty.id.in_([r.id for r in rows]))
+                .values(expiry_notified_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+
+@periodic("warranties.expiry_reminders", seconds=settings.warranty_reminder_interval)
+async def expiry_reminders_job(redis: aioredis.Redis):
+    queued = await queue_expiry_reminders(redis)
+    if queued:
+        print(f"[WARRANTY] {queued} expiring-soon reminders queued")
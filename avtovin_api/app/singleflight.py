@@ -0,0 +1,178 @@
+"""Collapse concurrent identical reads into one computation.
+
+Decorate a read-only route whose result does not depend on the caller:
+
+    @router.get("/brands")
+    @singleflight("catalog-brands")
+    async def list_brands(db: AsyncSession = Depends(get_db)): ...
+
+Calls are keyed by the route name plus its scalar arguments (query and path
+parameters); sessions, requests and users are ignored. While one call for a
+key is running, others in the same process await its result. The computation
+can outlive the request that started it, so it runs on its own DB session
+(same engine) instead of that request's. A caller pinned to the primary
+after a write (a read session on the primary while a replica is configured,
+see database.read_sessionmaker) runs the route itself: joining a read that
+started earlier could miss its own write. With redis_lock=True the first worker to take a short Redis lock computes and
+publishes the result for share_ms, and other workers read it instead of
+querying. This is coalescing, not caching: nothing outlives the computation
+by more than share_ms.
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import time
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+import orjson
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app import database, metrics
+from app.responses import ORJSON_OPTIONS, to_jsonable
+
+METRIC = "singleflight_calls_total"
+metrics.describe(METRIC, "Singleflight calls by outcome (leader, coalesced in-process, redis, pinned to the primary)")
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_inflight: dict[tuple, asyncio.Task] = {}
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _call_key(name: str, kwargs: dict) -> tuple:
+    return (name, *sorted((k, v) for k, v in kwargs.items() if isinstance(v, _SCALARS)))
+
+
+def _pinned(kwargs: dict) -> bool:
+    return database.read_engine is not database.engine and any(
+        isinstance(v, AsyncSession) and v.bind is database.engine for v in kwargs.values()
+    )
+
+
+def _share(result: Any) -> Any:
+    # Middleware may append to a Response's header list while sending it,
+    # so every caller (the leader too) gets its own copy
+    if isinstance(result, Response):
+        clone = copy.copy(result)
+        clone.raw_headers = list(result.raw_headers)
+        return clone
+    return result
+
+
+def _dump(result: Any) -> str:
+    if isinstance(result, Response):
+        return "R" + orjson.dumps({
+            "status": result.status_code,
+            "media_type": result.media_type,
+            "body": result.body.decode(),
+        }).decode()
+    return "V" + orjson.dumps(to_jsonable(result), option=ORJSON_OPTIONS).decode()
+
+
+def _load(raw: str) -> Any:
+    data = orjson.loads(raw[1:])
+    if raw[0] == "R":
+        return Response(content=data["body"], status_code=data["status"], media_type=data["media_type"])
+    return data
+
+
+async def _compute_shared(
+    redis, name: str, key: tuple, compute: Callable[[], Awaitable[Any]],
+    lock_ms: int, share_ms: int,
+) -> Any:
+    digest = orjson.dumps(key[1:]).decode()
+    lock_key, result_key = f"sf:{name}:lock:{digest}", f"sf:{name}:result:{digest}"
+    token = uuid4().hex
+    try:
+        raw = await redis.get(result_key)
+        if raw is not None:
+            metrics.inc(METRIC, name=name, outcome="redis")
+            return _load(raw)
+        locked = await redis.set(lock_key, token, nx=True, px=lock_ms)
+    except RedisError:
+        return await compute()
+
+    if locked:
+        try:
+            result = await compute()
+            try:
+                await redis.set(result_key, _dump(result), px=share_ms)
+            except RedisError:
+                pass
+            return result
+        finally:
+            try:
+                await redis.eval(_RELEASE_LUA, 1, lock_key, token)
+            except RedisError:
+                pass
+
+    # Another worker is computing: poll for its result until its lock would expire
+    deadline = time.monotonic() + lock_ms / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+        try:
+            raw = await redis.get(result_key)
+        except RedisError:
+            break
+        if raw is not None:
+            metrics.inc(METRIC, name=name, outcome="redis")
+            return _load(raw)
+    return await compute()
+
+
+def singleflight(name: str, *, redis_lock: bool = False, lock_ms: int = 2000, share_ms: int = 1000):
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            request: Request | None = kwargs.pop("_sf_request", None)
+            if _pinned(kwargs):
+                metrics.inc(METRIC, name=name, outcome="pinned")
+                return await fn(*args, **kwargs)
+            key = _call_key(name, kwargs)
+
+            task = _inflight.get(key)
+            if task is not None:
+                metrics.inc(METRIC, name=name, outcome="coalesced")
+                return _share(await asyncio.shield(task))
+
+            async def compute():
+                metrics.inc(METRIC, name=name, outcome="leader")
+                sessions = {
+                    k: AsyncSession(v.bind, expire_on_commit=False)
+                    for k, v in kwargs.items() if isinstance(v, AsyncSession)
+                }
+                try:
+                    return await fn(*args, **{**kwargs, **sessions})
+                finally:
+                    for session in sessions.values():
+                        await session.close()
+
+            if request is not None:
+                coro = _compute_shared(request.app.state.redis, name, key, compute, lock_ms, share_ms)
+            else:
+                coro = compute()
+            task = asyncio.create_task(coro)
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+            return _share(await asyncio.shield(task))
+
+        if redis_lock:
+            # Ask FastAPI for the Request so the wrapper can reach app.state.redis
+            sig = inspect.signature(fn)
+            extra = inspect.Parameter("_sf_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            wrapper.__signature__ = sig.replace(parameters=[*sig.parameters.values(), extra])
+        return wrapper
+
+    return decorator
@@ -1,18 +1,26 @@
 import asyncio
-from unittest.mock import AsyncMock, patch
+import tempfile
+from unittest.mock import patch
 
+import fakeredis
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.models.base import Base
 from app.models import *  # noqa — register all models
+from app.services import catalog_index
 from app.services.auth_service import create_token, hash_password
 
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 
+# Minimum bcrypt cost keeps password fixtures and logins fast
+settings.bcrypt_rounds = 4
+settings.upload_dir = tempfile.mkdtemp(prefix="avtovin-uploads-")
+
 engine = create_async_engine(TEST_DB_URL, echo=False)
 TestSession = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -31,6 +39,7 @@ async def setup_db():
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    catalog_index.invalidate()
 
 
 async def override_get_db():
@@ -51,15 +60,12 @@ async def db():
 async def client():
     from app.main import app
 
-    # Mock Redis
-    mock_redis = AsyncMock()
-    mock_redis.get = AsyncMock(return_value=None)
-    mock_redis.setex = AsyncMock()
-    mock_redis.publish = AsyncMock()
-    mock_redis.close = AsyncMock()
+    # In-process Redis (runs the Lua scripts too), fresh for every test
+    fake_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
 
     app.dependency_overrides[get_db] = override_get_db
-    app.state.redis = mock_redis
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.state.redis = fake_redis
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -68,6 +74,7 @@ async def client():
         yield ac
 
     app.dependency_overrides.clear()
+    await fake_redis.aclose()
 
 
 @pytest_asyncio.fixture
@@ -1,7 +1,10 @@
+import runpy
+from pathlib import Path
 from unittest.mock import patch, AsyncMock
 
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
@@ -51,6 +54,23 @@ class TestVerifyCode:
         })
         assert resp.status_code == 401
 
+    async def test_verify_code_locked_after_max_attempts(self, client: AsyncClient, monkeypatch):
+        from app.config import settings
+        from app.main import app
+        from app.services.otp_service import MAX_ATTEMPTS
+
+        # The per-phone rate limit would answer 429 first; this is about the OTP itself
+        monkeypatch.setattr(settings, "rate_limit_enabled", False)
+        await client.post("/api/auth/send-code", json={"phone": "+77760047836"})
+        for _ in range(MAX_ATTEMPTS):
+            resp = await client.post("/api/auth/verify-code", json={"phone": "+77760047836", "code": "111111"})
+            assert resp.status_code == 401
+        assert not await app.state.redis.exists("otp:+77760047836")
+
+        # The right code no longer works once the attempts are spent
+        resp = await client.post("/api/auth/verify-code", json={"phone": "+77760047836", "code": "000000"})
+        assert resp.status_code == 401
+
     async def test_verify_code_existing_user(self, client: AsyncClient, db: AsyncSession):
         # Create user first
         user = User(phone="+77760047836", name="Existing")
@@ -87,6 +107,35 @@ class TestAdminLogin:
         })
         assert resp.status_code == 401
 
+    async def test_admin_login_upgrades_hash_cost(self, client: AsyncClient, db: AsyncSession):
+        from passlib.hash import bcrypt
+
+        admin = User(
+            phone="+77777777770", email="old@test.kz", name="Old Admin",
+            password=bcrypt.using(rounds=5).hash("admin123"), role="ADMIN",
+        )
+        db.add(admin)
+        await db.commit()
+
+        resp = await client.post("/api/auth/admin-login", json={
+            "email": "old@test.kz", "password": "admin123",
+        })
+        assert resp.status_code == 200
+        await db.refresh(admin)
+        assert admin.password.startswith("$2b$04$")
+
+    async def test_admin_login_rejected_when_hashing_saturated(
+        self, client: AsyncClient, admin_token: str, monkeypatch,
+    ):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "password_hash_max_pending", 0)
+        resp = await client.post("/api/auth/admin-login", json={
+            "email": "admin@test.kz", "password": "admin123",
+        })
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+
 
 class TestWarrantyLogin:
     async def test_warranty_login_success(self, client: AsyncClient, warranty_manager_token: str):
@@ -95,3 +144,50 @@ class TestWarrantyLogin:
         })
         assert resp.status_code == 200
         assert resp.json()["user"]["role"] == "WARRANTY_MANAGER"
+
+
+class TestRateLimit:
+    async def test_send_code_rejected_when_bucket_empty(self, client: AsyncClient):
+        from app.main import app
+
+        app.state.redis.eval = AsyncMock(return_value=[0, 42])
+        resp = await client.post("/api/auth/send-code", json={"phone": "+77760047836"})
+        assert resp.status_code == 429
+        assert resp.headers["retry-after"] == "42"
+
+    async def test_limits_keyed_by_ip_and_phone(self, client: AsyncClient):
+        from app.main import app
+
+        await client.post("/api/auth/send-code", json={"phone": "+77760047836"})
+        assert await app.state.redis.exists("rl:send-code:phone:+77760047836")
+        assert await app.state.redis.keys("rl:send-code:ip:*")
+
+    async def test_phone_spellings_share_bucket(self, client: AsyncClient):
+        from app.main import app
+
+        for phone in ("+7 776 004 78 36", "87760047836", "+77760047836"):
+            await client.post("/api/auth/verify-code", json={"phone": phone, "code": "000000"})
+        assert await app.state.redis.keys("rl:verify-code:phone:*") == ["rl:verify-code:phone:+77760047836"]
+
+    @pytest.mark.parametrize("peer, forwarded", [
+        # Straight to the API: the header is not trusted at all
+        ("203.0.113.7", "198.51.100.{}"),
+        # Through a proxy that appends: the forged entry is left of the real one
+        ("172.18.0.5", "198.51.100.{}, 203.0.113.7"),
+    ])
+    async def test_forged_forwarded_for_keeps_bucket(self, client: AsyncClient, peer: str, forwarded: str):
+        from app.main import app
+
+        trusted = runpy.run_path(str(Path(__file__).parents[2] / "gunicorn.conf.py"))["forwarded_allow_ips"]
+        transport = ASGITransport(app=ProxyHeadersMiddleware(app, trusted_hosts=trusted), client=(peer, 1234))
+        async with AsyncClient(transport=transport, base_url="http://test") as proxied:
+            statuses = [
+                (await proxied.post(
+                    "/api/auth/admin-login",
+                    json={"email": "nobody@test.kz", "password": "x"},
+                    headers={"X-Forwarded-For": forwarded.format(i)},
+                )).status_code
+                for i in range(11)
+            ]
+        assert statuses[-1] == 429
+        assert await app.state.redis.keys("rl:login:ip:*") == ["rl:login:ip:203.0.113.7"]
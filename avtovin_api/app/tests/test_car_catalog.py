@@ -0,0 +1,121 @@
+import re
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car_catalog import CarBrand, CarModel
+from app.services.catalog_index import search_key
+
+
+@pytest.fixture
+async def catalog(db: AsyncSession):
+    toyota = CarBrand(name="Toyota")
+    lada = CarBrand(name="ВАЗ (Lada)")
+    mercedes = CarBrand(name="Mercedes-Benz")
+    db.add_all([toyota, lada, mercedes])
+    await db.flush()
+    db.add_all([
+        CarModel(name="Camry", brand_id=toyota.id),
+        CarModel(name="Corolla", brand_id=toyota.id),
+        CarModel(name="Land Cruiser Prado", brand_id=toyota.id),
+        CarModel(name="Vesta", brand_id=lada.id),
+    ])
+    await db.commit()
+    return {"toyota": toyota.id, "lada": lada.id}
+
+
+class TestCatalogSearch:
+    def test_search_key_transliterates(self):
+        assert search_key("Тойота") == search_key("toyota")
+        assert search_key("Мерседес") == search_key("Mercedes")
+        assert search_key("Королла") == search_key("Corolla")
+        assert search_key("Камри") == search_key("CAMRY")
+
+    async def test_prefix_and_cyrillic_queries(self, client: AsyncClient, catalog):
+        resp = await client.get("/api/car-catalog/search", params={"q": "тойо"})
+        assert resp.status_code == 200
+        assert resp.json()[0]["name"] == "Toyota"
+        assert resp.json()[0]["kind"] == "brand"
+
+        resp = await client.get("/api/car-catalog/search", params={"q": "лада вес"})
+        assert [h["name"] for h in resp.json()] == ["Vesta"]
+        assert resp.json()[0]["brandName"] == "ВАЗ (Lada)"
+
+        resp = await client.get("/api/car-catalog/search", params={"q": "prado"})
+        assert [h["name"] for h in resp.json()] == ["Land Cruiser Prado"]
+
+    async def test_empty_query(self, client: AsyncClient, catalog):
+        resp = await client.get("/api/car-catalog/search", params={"q": " "})
+        assert resp.json() == []
+
+
+class TestCatalogIndex:
+    async def test_lists_served_from_memory_until_reload(
+        self, client: AsyncClient, db: AsyncSession, catalog,
+    ):
+        from app.main import app
+        from app.services import catalog_index
+
+        resp = await client.get("/api/car-catalog/models", params={"brandId": catalog["toyota"]})
+        assert [m["name"] for m in resp.json()] == ["Camry", "Corolla", "Land Cruiser Prado"]
+
+        db.add(CarBrand(name="Kia"))
+        await db.commit()
+        resp = await client.get("/api/car-catalog/brands")
+        assert "Kia" not in [b["name"] for b in resp.json()]
+
+        await catalog_index.publish_reload(app.state.redis)
+        resp = await client.get("/api/car-catalog/brands")
+        assert "Kia" in [b["name"] for b in resp.json()]
+
+
+class TestCatalogSync:
+    async def test_resync_keeps_ids_and_prunes(self, db: AsyncSession):
+        from sqlalchemy import select
+
+        from app.models.car_catalog import CarGeneration
+        from app.services.catalog_sync import sync_catalog
+
+        catalog = {
+            "Toyota": ("/t.png", ["Camry", "Corolla"]),
+            "Kia": (None, ["K5", "Rio"]),
+        }
+        first = await sync_catalog(db, catalog)
+        await db.commit()
+        assert first["brands_upserted"] == 2 and first["models_added"] == 4
+        ids = dict((await db.execute(select(CarModel.name, CarModel.id))).all())
+
+        rio = ids["Rio"]
+        db.add(CarGeneration(name="IV", year_from=2017, model_id=rio))
+        await db.commit()
+
+        catalog = {"Toyota": ("/toyota.png", ["Camry", "Corolla", "RAV4"]), "Kia": (None, [])}
+        second = await sync_catalog(db, catalog, prune=True)
+        await db.commit()
+        assert second == {"brands_upserted": 1, "models_added": 1, "models_removed": 1, "brands_removed": 0}
+
+        after = dict((await db.execute(select(CarModel.name, CarModel.id))).all())
+        assert after["Camry"] == ids["Camry"]
+        assert after["Rio"] == rio  # still has a generation
+        assert "K5" not in after
+        logo = (await db.execute(select(CarBrand.logo_url).where(CarBrand.name == "Toyota"))).scalar()
+        assert logo == "/toyota.png"
+
+    async def test_reseed_endpoint(self, client: AsyncClient):
+        resp = await client.post("/api/seed-catalog")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["brands"] > 200
+        assert data["models_added"] == data["models"]
+
+        resp = await client.post("/api/reseed-catalog")
+        assert resp.json()["models_added"] == 0
+        assert resp.json()["models_removed"] == 0
+
+    async def test_brand_logos_carry_content_hash(self, client: AsyncClient):
+        await client.post("/api/seed-catalog")
+        resp = await client.get("/api/car-catalog/brands")
+        logos = [b["logoUrl"] for b in resp.json() if b["logoUrl"]]
+        assert logos
+        assert all(re.fullmatch(r"/uploads/brand-logos/[^?]+\?v=[0-9a-f]{12}", url) for url in logos)
@@ -1,5 +1,14 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car import Car
+from app.models.service_center import ServiceCenter
+from app.models.user import User
+from app.models.visit import Visit
 
 
 class TestCreateCar:
@@ -54,6 +63,40 @@ class TestListCars:
         assert len(resp.json()) >= 1
 
 
+class TestCarVisits:
+    async def _car_with_visits(self, db: AsyncSession, owner_id: str, count: int) -> Car:
+        sc = ServiceCenter(name="History SC", type="SERVICE_CENTER", city="Алматы")
+        car = Car(brand="Kia", model="Rio", year=2018, plate_number="H100", user_id=owner_id)
+        db.add_all([sc, car])
+        await db.flush()
+        for i in range(count):
+            db.add(Visit(
+                car_id=car.id, service_center_id=sc.id, description=f"visit {i}", cost=i,
+                created_at=datetime(2024, 1, 1) + timedelta(days=i),
+            ))
+        await db.commit()
+        return car
+
+    async def test_paginates_history(self, client: AsyncClient, user_with_id, user_token: str, db: AsyncSession):
+        car = await self._car_with_visits(db, user_with_id.id, 7)
+        resp = await client.get(
+            f"/api/cars/{car.id}/visits?page=2&limit=3",
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert (data["total"], data["totalPages"]) == (7, 3)
+        assert [v["description"] for v in data["visits"]] == ["visit 3", "visit 2", "visit 1"]
+
+    async def test_other_users_car_forbidden(self, client: AsyncClient, user_token: str, db: AsyncSession):
+        stranger = User(phone="+77005550000")
+        db.add(stranger)
+        await db.flush()
+        car = await self._car_with_visits(db, stranger.id, 1)
+        resp = await client.get(f"/api/cars/{car.id}/visits", headers={"Authorization": f"Bearer {user_token}"})
+        assert resp.status_code == 403
+
+
 class TestDeleteCar:
     async def test_delete_own_car(self, client: AsyncClient, user_token: str):
         create_resp = await client.post("/api/cars", headers={"Authorization": f"Bearer {user_token}"},
@@ -61,3 +104,84 @@ class TestDeleteCar:
         car_id = create_resp.json()["id"]
         resp = await client.delete(f"/api/cars/{car_id}", headers={"Authorization": f"Bearer {user_token}"})
         assert resp.status_code == 200
+
+
+class TestDecodeVin:
+    def test_offline_decoder(self):
+        from datetime import datetime
+
+        from app.services.vin_service import decode_offline, model_year
+
+        result = decode_offline("JTDBR32E530012345")
+        assert result.brand == "Toyota"
+        assert result.year == 2003
+        assert decode_offline("XTA21099012345678").brand == "ВАЗ (Lada)"
+        assert decode_offline("ZZZ00000000000000") is None
+        assert model_year("KMHxxxxxxP0000000", today=datetime(2025, 1, 1)) == 2023
+
+    async def test_decode_caches_and_normalizes_brand(self, client: AsyncClient, user_token: str):
+        from app.schemas.car import VinDecodeOut
+
+        upstream = AsyncMock(return_value=VinDecodeOut(
+            vin="JTDKB20U093000001", brand="Toyota", model="Prius", year=2009,
+        ))
+        with patch("app.services.vin_service.fetch_nhtsa", upstream):
+            for _ in range(3):
+                resp = await client.get(
+                    "/api/cars/decode-vin/jtdkb20u093000001",
+                    headers={"Authorization": f"Bearer {user_token}"},
+                )
+                assert resp.status_code == 200
+        assert resp.json()["model"] == "Prius"
+        assert upstream.await_count == 1
+
+    async def test_not_found_is_cached(self, client: AsyncClient, user_token: str):
+        upstream = AsyncMock(return_value=None)
+        with patch("app.services.vin_service.fetch_nhtsa", upstream):
+            for _ in range(2):
+                resp = await client.get(
+                    "/api/cars/decode-vin/ZZZ00000000000001",
+                    headers={"Authorization": f"Bearer {user_token}"},
+                )
+                assert resp.status_code == 404
+        assert upstream.await_count == 1
+
+    async def test_upstream_failure_falls_back_offline(self, client: AsyncClient, user_token: str):
+        from app.services.vin_service import VinUpstreamError
+
+        upstream = AsyncMock(side_effect=VinUpstreamError("timeout"))
+        with patch("app.services.vin_service.fetch_nhtsa", upstream):
+            resp = await client.get(
+                "/api/cars/decode-vin/WBAPH7C55BE000002",
+                headers={"Authorization": f"Bearer {user_token}"},
+            )
+            assert resp.status_code == 200
+            assert resp.json()["brand"] == "BMW"
+            assert resp.json()["year"] == 2011
+
+            resp = await client.get(
+                "/api/cars/decode-vin/ZZZ00000000000003",
+                headers={"Authorization": f"Bearer {user_token}"},
+            )
+            assert resp.status_code == 503
+
+    async def test_concurrent_lookups_share_one_request(self):
+        import asyncio
+
+        import fakeredis
+
+        from app.schemas.car import VinDecodeOut
+        from app.services import vin_service
+
+        async def slow_fetch(vin):
+            await asyncio.sleep(0.05)
+            return VinDecodeOut(vin=vin, brand="Kia", model="K5")
+
+        upstream = AsyncMock(side_effect=slow_fetch)
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        with patch("app.services.vin_service.fetch_nhtsa", upstream):
+            results = await asyncio.gather(*(
+                vin_service.decode(redis, "KNAGM4A77D5000004") for _ in range(10)
+            ))
+        assert {r.model for r in results} == {"K5"}
+        assert upstream.await_count == 1
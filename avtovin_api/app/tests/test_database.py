@@ -0,0 +1,72 @@
+from httpx import AsyncClient
+from starlette.requests import Request
+
+from app import database
+from app.services.auth_service import create_token
+
+
+def _request(app, token: str | None = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "headers": headers, "app": app})
+
+
+class TestReadRouting:
+    async def test_without_replica_reads_use_primary(self, client: AsyncClient, user_token: str):
+        from app.main import app
+
+        assert await database.read_sessionmaker(_request(app, user_token)) is database.async_session
+
+    async def test_reads_stick_to_primary_after_own_write(
+        self, client: AsyncClient, user_token: str, user_with_id, monkeypatch,
+    ):
+        from app.main import app
+
+        monkeypatch.setattr(database, "read_engine", object())
+        other_token = create_token("someone-else", "USER")
+        assert await database.read_sessionmaker(_request(app, user_token)) is database.read_session
+
+        resp = await client.post(
+            "/api/users/fcm-token",
+            json={"fcmToken": "abc"},
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        assert resp.status_code == 200
+        assert await database.read_sessionmaker(_request(app, user_token)) is database.async_session
+        assert await database.read_sessionmaker(_request(app, other_token)) is database.read_session
+        assert await database.read_sessionmaker(_request(app)) is database.read_session
+
+        # Pinning expires with the key
+        await app.state.redis.delete(database.WROTE_KEY.format(user_with_id.id))
+        assert await database.read_sessionmaker(_request(app, user_token)) is database.read_session
+
+    async def test_failed_write_does_not_pin(self, client: AsyncClient, user_token: str, user_with_id, monkeypatch):
+        from app.main import app
+
+        monkeypatch.setattr(database, "read_engine", object())
+        resp = await client.post(
+            "/api/users/fcm-token",
+            json={"fcmToken": ""},
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        assert resp.status_code == 400
+        assert not await app.state.redis.exists(database.WROTE_KEY.format(user_with_id.id))
+
+    async def test_pin_is_set_before_response_starts(self, client: AsyncClient, monkeypatch):
+        from app.main import app
+        from app.middleware import ReadYourWritesMiddleware
+
+        monkeypatch.setattr(database, "read_engine", object())
+        key = database.WROTE_KEY.format("u-pin")
+        pinned_at_start = []
+
+        async def created(scope, receive, send):
+            await send({"type": "http.response.start", "status": 201, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                pinned_at_start.append(await app.state.redis.exists(key))
+
+        scope = {**_request(app, create_token("u-pin", "USER")).scope, "method": "POST"}
+        await ReadYourWritesMiddleware(created)(scope, None, send)
+        assert pinned_at_start == [1]
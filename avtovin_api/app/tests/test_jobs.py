@@ -0,0 +1,338 @@
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+import fakeredis
+import httpx
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.main import app
+from app.models.car import Car
+from app.models.user import User
+from app.models.warranty import CarWarrantyStatus, Warranty
+from app.services import job_queue, partition_service, telegram_service, warranty_notifications, warranty_status
+from app.tests.conftest import TestSession
+
+
+@pytest.fixture
+async def redis():
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield r
+    await r.aclose()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Bot API stub: records calls, answers with the given status per method."""
+    calls = []
+    failing: dict[str, int] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        body = request.read()
+        calls.append((method, body))
+        status = failing.get(method, 200)
+        if status == 429:
+            failing.pop(method)
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0}})
+        if status != 200:
+            return httpx.Response(status, json={"ok": False, "description": "Bad Request: file rejected"})
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(settings, "telegram_bot_token", "123:abc")
+    monkeypatch.setattr(settings, "telegram_chat_id", "-100")
+    monkeypatch.setattr(telegram_service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(telegram_service, "_bucket", telegram_service.TokenBucket(rate=1000, capacity=10))
+    return calls, failing
+
+
+def _files(count: int) -> list[str]:
+    root = tempfile.mkdtemp()
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"doc{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 " + str(i).encode())
+        paths.append(path)
+    return paths
+
+
+class TestJobQueue:
+    async def test_runs_registered_handler(self, redis):
+        seen = []
+
+        @job_queue.job("test.echo")
+        async def echo(redis, value: int):
+            seen.append(value)
+
+        await job_queue.enqueue(redis, "test.echo", value=7)
+        assert await job_queue.process_next(redis)
+        assert seen == [7]
+        assert not await job_queue.process_next(redis)
+        assert await redis.llen(job_queue.PROCESSING_KEY.format(job_queue.WORKER_ID)) == 0
+
+    async def test_failure_is_retried_later(self, redis, monkeypatch):
+        @job_queue.job("test.flaky")
+        async def flaky(redis):
+            raise RuntimeError("boom")
+
+        await job_queue.enqueue(redis, "test.flaky")
+        await job_queue.process_next(redis)
+        [(raw, run_at)] = await redis.zrange(job_queue.DELAYED_KEY, 0, -1, withscores=True)
+        assert json.loads(raw)["attempts"] == 1
+
+        monkeypatch.setattr(job_queue.time, "time", lambda: run_at + 1)
+        assert await job_queue.promote_delayed(redis) == 1
+        assert await redis.llen(job_queue.QUEUE_KEY) == 1
+
+    async def test_recovers_only_dead_workers_jobs(self, redis):
+        for worker_id in ("alive", "dead"):
+            await job_queue.heartbeat(redis, worker_id)
+            await redis.lpush(
+                job_queue.PROCESSING_KEY.format(worker_id),
+                json.dumps({"id": worker_id, "name": "n", "payload": {}, "attempts": 0}),
+            )
+        await redis.delete(job_queue.HEARTBEAT_KEY.format("dead"))
+
+        assert await job_queue.recover(redis) == 1
+        assert json.loads(await redis.rpop(job_queue.QUEUE_KEY))["id"] == "dead"
+        assert await redis.llen(job_queue.PROCESSING_KEY.format("alive")) == 1
+        assert await redis.smembers(job_queue.WORKERS_KEY) == {"alive"}
+
+    async def test_periodic_runs_once_per_interval_across_workers(self, redis, monkeypatch):
+        runs = []
+
+        @job_queue.periodic("test.tick", seconds=60)
+        async def tick(redis):
+            runs.append(1)
+
+        monkeypatch.setattr(job_queue, "_periodic", {"test.tick": job_queue._periodic["test.tick"]})
+        for worker_state in ({}, {}):  # two replicas
+            for task in await job_queue.run_due_periodic(redis, worker_state):
+                await task
+        assert runs == [1]
+
+
+class TestPartitions:
+    def test_month_bounds_cross_year(self):
+        assert partition_service.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+        assert partition_service.months_between(datetime(2026, 11, 20), date(2027, 1, 1)) == [
+            date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1),
+        ]
+
+    def test_partition_ddl(self):
+        assert partition_service.create_partition_sql("visits", date(2026, 12, 15)) == (
+            "CREATE TABLE IF NOT EXISTS visits_y2026m12 PARTITION OF visits "
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+        )
+
+    async def test_ensure_is_noop_without_postgres(self, db: AsyncSession):
+        conn = await db.connection()
+        assert await partition_service.ensure_partitions(conn) == []
+
+
+class TestTelegramDelivery:
+    async def test_chunks_media_groups_of_ten(self, telegram):
+        calls, _ = telegram
+        statuses = await telegram_service.send_telegram_documents(_files(23), "📎 Docs")
+        assert [m for m, _ in calls] == ["sendMediaGroup", "sendMediaGroup", "sendMediaGroup"]
+        assert b"(3/3)" in calls[2][1]
+        assert len(statuses) == 23 and all(s.status == "sent" for s in statuses)
+
+    async def test_single_trailing_file_uses_send_document(self, telegram):
+        calls, _ = telegram
+        await telegram_service.send_telegram_documents(_files(11))
+        assert [m for m, _ in calls] == ["sendMediaGroup", "sendDocument"]
+
+    async def test_rejected_group_reports_per_file(self, telegram):
+        calls, failing = telegram
+        failing["sendMediaGroup"] = 400
+        paths = _files(3)
+        statuses = await telegram_service.send_telegram_documents([paths[0], None, paths[1], paths[2]])
+        assert [s.status for s in statuses] == ["sent", "missing", "sent", "sent"]
+        assert [m for m, _ in calls] == ["sendMediaGroup", "sendDocument", "sendDocument", "sendDocument"]
+
+    async def test_retries_after_rate_limit(self, telegram):
+        calls, failing = telegram
+        failing["sendMessage"] = 429
+        assert await telegram_service.send_telegram("hi")
+        assert [m for m, _ in calls] == ["sendMessage", "sendMessage"]
+
+    async def test_token_bucket_spaces_out_bursts(self):
+        bucket = telegram_service.TokenBucket(rate=100, capacity=2)
+        loop_time = __import__("asyncio").get_running_loop().time
+        start = loop_time()
+        for _ in range(4):
+            await bucket.acquire()
+        assert loop_time() - start >= 0.015
+
+
+class TestWarrantyNotifications:
+    async def test_create_enqueues_and_worker_delivers(
+        self, client: AsyncClient, warranty_manager_token: str, db: AsyncSession, telegram, monkeypatch,
+    ):
+        calls, _ = telegram
+        monkeypatch.setattr(warranty_notifications, "async_session", TestSession)
+
+        docs = []
+        for name in ("passport.pdf", "id.pdf"):
+            resp = await client.post(
+                "/api/warranties/upload-docs",
+                headers={"Authorization": f"Bearer {warranty_manager_token}"},
+                files=[("files", (name, b"%PDF-1.4 " + name.encode(), "application/pdf"))],
+            )
+            docs.append(resp.json()[0]["url"])
+
+        owner = User(phone="+77001110000", name="Owner")
+        db.add(owner)
+        await db.flush()
+        car = Car(brand="Kia", model="Rio", year=2021, plate_number="W001", user_id=owner.id)
+        db.add(car)
+        await db.commit()
+
+        resp = await client.post(
+            "/api/warranties",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            json={
+                "contractNumber": "TG-1", "clientName": "Owner", "userId": owner.id, "carId": car.id,
+                "startDate": datetime(2026, 1, 1).isoformat(), "docUrls": ",".join(docs + ["/uploads/warranty-docs/gone.pdf"]),
+            },
+        )
+        assert resp.status_code == 201
+        warranty_id = resp.json()["id"]
+
+        redis = app.state.redis
+        assert await redis.llen(job_queue.QUEUE_KEY) == 1
+        assert calls == []  # nothing sent inside the request
+
+        while await job_queue.process_next(redis):
+            pass
+        assert [m for m, _ in calls] == ["sendMessage", "sendMediaGroup"]
+
+        resp = await client.get(
+            f"/api/warranties/{warranty_id}/telegram-status",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+        )
+        report = resp.json()
+        assert (report["total"], report["sent"]) == (3, 2)
+        assert report["files"][2] == {"name": "gone.pdf", "status": "missing", "error": None}
+
+    async def test_send_docs_is_queued(self, client: AsyncClient, warranty_manager_token: str, db: AsyncSession):
+        owner = User(phone="+77001110001", name="Owner")
+        db.add(owner)
+        await db.flush()
+        car = Car(brand="Kia", model="Rio", year=2021, plate_number="W002", user_id=owner.id)
+        db.add(car)
+        await db.flush()
+        warranty = Warranty(
+            contract_number="TG-2", user_id=owner.id, car_id=car.id, client_name="Owner",
+            vin="", brand="Kia", model="Rio", year=2021,
+            start_date=datetime(2026, 1, 1), end_date=datetime(2027, 1, 1),
+            doc_urls="/uploads/warranty-docs/a.pdf", created_by_id=owner.id,
+        )
+        db.add(warranty)
+        await db.commit()
+
+        resp = await client.post(
+            f"/api/warranties/{warranty.id}/send-docs",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+        )
+        assert resp.status_code == 202
+        raw = await app.state.redis.rpop(job_queue.QUEUE_KEY)
+        assert json.loads(raw)["name"] == "warranty.send_docs"
+
+
+class TestWarrantyExpiry:
+    async def _warranties(self, db: AsyncSession) -> tuple[User, User, list[Warranty]]:
+        manager = User(phone="+77001120000", name="WM", role="WARRANTY_MANAGER", active_warranties=3)
+        owner = User(phone="+77001120001", name="Owner", fcm_token="fcm-owner")
+        db.add_all([manager, owner])
+        await db.flush()
+        car = Car(brand="Kia", model="Rio", year=2021, plate_number="X001", user_id=owner.id)
+        db.add(car)
+        await db.flush()
+        now = datetime.utcnow()
+        warranties = [
+            Warranty(
+                contract_number=f"EXP-{i}", user_id=owner.id, car_id=car.id, client_name="Owner",
+                vin="", brand="Kia", model="Rio", year=2021,
+                start_date=now - timedelta(days=365), end_date=now + offset, created_by_id=manager.id,
+            )
+            for i, offset in enumerate([timedelta(days=-1), timedelta(days=-2), timedelta(days=10)])
+        ]
+        db.add_all(warranties)
+        await db.commit()
+        return manager, owner, warranties
+
+    async def test_sweep_deactivates_in_batches(self, db: AsyncSession, redis, monkeypatch):
+        monkeypatch.setattr(warranty_status, "async_session", TestSession)
+        monkeypatch.setattr(settings, "warranty_sweep_batch_size", 1)
+        manager, _, warranties = await self._warranties(db)
+        ids, manager_id = [w.id for w in warranties], manager.id
+
+        await warranty_status.sweep_job(redis)
+        db.expire_all()
+        assert [(await db.get(Warranty, i)).is_active for i in ids] == [False, False, True]
+        assert (await db.get(User, manager_id)).active_warranties == 1
+
+    async def test_reminders_are_queued_once(self, db: AsyncSession, redis, monkeypatch):
+        monkeypatch.setattr(warranty_status, "async_session", TestSession)
+        _, _, warranties = await self._warranties(db)
+
+        assert await warranty_status.queue_expiry_reminders(redis) == 1
+        assert await warranty_status.queue_expiry_reminders(redis) == 0
+        job = json.loads(await redis.rpop(job_queue.QUEUE_KEY))
+        assert job["name"] == "push.send"
+        assert job["payload"]["fcm_token"] == "fcm-owner"
+        assert job["payload"]["data"] == {"type": "warranty_expiring", "warrantyId": warranties[2].id}
+
+    async def test_manager_counter_follows_writes(
+        self, client: AsyncClient, warranty_manager_token: str, admin_token: str, db: AsyncSession,
+    ):
+        owner = User(phone="+77001120002", name="Owner")
+        db.add(owner)
+        await db.flush()
+        car = Car(brand="Kia", model="Rio", year=2021, plate_number="X002", user_id=owner.id)
+        db.add(car)
+        await db.commit()
+        headers = {"Authorization": f"Bearer {warranty_manager_token}"}
+
+        async def active() -> int:
+            resp = await client.get("/api/warranty-managers", headers={"Authorization": f"Bearer {admin_token}"})
+            return resp.json()["managers"][0]["activeWarranties"]
+
+        resp = await client.post("/api/warranties", headers=headers, json={
+            "contractNumber": "CNT-1", "clientName": "Owner", "userId": owner.id, "carId": car.id,
+        })
+        warranty_id = resp.json()["id"]
+        assert await active() == 1
+        await client.put(f"/api/warranties/{warranty_id}", headers=headers, json={"isActive": False})
+        assert await active() == 0
+        await client.put(f"/api/warranties/{warranty_id}", headers=headers, json={"isActive": True})
+        assert await active() == 1
+        await client.delete(f"/api/warranties/{warranty_id}", headers={"Authorization": f"Bearer {admin_token}"})
+        assert await active() == 0
+
+    async def test_extending_expired_warranty_reactivates(
+        self, client: AsyncClient, warranty_manager_token: str, db: AsyncSession, redis, monkeypatch,
+    ):
+        monkeypatch.setattr(warranty_status, "async_session", TestSession)
+        manager, _, warranties = await self._warranties(db)
+        expired, manual, manager_id, car_id = warranties[0].id, warranties[1].id, manager.id, warranties[0].car_id
+        await warranty_status.sweep_job(redis)
+        headers = {"Authorization": f"Bearer {warranty_manager_token}"}
+        # A manager's own deactivation is kept when the term changes
+        await client.put(f"/api/warranties/{manual}", headers=headers, json={"isActive": False})
+
+        new_end = (datetime.utcnow() + timedelta(days=400)).isoformat()
+        for warranty_id in (expired, manual):
+            resp = await client.put(f"/api/warranties/{warranty_id}", headers=headers, json={"endDate": new_end})
+            assert resp.status_code == 200
+        db.expire_all()
+        assert [(await db.get(Warranty, i)).is_active for i in (expired, manual)] == [True, False]
+        assert (await db.get(User, manager_id)).active_warranties == 2
+        assert (await db.get(CarWarrantyStatus, car_id)).active_until > datetime.utcnow() + timedelta(days=399)
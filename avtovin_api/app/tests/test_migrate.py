@@ -0,0 +1,61 @@
+from unittest.mock import AsyncMock
+
+from sqlalchemy.exc import InternalError, OperationalError
+
+import migrate
+
+
+class _AbortingConnection:
+    """Postgres semantics that matter here: after an error the transaction
+    rejects every statement until it is rolled back."""
+
+    def __init__(self, log: list[str], fail_upgrade: bool):
+        self.log = log
+        self.fail_upgrade = fail_upgrade
+        self.aborted = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        if self.aborted:
+            raise InternalError(str(statement), params, Exception("current transaction is aborted"))
+        sql = str(statement)
+        if "advisory" in sql:
+            self.log.append(sql.split("(")[0].split()[-1])
+        return AsyncMock()
+
+    async def run_sync(self, fn, *args):
+        if self.fail_upgrade and args[0].__name__ == "upgrade":
+            self.aborted = True
+            raise OperationalError("ALTER TABLE", None, Exception("canceling statement due to lock timeout"))
+
+    async def commit(self):
+        if self.aborted:
+            raise InternalError("COMMIT", None, Exception("current transaction is aborted"))
+
+    async def rollback(self):
+        self.aborted = False
+
+
+class TestUpgrade:
+    async def test_lock_timeout_is_retried(self, monkeypatch):
+        log: list[str] = []
+        attempts = iter([True, False])
+
+        class _Engine:
+            def connect(self):
+                return _AbortingConnection(log, fail_upgrade=next(attempts))
+
+        monkeypatch.setattr(migrate, "engine", _Engine())
+        monkeypatch.setattr(migrate, "current_revision", AsyncMock(return_value="0008"))
+        monkeypatch.setattr(migrate, "backfill_receipts", AsyncMock(return_value=0))
+        monkeypatch.setattr(migrate.asyncio, "sleep", AsyncMock())
+
+        await migrate.upgrade()
+        # The failed attempt still released its lock, then the second one ran
+        assert log == ["pg_advisory_lock", "pg_advisory_unlock", "pg_advisory_lock", "pg_advisory_unlock"]
+        migrate.asyncio.sleep.assert_awaited_once()
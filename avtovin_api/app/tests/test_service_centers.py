@@ -33,6 +33,39 @@ class TestListServiceCenters:
         names = [sc["name"] for sc in resp.json()]
         assert "Inactive SC" not in names
 
+    async def test_fast_response_matches_validated(self, client: AsyncClient, db: AsyncSession, monkeypatch):
+        from app.config import settings
+
+        sc = ServiceCenter(name="Fast SC", type="SERVICE_CENTER", is_active=True)
+        db.add(sc)
+        await db.flush()
+        db.add(ServiceCenterAddress(address="ул. Абая 2", service_center_id=sc.id))
+        await db.commit()
+
+        monkeypatch.setattr(settings, "fast_responses", False)
+        validated = (await client.get("/api/service-centers")).json()
+        monkeypatch.setattr(settings, "fast_responses", True)
+        fast = (await client.get("/api/service-centers")).json()
+        assert fast == validated
+        assert fast[0]["_count"] == {"visits": 0}
+
+    async def test_fast_response_writes_utc_as_z(self):
+        from datetime import datetime, timedelta, timezone
+
+        import orjson
+
+        from app.responses import ModelResponse
+        from app.schemas.banner import BannerOut
+
+        banner = BannerOut(
+            id="b1", title="Banner", image_url="/b.png",
+            created_at=datetime(2026, 1, 1, 9, 30, tzinfo=timezone.utc),
+            updated_at=datetime(2026, 1, 1, 14, 30, tzinfo=timezone(timedelta(hours=5))),
+        )
+        body = ModelResponse(banner).body
+        assert orjson.loads(body) == orjson.loads(banner.model_dump_json(by_alias=True))
+        assert orjson.loads(body)["createdAt"] == "2026-01-01T09:30:00Z"
+
 
 class TestCreateServiceCenter:
     async def test_create_sc_admin(self, client: AsyncClient, admin_token: str):
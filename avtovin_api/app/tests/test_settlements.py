@@ -1,6 +1,12 @@
+import base64
+import io
+import os
+
 import pytest
 from datetime import datetime, timezone
 from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.settlement import Settlement
@@ -8,6 +14,7 @@ from app.models.service_center import ServiceCenter
 from app.models.visit import Visit
 from app.models.car import Car
 from app.models.user import User
+from app.config import settings
 
 
 class TestListSettlements:
@@ -120,3 +127,84 @@ class TestDeleteSettlement:
             headers={"Authorization": f"Bearer {admin_token}"},
         )
         assert resp.status_code == 200
+
+
+def _jpeg_base64() -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (1600, 1200), "blue").save(buf, "JPEG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+class TestUploadReceipt:
+    async def _settlements(self, db: AsyncSession, count: int) -> str:
+        sc = (await db.execute(select(ServiceCenter).where(ServiceCenter.name == "Test SC"))).scalar_one()
+        for i in range(count):
+            db.add(Settlement(
+                service_center_id=sc.id,
+                period_start=datetime(2025, i + 1, 1), period_end=datetime(2025, i + 1, 28),
+                total_commission=1000, total_cashback_redeemed=0, net_amount=1000,
+            ))
+        await db.commit()
+        return sc.id
+
+    async def test_bulk_upload_stores_one_file(
+        self, client: AsyncClient, sc_manager_token: str, admin_token: str, db: AsyncSession,
+    ):
+        await self._settlements(db, 3)
+        resp = await client.post(
+            "/api/service-centers/my/finances/upload-receipt",
+            headers={"Authorization": f"Bearer {sc_manager_token}"},
+            json={"receiptBase64": "data:image/jpeg;base64," + _jpeg_base64()},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["updatedCount"] == 3
+
+        keys = (await db.execute(select(Settlement.receipt_key))).scalars().all()
+        assert len(set(keys)) == 1 and keys[0].startswith("receipts/") and keys[0].endswith(".jpg")
+
+        resp = await client.get("/api/settlements", headers={"Authorization": f"Bearer {admin_token}"})
+        item = resp.json()[0]
+        assert item["receiptUrl"] == f"/uploads/{keys[0]}"
+        assert item["receiptThumbUrl"] == f"/uploads/receipts/thumbs/{os.path.basename(keys[0])}"
+        assert item["receiptStatus"] == "PENDING"
+        with Image.open(os.path.join(settings.upload_dir, item["receiptThumbUrl"][len("/uploads/"):])) as thumb:
+            assert max(thumb.size) <= 320
+
+    async def test_pdf_receipt_has_no_thumbnail(self, client: AsyncClient, sc_manager_token: str, db: AsyncSession):
+        await self._settlements(db, 1)
+        pdf = base64.b64encode(b"%PDF-1.4\n%test receipt\n").decode()
+        resp = await client.post(
+            "/api/service-centers/my/finances/upload-receipt",
+            headers={"Authorization": f"Bearer {sc_manager_token}"},
+            json={"receiptBase64": pdf},
+        )
+        assert resp.status_code == 200
+        key = (await db.execute(select(Settlement.receipt_key))).scalar_one()
+        assert key.endswith(".pdf")
+        assert os.path.exists(os.path.join(settings.upload_dir, key))
+
+    async def test_rejects_non_receipt(self, client: AsyncClient, sc_manager_token: str, db: AsyncSession):
+        await self._settlements(db, 1)
+        for value in ("not base64!", base64.b64encode(b"<html></html>").decode()):
+            resp = await client.post(
+                "/api/service-centers/my/finances/upload-receipt",
+                headers={"Authorization": f"Bearer {sc_manager_token}"},
+                json={"receiptBase64": value},
+            )
+            assert resp.status_code == 400
+        assert (await db.execute(select(Settlement.receipt_key))).scalar_one() is None
+
+
+class TestLegacyReceipts:
+    async def test_nothing_is_dropped(self):
+        from app.services.receipt_service import store_legacy_receipt
+
+        pdf_key = await store_legacy_receipt("data:application/pdf;base64," + base64.b64encode(b"%PDF-1.4\n").decode())
+        assert pdf_key.endswith(".pdf")
+        assert await store_legacy_receipt("/uploads/receipts/old.jpg") == "receipts/old.jpg"
+        # Undecodable or unknown content is kept as-is rather than lost
+        for value, data in (("not base64!", b"not base64!"), (base64.b64encode(b"<html>").decode(), b"<html>")):
+            key = await store_legacy_receipt(value)
+            assert key.endswith(".bin")
+            with open(os.path.join(settings.upload_dir, key), "rb") as f:
+                assert f.read() == data
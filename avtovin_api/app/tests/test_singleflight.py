@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app import metrics
+from app.responses import ModelResponse
+from app.singleflight import singleflight, METRIC
+from app.tests.conftest import TestSession
+
+
+def _fake_request(redis):
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(redis=redis)))
+
+
+class TestSingleflight:
+    async def test_concurrent_calls_share_one_computation(self):
+        calls = []
+
+        @singleflight("test-local")
+        async def read(key: str = "", db=None):
+            calls.append(key)
+            await asyncio.sleep(0.02)
+            return {"key": key}
+
+        before = metrics.value(METRIC, name="test-local", outcome="coalesced")
+        results = await asyncio.gather(
+            *(read(key="a", db=object()) for _ in range(5)),
+            read(key="b", db=object()),
+        )
+        assert calls.count("a") == 1 and calls.count("b") == 1
+        assert results[:5] == [{"key": "a"}] * 5
+        assert metrics.value(METRIC, name="test-local", outcome="coalesced") - before == 4
+
+    async def test_waiters_get_separate_response_objects(self):
+        @singleflight("test-response")
+        async def read():
+            await asyncio.sleep(0.01)
+            return ModelResponse([1, 2])
+
+        first, second = await asyncio.gather(read(), read())
+        assert first is not second
+        assert first.raw_headers is not second.raw_headers
+        assert first.body == second.body
+
+    async def test_other_worker_result_is_reused(self):
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        calls = []
+
+        @singleflight("test-redis", redis_lock=True)
+        async def read(key: str = ""):
+            calls.append(key)
+            return ModelResponse({"key": key})
+
+        # Another worker holds the lock and publishes its result shortly after
+        await redis.set('sf:test-redis:lock:[["key","x"]]', "other", px=2000)
+
+        async def publish():
+            await asyncio.sleep(0.05)
+            await redis.set('sf:test-redis:result:[["key","x"]]', 'R{"status":200,"media_type":"application/json","body":"{\\"key\\":\\"other\\"}"}')
+
+        result, _ = await asyncio.gather(read(key="x", _sf_request=_fake_request(redis)), publish())
+        assert calls == []
+        assert result.body == b'{"key":"other"}'
+
+        result = await read(key="y", _sf_request=_fake_request(redis))
+        assert calls == ["y"]
+        assert not await redis.exists('sf:test-redis:lock:[["key","y"]]')
+
+    async def test_routes_still_serve(self, client: AsyncClient):
+        resp = await client.get("/api/settings", params={"key": "a,b"})
+        assert resp.status_code == 200
+        assert resp.json() == {}
+
+        resp = await client.get("/api/banners")
+        assert resp.status_code == 200
+
+        resp = await client.get("/api/metrics")
+        assert 'singleflight_calls_total{name="banners",outcome="leader"' in resp.text
+
+    async def test_metrics_are_internal_only(self):
+        from app.main import app
+
+        transport = ASGITransport(app=app, client=("95.56.12.7", 40000))
+        async with AsyncClient(transport=transport, base_url="http://test") as public:
+            resp = await public.get("/api/metrics")
+        assert resp.status_code == 403
+
+    async def test_pinned_caller_is_not_coalesced(self, monkeypatch):
+        from app import database
+
+        calls = []
+
+        @singleflight("test-pinned")
+        async def read(db=None):
+            calls.append(db)
+            await asyncio.sleep(0.02)
+            return len(calls)
+
+        # A replica is configured and these sessions are on the primary
+        async with TestSession() as first, TestSession() as second:
+            monkeypatch.setattr(database, "engine", first.bind)
+            monkeypatch.setattr(database, "read_engine", object())
+            await asyncio.gather(read(db=first), read(db=second))
+        assert calls == [first, second]
+
+    async def test_computation_outlives_leader_session(self):
+        sessions = []
+
+        @singleflight("test-session")
+        async def read(db=None):
+            sessions.append(db)
+            await asyncio.sleep(0.02)
+            return (await db.execute(text("SELECT 1"))).scalar()
+
+        # The leader's request goes away (its session closed, the call cancelled) mid-computation
+        async with TestSession() as leader_db:
+            leader = asyncio.create_task(read(db=leader_db))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(read(db=object()))
+            await asyncio.sleep(0)
+        leader.cancel()
+        assert await waiter == 1
+        assert len(sessions) == 1 and sessions[0] is not leader_db
@@ -0,0 +1,202 @@
+import io
+import os
+
+from httpx import AsyncClient
+from PIL import Image
+
+from app.config import settings
+
+
+class TestUploadDocs:
+    async def test_upload_is_content_addressed(self, client: AsyncClient, warranty_manager_token: str):
+        files = [
+            ("files", ("passport.pdf", b"%PDF-1.4 same", "application/pdf")),
+            ("files", ("copy.PDF", b"%PDF-1.4 same", "application/pdf")),
+            ("files", ("id.jpg", b"\xff\xd8\xff other", "image/jpeg")),
+        ]
+        resp = await client.post(
+            "/api/warranties/upload-docs",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            files=files,
+        )
+        assert resp.status_code == 200
+        saved = resp.json()
+        assert saved[0]["filename"] == saved[1]["filename"]
+        assert saved[2]["url"].startswith("/uploads/warranty-docs/")
+        path = os.path.join(settings.upload_dir, "warranty-docs", saved[2]["filename"])
+        with open(path, "rb") as f:
+            assert f.read() == b"\xff\xd8\xff other"
+
+    async def test_rejects_bad_extension(self, client: AsyncClient, warranty_manager_token: str):
+        resp = await client.post(
+            "/api/warranties/upload-docs",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            files=[("files", ("run.exe", b"MZ", "application/octet-stream"))],
+        )
+        assert resp.status_code == 400
+
+    async def test_file_over_limit_is_aborted(
+        self, client: AsyncClient, warranty_manager_token: str, monkeypatch,
+    ):
+        monkeypatch.setattr("app.routers.warranties.MAX_FILE_SIZE", 1024)
+        resp = await client.post(
+            "/api/warranties/upload-docs",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            files=[("files", ("big.pdf", b"x" * 4096, "application/pdf"))],
+        )
+        assert resp.status_code == 413
+        assert os.listdir(os.path.join(settings.upload_dir, ".staging")) == []
+
+
+class TestBodySizeLimit:
+    async def test_declared_length_over_limit(self, client: AsyncClient, admin_token: str):
+        resp = await client.post(
+            "/api/landing/admin/upload-logo",
+            headers={
+                "Authorization": f"Bearer {admin_token}",
+                "Content-Length": str(settings.max_request_body_mb * 1024 * 1024 + 1),
+            },
+            content=b"",
+        )
+        assert resp.status_code == 413
+
+    async def test_streamed_body_over_limit(self, client: AsyncClient, admin_token: str):
+        from app.middleware import BodySizeLimitMiddleware
+        from app.main import app
+
+        limiter = app.middleware_stack
+        while not isinstance(limiter, BodySizeLimitMiddleware):
+            limiter = limiter.app
+        original, limiter.max_bytes = limiter.max_bytes, 1024
+        try:
+            async def body():
+                yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+                for _ in range(8):
+                    yield b"x" * 512
+
+            resp = await client.post(
+                "/api/landing/admin/upload-logo",
+                headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "multipart/form-data; boundary=b"},
+                content=body(),
+            )
+        finally:
+            limiter.max_bytes = original
+        assert resp.status_code == 413
+
+
+class TestPresign:
+    async def test_local_backend_has_no_direct_upload(self, client: AsyncClient, admin_token: str):
+        resp = await client.post(
+            "/api/uploads/presign",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"kind": "logos", "filename": "a.png", "contentType": "image/png", "size": 100},
+        )
+        assert resp.status_code == 409
+
+    async def test_content_type_must_match_extension(self, client: AsyncClient, admin_token: str):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        for content_type in ("text/html", "image/svg+xml", "image/jpeg"):
+            resp = await client.post("/api/uploads/presign", headers=headers, json={
+                "kind": "logos", "filename": "a.png", "contentType": content_type, "size": 100,
+            })
+            assert resp.status_code == 400
+
+    async def test_s3_presigned_post(self, client: AsyncClient, warranty_manager_token: str, monkeypatch):
+        from app.services import storage
+
+        monkeypatch.setattr(settings, "storage_backend", "s3")
+        monkeypatch.setattr(settings, "s3_endpoint_url", "http://minio:9000")
+        monkeypatch.setattr(settings, "s3_public_endpoint_url", "https://files.example.kz")
+        monkeypatch.setattr(settings, "s3_access_key", "minio")
+        monkeypatch.setattr(settings, "s3_secret_key", "minio_secret")
+        monkeypatch.setattr(storage, "_storage", None)
+        try:
+            headers = {"Authorization": f"Bearer {warranty_manager_token}"}
+            resp = await client.post("/api/uploads/presign", headers=headers, json={
+                "kind": "warranty-docs", "filename": "passport.pdf",
+                "contentType": "application/pdf", "size": 2048,
+            })
+            assert resp.status_code == 200
+            data = resp.json()
+            assert data["url"] == "https://files.example.kz/avtovin-uploads"
+            assert data["key"].startswith("warranty-docs/") and data["key"].endswith(".pdf")
+            assert data["fields"]["key"] == data["key"]
+            assert "policy" in data["fields"]
+            assert data["fields"]["Content-Type"] == "application/pdf"
+
+            resp = await client.get("/api/uploads/download-url", headers=headers, params={"key": data["key"]})
+            assert resp.json()["url"].startswith("https://files.example.kz/avtovin-uploads/warranty-docs/")
+
+            resp = await client.post("/api/uploads/presign", headers=headers, json={
+                "kind": "logos", "filename": "a.png", "contentType": "image/png", "size": 10,
+            })
+            assert resp.status_code == 403
+        finally:
+            storage._storage = None
+
+
+def _png(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 128)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class TestImageVariants:
+    async def test_logo_upload_generates_variants(self, client: AsyncClient, admin_token: str):
+        resp = await client.post(
+            "/api/landing/admin/upload-logo",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            files={"file": ("logo.png", _png(900, 300), "image/png")},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        stem = data["url"][:-len(".png")]
+        assert data["variants"]["webp"]["320"] == f"{stem}_w320.webp"
+
+        def size(url: str) -> tuple[int, int]:
+            with Image.open(os.path.join(settings.upload_dir, url[len("/uploads/"):])) as img:
+                return img.size
+
+        assert size(data["variants"]["avif"]["320"]) == (320, 107)
+        assert size(data["variants"]["webp"]["640"]) == (640, 213)
+        # Never upscaled
+        assert size(data["variants"]["webp"]["1280"]) == (900, 300)
+
+    async def test_variant_redirect_follows_accept(self, client: AsyncClient, user_token: str):
+        resp = await client.post(
+            "/api/uploads/image",
+            params={"kind": "car-photos"},
+            headers={"Authorization": f"Bearer {user_token}"},
+            files={"file": ("car.jpg", _png(400, 300), "image/jpeg")},
+        )
+        assert resp.status_code == 200
+        src = resp.json()["url"]
+        stem = os.path.splitext(src)[0]
+
+        async def variant(accept: str) -> str:
+            resp = await client.get("/api/uploads/variant", params={"src": src, "w": 300}, headers={"Accept": accept})
+            assert resp.status_code == 307
+            assert resp.headers["vary"] == "Accept"
+            return resp.headers["location"]
+
+        assert await variant("image/avif,image/webp,*/*") == f"{stem}_w320.avif"
+        assert await variant("image/webp,*/*") == f"{stem}_w320.webp"
+        assert await variant("*/*") == src
+
+    async def test_rejects_non_image_and_wrong_role(self, client: AsyncClient, user_token: str, admin_token: str):
+        resp = await client.post(
+            "/api/uploads/image",
+            params={"kind": "banners"},
+            headers={"Authorization": f"Bearer {user_token}"},
+            files={"file": ("b.png", _png(10, 10), "image/png")},
+        )
+        assert resp.status_code == 403
+
+        resp = await client.post(
+            "/api/uploads/image",
+            params={"kind": "banners"},
+            headers={"Authorization": f"Bearer {admin_token}"},
+            files={"file": ("b.png", b"not an image at all", "image/png")},
+        )
+        assert resp.status_code == 400
+        assert not os.listdir(os.path.join(settings.upload_dir, "banners"))
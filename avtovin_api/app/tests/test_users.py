@@ -1,5 +1,12 @@
+from datetime import datetime, timedelta
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car import Car
+from app.models.service_center import ServiceCenter
+from app.models.visit import Visit
 
 
 class TestListUsers:
@@ -28,6 +35,34 @@ class TestGetUser:
         assert resp.status_code == 200
         assert resp.json()["phone"] == "+77001234567"
 
+    async def test_profile_has_latest_visits_per_car(
+        self, client: AsyncClient, user_with_id, user_token: str, db: AsyncSession,
+    ):
+        sc = ServiceCenter(name="History SC", type="SERVICE_CENTER", city="Алматы")
+        busy = Car(brand="Kia", model="Rio", year=2018, plate_number="H001", user_id=user_with_id.id)
+        quiet = Car(brand="Kia", model="K5", year=2022, plate_number="H002", user_id=user_with_id.id)
+        db.add_all([sc, busy, quiet])
+        await db.flush()
+        start = datetime(2024, 1, 1)
+        for i in range(12):
+            db.add(Visit(
+                car_id=busy.id, service_center_id=sc.id, description=f"visit {i}", cost=i,
+                created_at=start + timedelta(days=i),
+            ))
+        db.add(Visit(car_id=quiet.id, service_center_id=sc.id, description="only", cost=1, created_at=start))
+        await db.commit()
+
+        resp = await client.get(
+            f"/api/users/{user_with_id.id}",
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        cars = {c["plateNumber"]: c for c in resp.json()["cars"]}
+        assert [v["description"] for v in cars["H001"]["visits"]] == [f"visit {i}" for i in range(11, 6, -1)]
+        assert cars["H001"]["hasMoreVisits"] is True
+        assert cars["H001"]["visits"][0]["serviceCenter"]["name"] == "History SC"
+        assert [v["description"] for v in cars["H002"]["visits"]] == ["only"]
+        assert cars["H002"]["hasMoreVisits"] is False
+
     async def test_get_other_user_forbidden(self, client: AsyncClient, user_token: str):
         resp = await client.get(
             "/api/users/nonexistent-id",
@@ -46,6 +81,33 @@ class TestUpdateUser:
         assert resp.status_code == 200
         assert resp.json()["name"] == "Updated Name"
 
+    async def test_user_cannot_set_own_balance(self, client: AsyncClient, user_with_id, user_token: str):
+        resp = await client.put(
+            f"/api/users/{user_with_id.id}",
+            headers={"Authorization": f"Bearer {user_token}"},
+            json={"balance": 100000},
+        )
+        assert resp.status_code == 403
+
+    async def test_admin_balance_change_is_ledger_adjustment(
+        self, client: AsyncClient, user_with_id, user_token: str, admin_token: str,
+    ):
+        resp = await client.put(
+            f"/api/users/{user_with_id.id}",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"balance": 1500},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["balance"] == 1500
+
+        resp = await client.get(
+            f"/api/users/{user_with_id.id}/balance",
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        data = resp.json()
+        assert (data["balance"], data["totalEarned"], data["totalSpent"]) == (1500, 0, 0)
+        assert [(t["type"], t["amount"]) for t in data["transactions"]] == [("ADJUSTMENT", 1500)]
+
 
 class TestFcmToken:
     async def test_update_fcm_token(self, client: AsyncClient, user_token: str):
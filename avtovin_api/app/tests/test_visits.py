@@ -1,12 +1,20 @@
+from datetime import date, datetime
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.balance import BalanceTransaction
 from app.models.car import Car
 from app.models.service import Service
 from app.models.service_center import ServiceCenter, ServiceCenterService
+from app.models.settlement import Settlement
 from app.models.user import User
+from app.models.visit import Visit
+from app.models.warranty import CarWarrantyStatus
+from app.services import archive_service, ledger_service, scan_cache, warranty_status
 from app.services.auth_service import create_token
+from app.tests.conftest import TestSession
 
 
 async def _setup_visit_data(db: AsyncSession):
@@ -218,6 +226,44 @@ class TestListVisits:
         assert resp.json()["id"] == visit_id
 
 
+    async def test_warranty_filter(
+        self, client: AsyncClient, db: AsyncSession, admin_token: str, warranty_manager_token: str,
+    ):
+        car, sc, _, _, _, owner = await _setup_visit_data(db)
+        other = Car(brand="Kia", model="Rio", year=2019, plate_number="V002VV", user_id=owner.id)
+        db.add(other)
+        await db.flush()
+        for c in (car, other):
+            db.add(Visit(car_id=c.id, service_center_id=sc.id, description="", cost=1))
+        await db.commit()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        async def visit_cars(flag: str) -> list[str]:
+            resp = await client.get("/api/visits", params={"warranty": flag}, headers=headers)
+            return [v["carId"] for v in resp.json()["visits"]]
+
+        assert await visit_cars("true") == []
+        resp = await client.post(
+            "/api/warranties",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            json={"contractNumber": "W-FILTER-1", "clientName": "Car Owner", "userId": owner.id, "carId": car.id},
+        )
+        warranty_id = resp.json()["id"]
+        assert await visit_cars("true") == [car.id]
+        assert await visit_cars("false") == [other.id]
+
+        await client.delete(f"/api/warranties/{warranty_id}", headers=headers)
+        assert await visit_cars("true") == []
+        assert sorted(await visit_cars("false")) == sorted([car.id, other.id])
+
+    async def test_sweep_drops_expired_status(self, db: AsyncSession):
+        car, *_ = await _setup_visit_data(db)
+        db.add(CarWarrantyStatus(car_id=car.id, active_until=datetime(2020, 1, 1)))
+        await db.commit()
+        assert await warranty_status.sweep(db) == 1
+        await db.commit()
+        assert await db.get(CarWarrantyStatus, car.id) is None
+
 class TestFixedCommission:
     async def test_fixed_commission_and_cashback(self, client: AsyncClient, db: AsyncSession):
         owner = User(phone="+77007770001", name="Fixed Owner", balance=0)
@@ -266,3 +312,232 @@ class TestFixedCommission:
         data = resp.json()
         assert data["serviceFee"] == 3000  # fixed commission
         assert data["cashback"] == 500     # fixed cashback
+
+
+class TestLedger:
+    async def _visit(self, client, mgr_token, car, sc, service, price, cashback_used=0):
+        resp = await client.post(
+            "/api/visits",
+            headers={"Authorization": f"Bearer {mgr_token}"},
+            json={
+                "carId": car.id,
+                "serviceCenterId": sc.id,
+                "services": [{"serviceId": service.id, "price": price}],
+                "cashbackUsed": cashback_used,
+            },
+        )
+        assert resp.status_code == 201
+        return resp.json()
+
+    async def test_balance_reads_counters(self, client: AsyncClient, db: AsyncSession):
+        car, sc, service, mgr_token, owner_token, owner = await _setup_visit_data(db)
+        await ledger_service.set_balance(db, owner, 12000)  # admin top-up, posted as an ADJUSTMENT
+        await db.commit()
+
+        visits = [
+            await self._visit(client, mgr_token, car, sc, service, 10000),
+            await self._visit(client, mgr_token, car, sc, service, 20000, cashback_used=4000),
+        ]
+        earned = sum(v["cashback"] for v in visits)
+        spent = sum(v["cashbackUsed"] for v in visits)
+
+        resp = await client.get(
+            f"/api/users/{owner.id}/balance",
+            headers={"Authorization": f"Bearer {owner_token}"},
+        )
+        data = resp.json()
+        assert (data["totalEarned"], data["totalSpent"]) == (earned, spent)
+        assert data["balance"] == 12000 + earned - spent
+        assert data["total"] == 4  # adjustment, earn, spend, earn
+
+    async def test_spend_is_refused_below_zero(self, db: AsyncSession):
+        owner = User(phone="+77008880001", name="Empty")
+        db.add(owner)
+        await db.flush()
+        with pytest.raises(ledger_service.InsufficientBalance):
+            await ledger_service.post(db, owner.id, -100, ledger_service.SPEND, "x")
+
+    async def test_reconcile_reports_drift(self, client: AsyncClient, db: AsyncSession, monkeypatch):
+        monkeypatch.setattr(ledger_service, "async_session", TestSession)
+        car, sc, service, mgr_token, _, owner = await _setup_visit_data(db)
+        others = [User(phone=f"+7700555000{i}") for i in range(5)]
+        db.add_all(others)
+        await db.flush()
+        for i, user in enumerate(others):
+            await ledger_service.post(db, user.id, 100 * (i + 1), ledger_service.EARN, "x")
+        await db.commit()
+
+        checked, drifts = await ledger_service.reconcile(chunk_size=2, concurrency=2)
+        # _setup_visit_data gives the owner 10000 without a transaction
+        assert [d.user_id for d in drifts] == [owner.id]
+        assert (drifts[0].balance, drifts[0].expected_balance) == (10000, 0)
+        assert checked >= 7
+
+
+class TestArchive:
+    async def test_car_history_merges_archived_months(
+        self, client: AsyncClient, db: AsyncSession, admin_token: str, monkeypatch,
+    ):
+        monkeypatch.setattr(ledger_service, "async_session", TestSession)
+        car, sc, service, mgr_token, owner_token, owner = await _setup_visit_data(db)
+        # Start from an empty, ledger-consistent balance
+        await db.execute(User.__table__.update().where(User.id == owner.id).values(balance=0))
+        await db.commit()
+        for price in (8000, 12000):
+            resp = await client.post(
+                "/api/visits",
+                headers={"Authorization": f"Bearer {mgr_token}"},
+                json={"carId": car.id, "serviceCenterId": sc.id, "services": [{"serviceId": service.id, "price": price}]},
+            )
+            assert resp.status_code == 201
+        old_id = resp.json()["id"]
+
+        # Backdate the second visit and its transaction into a closed month, then archive it
+        old = datetime(2021, 5, 10)
+        await db.execute(Visit.__table__.update().where(Visit.id == old_id).values(created_at=old))
+        await db.execute(BalanceTransaction.__table__.update().where(BalanceTransaction.visit_id == old_id).values(created_at=old))
+        await db.commit()
+        assert date(2021, 5, 1) in await archive_service.archivable_months(db)
+        assert await archive_service.archive_month(db, date(2021, 5, 1)) == (1, 1)
+        await db.commit()
+
+        resp = await client.get(
+            f"/api/visits?carId={car.id}",
+            headers={"Authorization": f"Bearer {owner_token}"},
+        )
+        data = resp.json()
+        assert data["total"] == 2
+        assert [(v["cost"], v["archived"]) for v in data["visits"]] == [(8000, False), (12000, True)]
+        assert data["visits"][1]["services"][0]["serviceName"] == "Test Oil Change"
+        assert data["visits"][1]["serviceCenter"]["name"] == "Visit Test SC"
+
+        resp = await client.get(f"/api/visits/{old_id}", headers={"Authorization": f"Bearer {owner_token}"})
+        assert resp.status_code == 200
+        assert (resp.json()["cost"], resp.json()["archived"]) == (12000, True)
+
+        resp = await client.get("/api/dashboard/stats", headers={"Authorization": f"Bearer {admin_token}"})
+        assert resp.json()["totalVisits"] == 2
+        assert resp.json()["totalRevenue"] == sum(v["serviceFee"] for v in data["visits"])
+
+        resp = await client.get(
+            f"/api/users/{owner.id}/balance",
+            headers={"Authorization": f"Bearer {owner_token}"},
+        )
+        assert resp.json()["total"] == 2  # both earns, one of them archived
+
+        _, drifts = await ledger_service.reconcile()
+        assert owner.id not in [d.user_id for d in drifts]
+
+    async def test_month_with_unpaid_settlement_stays_hot(self, db: AsyncSession):
+        car, sc, *_ = await _setup_visit_data(db)
+        db.add(Visit(
+            car_id=car.id, service_center_id=sc.id, description="old", cost=1,
+            cashback=0, cashback_used=0, service_fee=0, created_at=datetime(2021, 3, 3),
+        ))
+        db.add(Settlement(
+            service_center_id=sc.id, period_start=datetime(2021, 3, 1), period_end=datetime(2021, 3, 31),
+            total_commission=0, total_cashback_redeemed=0, net_amount=0,
+        ))
+        await db.commit()
+        assert date(2021, 3, 1) not in await archive_service.archivable_months(db)
+
+
+class TestScanCache:
+    VIN = "JTDBR32E720123456"
+
+    async def test_scan_flow_reuses_lookup(self, client: AsyncClient, db: AsyncSession):
+        from app.main import app
+
+        car, sc, service, mgr_token, _, owner = await _setup_visit_data(db)
+        car.vin = self.VIN
+        await db.commit()
+        headers = {"Authorization": f"Bearer {mgr_token}"}
+
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN.lower()}, headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["owner"]["id"] == owner.id
+        assert await app.state.redis.exists(scan_cache.VIN_KEY.format(self.VIN), scan_cache.CAR_KEY.format(car.id)) == 2
+
+        # Served from the scan session: a change made behind the cache's back is not seen
+        car.brand = "Lexus"
+        await db.commit()
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        assert resp.json()["brand"] == "Toyota"
+
+        resp = await client.post("/api/events/notify", json={"carId": car.id}, headers=headers)
+        assert resp.json() == {"success": True}
+
+        resp = await client.post("/api/visits", headers=headers, json={
+            "vin": self.VIN,
+            "serviceCenterId": sc.id,
+            "services": [{"serviceId": service.id, "price": 10000}],
+            "mileage": 50000,
+        })
+        assert resp.status_code == 201
+        assert resp.json()["carId"] == car.id
+        # The visit changed the car: the next scan reloads it
+        assert not await app.state.redis.exists(scan_cache.VIN_KEY.format(self.VIN), scan_cache.CAR_KEY.format(car.id))
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        assert resp.json()["brand"] == "Lexus"
+        assert resp.json()["mileage"] == 50000
+
+    async def test_new_warranty_invalidates_flag(
+        self, client: AsyncClient, db: AsyncSession, warranty_manager_token: str,
+    ):
+        car, _, _, mgr_token, _, owner = await _setup_visit_data(db)
+        car.vin = self.VIN
+        await db.commit()
+        headers = {"Authorization": f"Bearer {mgr_token}"}
+
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        assert resp.json()["hasActiveWarranty"] is False
+
+        resp = await client.post(
+            "/api/warranties",
+            headers={"Authorization": f"Bearer {warranty_manager_token}"},
+            json={"contractNumber": "W-SCAN-1", "clientName": "Car Owner", "userId": owner.id, "carId": car.id},
+        )
+        assert resp.status_code == 201
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        assert resp.json()["hasActiveWarranty"] is True
+
+    async def test_lookup_by_id_leaves_vin_key(self, client: AsyncClient, db: AsyncSession):
+        from app.main import app
+
+        car, _, _, mgr_token, _, _ = await _setup_visit_data(db)
+        car.vin = self.VIN
+        buyer = User(phone="+77001234000", name="New Owner")
+        db.add(buyer)
+        await db.flush()
+        newer = Car(
+            brand="Toyota", model="Camry", year=2022, plate_number="NEW001", vin=self.VIN,
+            user_id=buyer.id, created_at=datetime(2099, 1, 1),
+        )
+        db.add(newer)
+        await db.commit()
+
+        # The older car's entry must not answer its VIN
+        resp = await client.post(
+            "/api/events/notify", json={"carId": car.id}, headers={"Authorization": f"Bearer {mgr_token}"},
+        )
+        assert resp.status_code == 200
+        assert not await app.state.redis.exists(scan_cache.VIN_KEY.format(self.VIN))
+        resp = await client.get(
+            "/api/cars/by-vin", params={"vin": self.VIN}, headers={"Authorization": f"Bearer {mgr_token}"},
+        )
+        assert resp.json()["id"] == newer.id
+
+    async def test_owner_edit_invalidates(self, client: AsyncClient, db: AsyncSession, admin_token: str):
+        car, _, _, mgr_token, _, owner = await _setup_visit_data(db)
+        car.vin = self.VIN
+        await db.commit()
+        headers = {"Authorization": f"Bearer {mgr_token}"}
+
+        await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        resp = await client.put(
+            f"/api/users/{owner.id}", json={"name": "Renamed Owner"},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        assert resp.status_code == 200
+        resp = await client.get("/api/cars/by-vin", params={"vin": self.VIN}, headers=headers)
+        assert resp.json()["owner"]["name"] == "Renamed Owner"
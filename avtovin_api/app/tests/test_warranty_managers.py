@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.car import Car
+from app.models.user import User
+from app.models.warranty import Warranty
+
+
+class TestListWarrantyManagers:
+    async def test_counts_and_pagination(self, client: AsyncClient, admin_token: str, db: AsyncSession):
+        owner = User(phone="+77001130000", name="Owner")
+        managers = [
+            User(
+                phone=f"+7700113000{i}", name=f"WM {i}", role="WARRANTY_MANAGER",
+                created_at=datetime(2026, 1, 1) + timedelta(days=i), active_warranties=i,
+            )
+            for i in range(1, 4)
+        ]
+        db.add_all([owner, *managers])
+        await db.flush()
+        car = Car(brand="Kia", model="Rio", year=2021, plate_number="M001", user_id=owner.id)
+        db.add(car)
+        await db.flush()
+        for i, m in enumerate(managers, start=1):
+            for n in range(i * 2):
+                db.add(Warranty(
+                    contract_number=f"M{i}-{n}", user_id=owner.id, car_id=car.id, client_name="Owner",
+                    vin="", brand="Kia", model="Rio", year=2021,
+                    start_date=datetime(2026, 1, 1), end_date=datetime(2031, 1, 1), created_by_id=m.id,
+                ))
+        await db.commit()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        resp = await client.get("/api/warranty-managers", params={"limit": 2}, headers=headers)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert (data["total"], data["totalPages"], data["totalWarranties"]) == (3, 2, 12)
+        # Newest first, created counted per manager, active from the counter
+        assert [(m["name"], m["totalWarranties"], m["activeWarranties"]) for m in data["managers"]] == [
+            ("WM 3", 6, 3), ("WM 2", 4, 2),
+        ]
+
+        resp = await client.get("/api/warranty-managers", params={"limit": 2, "page": 2}, headers=headers)
+        assert [(m["name"], m["totalWarranties"]) for m in resp.json()["managers"]] == [("WM 1", 2)]
+
+    async def test_admin_only(self, client: AsyncClient, warranty_manager_token: str):
+        resp = await client.get("/api/warranty-managers", headers={"Authorization": f"Bearer {warranty_manager_token}"})
+        assert resp.status_code == 403
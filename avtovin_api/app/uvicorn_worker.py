@@ -0,0 +1,17 @@
+from uvicorn.workers import UvicornWorker
+
+
+class AppUvicornWorker(UvicornWorker):
+    """Gunicorn worker running the app on uvloop + httptools.
+
+    Keepalive, backlog and max-requests recycling come from gunicorn.conf.py; the
+    worker additionally drains open connections (WebSockets get a 1012 close) for
+    up to graceful_timeout before the app's lifespan shutdown runs.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "ws": "websockets", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Leave a few seconds of gunicorn's graceful_timeout for lifespan shutdown
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 5, 1)
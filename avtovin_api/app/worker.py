@@ -0,0 +1,39 @@
+"""Background worker: runs queued and periodic jobs (see services/job_queue.py).
+
+    python -m app.worker
+
+docker compose runs it as the `worker` service, next to the API.
+"""
+
+import asyncio
+import signal
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.database import engine
+from app.services import (  # noqa: F401 — importing registers the jobs
+    archive_service, job_queue, ledger_service, partition_service, push_service, telegram_service,
+    warranty_notifications, warranty_status,
+)
+
+
+async def main():
+    redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+    worker = asyncio.create_task(job_queue.run_worker(redis, settings.worker_concurrency))
+    # Jobs interrupted by the stop are requeued by another worker or the next start
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.cancel)
+    try:
+        await worker
+    except asyncio.CancelledError:
+        print("[JOBS] Worker stopped")
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+        await telegram_service.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
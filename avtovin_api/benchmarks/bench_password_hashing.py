@@ -0,0 +1,114 @@
+"""Event-loop latency of an unrelated endpoint while admin logins run in parallel.
+
+Compares bcrypt called inline in the handler (the old behaviour) with the
+password_service thread pool. A probe hits /api/health every few milliseconds
+during the login burst; its latency is how long other requests on the same
+worker wait for the loop.
+
+Usage:
+    python -m benchmarks.bench_password_hashing [--logins 40] [--rounds 12]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from unittest.mock import AsyncMock
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import get_db
+from app.main import app
+from app.models import Base, User
+from app.services import auth_service, password_service
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+PROBE_INTERVAL = 0.005
+
+
+async def _override_get_db():
+    async with Session() as session:
+        yield session
+
+
+async def _seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as db:
+        db.add(User(
+            phone="+77770000000", email="bench@test.kz", name="Bench Admin",
+            password=auth_service.hash_password("admin123"), role="ADMIN",
+        ))
+        await db.commit()
+
+
+async def _inline(fn, *args):
+    return fn(*args)
+
+
+async def _run_burst(client: AsyncClient, n_logins: int) -> tuple[list[float], float]:
+    latencies: list[float] = []
+    done = asyncio.Event()
+
+    async def probe():
+        # Counted from when the probe was due, so time spent waiting for a
+        # blocked loop to wake the sleeper is included
+        while not done.is_set():
+            due = time.perf_counter() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            await client.get("/api/health")
+            latencies.append((time.perf_counter() - due) * 1000)
+
+    async def login():
+        resp = await client.post("/api/auth/admin-login", json={
+            "email": "bench@test.kz", "password": "admin123",
+        })
+        resp.raise_for_status()
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(n_logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return latencies, elapsed
+
+
+def _report(label: str, latencies: list[float], elapsed: float, n_logins: int):
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<10}{n_logins / elapsed:>12.1f}{len(latencies):>8}"
+        f"{statistics.median(latencies):>10.1f}{p99:>10.1f}{latencies[-1]:>10.1f}"
+    )
+
+
+async def main(n_logins: int, rounds: int):
+    settings.bcrypt_rounds = rounds
+    settings.rate_limit_enabled = False
+    settings.password_hash_max_pending = n_logins
+    await _seed()
+    app.dependency_overrides[get_db] = _override_get_db
+    app.state.redis = AsyncMock()
+
+    pooled = password_service._run
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        print(f"{'mode':<10}{'logins/s':>12}{'probes':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        password_service._run = _inline
+        _report("inline", *await _run_burst(client, n_logins), n_logins)
+        password_service._run = pooled
+        _report("pool", *await _run_burst(client, n_logins), n_logins)
+
+    password_service.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds))
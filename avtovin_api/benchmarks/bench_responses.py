@@ -0,0 +1,110 @@
+"""Throughput of hot list endpoints with and without settings.fast_responses.
+
+Runs the app in-process against an in-memory SQLite database, so the numbers
+isolate serialization cost rather than Postgres latency.
+
+Usage:
+    python -m benchmarks.bench_responses [--visits 500] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import get_db
+from app.main import app
+from app.models import Base, Car, Service, ServiceCenter, ServiceCenterAddress, ServiceCenterService, User, Visit, VisitService
+from app.services.auth_service import create_token
+
+engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _override_get_db():
+    async with Session() as session:
+        yield session
+
+
+async def _seed(n_visits: int) -> str:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with Session() as db:
+        admin = User(phone="+77770000000", role="ADMIN", name="Bench Admin")
+        owner = User(phone="+77770000001", name="Bench Owner")
+        db.add_all([admin, owner])
+        await db.flush()
+
+        services = [Service(name=f"Service {i}", category="engine") for i in range(10)]
+        db.add_all(services)
+        await db.flush()
+
+        scs = []
+        for i in range(30):
+            sc = ServiceCenter(name=f"SC {i}", city="Алматы", rating=i % 5)
+            db.add(sc)
+            await db.flush()
+            db.add(ServiceCenterAddress(address=f"ул. Абая {i}", service_center_id=sc.id))
+            for svc in services[:5]:
+                db.add(ServiceCenterService(service_center_id=sc.id, service_id=svc.id, price=10000))
+            scs.append(sc)
+
+        car = Car(brand="Toyota", model="Camry", year=2020, plate_number="B001BB", user_id=owner.id)
+        db.add(car)
+        await db.flush()
+
+        for i in range(n_visits):
+            visit = Visit(
+                car_id=car.id, service_center_id=scs[i % len(scs)].id,
+                description="Замена масла", cost=10000, cashback=500, service_fee=2000,
+            )
+            db.add(visit)
+            await db.flush()
+            db.add(VisitService(
+                visit_id=visit.id, service_name="Замена масла",
+                price=10000, commission=2000, cashback=500,
+            ))
+        await db.commit()
+        return create_token(admin.id, admin.role)
+
+
+async def _measure(client: AsyncClient, path: str, headers: dict, n_requests: int) -> float:
+    await client.get(path, headers=headers)  # warm-up
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        resp = await client.get(path, headers=headers)
+        resp.raise_for_status()
+    return n_requests / (time.perf_counter() - started)
+
+
+async def main(n_visits: int, n_requests: int):
+    token = await _seed(n_visits)
+    headers = {"Authorization": f"Bearer {token}"}
+    app.dependency_overrides[get_db] = _override_get_db
+    app.state.redis = AsyncMock()
+    settings.rate_limit_enabled = False
+
+    paths = ["/api/visits?limit=100", "/api/service-centers"]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        print(f"{'endpoint':<28}{'validated req/s':>18}{'fast req/s':>14}{'speedup':>10}")
+        for path in paths:
+            settings.fast_responses = False
+            before = await _measure(client, path, headers, n_requests)
+            settings.fast_responses = True
+            after = await _measure(client, path, headers, n_requests)
+            print(f"{path:<28}{before:>18.1f}{after:>14.1f}{after / before:>9.2f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visits", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.visits, args.requests))
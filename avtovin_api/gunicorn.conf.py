@@ -0,0 +1,37 @@
+"""Gunicorn settings for the production API server (used by entrypoint.sh).
+
+Every knob can be overridden from the environment, e.g. WEB_CONCURRENCY=4.
+The app is deliberately not preloaded: each worker imports it after the fork and
+opens its own DB pool and Redis client in main.lifespan.
+"""
+
+import multiprocessing
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+worker_class = "app.uvicorn_worker.AppUvicornWorker"
+# Async workers: one per core is enough to saturate the CPU
+workers = _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count())
+preload_app = False
+
+backlog = _env_int("BACKLOG", 2048)
+keepalive = _env_int("KEEPALIVE", 5)
+timeout = _env_int("WORKER_TIMEOUT", 60)
+graceful_timeout = _env_int("GRACEFUL_TIMEOUT", 30)
+
+# Recycle workers periodically; jitter keeps them from restarting all at once
+max_requests = _env_int("MAX_REQUESTS", 10000)
+max_requests_jitter = _env_int("MAX_REQUESTS_JITTER", 1000)
+
+# Trust X-Forwarded-* only from the private networks nginx connects from (its
+# compose container); a client reaching the API any other way keeps its address
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,127.0.0.1")
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
@@ -1,55 +0,0 @@
-"""Create all tables and optionally seed the database.
-
-Usage (inside Docker):
-    python init_db.py          # create tables only
-    python init_db.py --seed   # create tables + seed data
-"""
-
-import asyncio
-import sys
-
-from app.database import engine
-from app.models import Base  # noqa — imports all models
-
-
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("All tables created successfully.")
-
-
-async def run_migrations():
-    """Add new columns to existing tables if they don't exist."""
-    from sqlalchemy import text
-    migrations = [
-        "ALTER TABLE service_centers ADD COLUMN IF NOT EXISTS show_on_landing BOOLEAN DEFAULT true",
-        "ALTER TABLE car_brands ADD COLUMN IF NOT EXISTS logo_url VARCHAR",
-        "ALTER TABLE warranties ADD COLUMN IF NOT EXISTS doc_urls VARCHAR",
-        "ALTER TABLE landing_partners ADD COLUMN IF NOT EXISTS gis_url VARCHAR",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS city VARCHAR",
-        "UPDATE landing_partners SET address = REGEXP_REPLACE(address, '^ул\\.\\s*', '') WHERE address LIKE 'ул.%'",
-        "ALTER TABLE cars ADD COLUMN IF NOT EXISTS last_service_mileage INTEGER",
-        "ALTER TABLE service_center_services ADD COLUMN IF NOT EXISTS commission_type VARCHAR",
-        "ALTER TABLE service_center_services ADD COLUMN IF NOT EXISTS commission_value INTEGER",
-        "ALTER TABLE service_center_services ADD COLUMN IF NOT EXISTS cashback_type VARCHAR",
-        "ALTER TABLE service_center_services ADD COLUMN IF NOT EXISTS cashback_value INTEGER",
-        "ALTER TABLE warranties ADD COLUMN IF NOT EXISTS status VARCHAR DEFAULT 'pending'",
-        "UPDATE warranties SET status = 'approved' WHERE status IS NULL",
-    ]
-    async with engine.begin() as conn:
-        for sql in migrations:
-            try:
-                await conn.execute(text(sql))
-            except Exception as e:
-                print(f"Migration skipped: {e}")
-    print("Migrations applied.")
-
-
-async def main():
-    await create_tables()
-    await run_migrations()
-    await engine.dispose()
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""One-shot schema migration job.
+
+Run once per deploy, before API replicas start (docker compose runs it as the
+`migrate` service):
+    python migrate.py            # upgrade to head
+    python migrate.py --check    # exit 1 unless the database is at head
+
+Concurrent runs are serialized with a Postgres advisory lock, and DDL uses a
+short lock_timeout so a migration waiting on a busy table gives up and retries
+instead of queueing every live query behind its lock. Databases created by the
+old init_db.py (no alembic_version table) are stamped at the baseline first.
+After upgrading, receipts still inlined in settlements.receipt_url are moved
+to storage (see alembic/versions/0003).
+"""
+
+import asyncio
+import hashlib
+import sys
+
+import sqlalchemy as sa
+from alembic import command
+from sqlalchemy import text
+
+from app.database import engine
+from app.migrations import BASELINE_REVISION, alembic_config, current_revision, head_revision
+from app.services.receipt_service import store_legacy_receipt
+from app.services.storage import get_storage
+
+MIGRATION_LOCK_ID = 72_417_001
+LOCK_TIMEOUT = "5s"
+MAX_ATTEMPTS = 5
+
+settlements = sa.table(
+    'settlements',
+    sa.column('id', sa.String),
+    sa.column('receipt_url', sa.String),
+    sa.column('receipt_key', sa.String),
+)
+
+
+def _run_alembic(sync_conn, fn, *args):
+    cfg = alembic_config()
+    cfg.attributes["connection"] = sync_conn
+    fn(cfg, *args)
+
+
+async def _upgrade_once() -> str | None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            await conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+            before = await current_revision(conn)
+            if before is None:
+                has_tables = (await conn.execute(text("SELECT to_regclass('users') IS NOT NULL"))).scalar()
+                if has_tables:
+                    print(f"Legacy schema detected, stamping baseline {BASELINE_REVISION}.")
+                    await conn.run_sync(_run_alembic, command.stamp, BASELINE_REVISION)
+            await conn.run_sync(_run_alembic, command.upgrade, "head")
+            await conn.commit()
+            return before
+        finally:
+            # A failed migration (e.g. lock timeout) leaves the transaction aborted, and
+            # unlocking inside it would raise and hide the error; the lock is per session
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            await conn.commit()
+
+
+async def upgrade():
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            before = await _upgrade_once()
+            break
+        except Exception as e:
+            if "lock timeout" not in str(e) or attempt == MAX_ATTEMPTS:
+                raise
+            print(f"Lock timeout while migrating (attempt {attempt}/{MAX_ATTEMPTS}), retrying...")
+            await asyncio.sleep(2 * attempt)
+    print(f"Schema migrated: {before or 'none'} -> {head_revision()}.")
+    await backfill_receipts()
+
+
+async def backfill_receipts() -> int:
+    """Store settlements.receipt_url blobs and set receipt_key; returns rows moved.
+
+    receipt_url is cleared only in the same commit that sets receipt_key, and
+    only once the stored file reads back from storage, so an interrupted run
+    or a storage misconfiguration loses nothing and the next deploy carries on.
+    """
+    storage = get_storage()
+    async with engine.connect() as conn:
+        columns = (await conn.execute(text(
+            "SELECT count(*) FROM information_schema.columns"
+            " WHERE table_name = 'settlements' AND column_name IN ('receipt_url', 'receipt_key')"
+        ))).scalar()
+        if columns < 2:
+            return 0
+        ids = (await conn.execute(
+            sa.select(settlements.c.id).where(settlements.c.receipt_url.isnot(None))
+        )).scalars().all()
+        await conn.commit()
+        keys: dict[str, str] = {}
+        moved = 0
+        for settlement_id in ids:
+            # One blob in memory at a time
+            blob = (await conn.execute(
+                sa.select(settlements.c.receipt_url).where(settlements.c.id == settlement_id)
+            )).scalar_one_or_none()
+            if blob is None:
+                continue
+            digest = hashlib.sha256(blob.encode()).hexdigest()
+            if digest not in keys:
+                key = await store_legacy_receipt(blob)
+                if not await storage.exists(key):
+                    print(f"Receipt of settlement {settlement_id} not found in storage as {key}, receipt_url kept.")
+                    continue
+                keys[digest] = key
+            await conn.execute(
+                settlements.update().where(settlements.c.id == settlement_id)
+                .values(receipt_key=keys[digest], receipt_url=None)
+            )
+            await conn.commit()
+            moved += 1
+    if moved:
+        print(f"Moved {moved} receipts ({len(keys)} distinct) to storage.")
+    return moved
+
+
+async def check() -> bool:
+    async with engine.connect() as conn:
+        current = await current_revision(conn)
+    expected = head_revision()
+    print(f"Database revision: {current or 'none'}, expected: {expected}.")
+    return current == expected
+
+
+async def main():
+    try:
+        if "--check" in sys.argv:
+            ok = await check()
+        else:
+            await upgrade()
+            ok = True
+    finally:
+        await engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
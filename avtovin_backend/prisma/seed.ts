@@ -6,7 +6,6 @@ async function main() {
   await prisma.visit.deleteMany();
   await prisma.car.deleteMany();
   await prisma.serviceCenter.deleteMany();
-  await prisma.otpCode.deleteMany();
   await prisma.user.deleteMany();
 
   const admin = await prisma.user.create({
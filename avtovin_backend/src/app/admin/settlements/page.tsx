@@ -26,6 +26,7 @@ interface Settlement {
   netAmount: number;
   isPaid: boolean;
   receiptUrl: string | null;
+  receiptThumbUrl: string | null;
   receiptStatus: string;
   createdAt: string;
   serviceCenter: { name: string; type: string };
@@ -106,12 +107,7 @@ export default function SettlementsPage() {
     fetchSettlements();
   };
 
-  const getReceiptSrc = (url: string) => {
-    if (url.startsWith("data:")) return url;
-    return `data:image/jpeg;base64,${url}`;
-  };
-
-  const isPdf = (url: string) => url.startsWith("data:application/pdf");
+  const isPdf = (url: string) => url.toLowerCase().split("?")[0].endsWith(".pdf");
 
   const totalNet = settlements.reduce((s, r) => s + (r.isPaid ? 0 : r.netAmount), 0);
   const pendingReceipts = settlements.filter((s) => s.receiptStatus === "PENDING").length;
@@ -227,7 +223,11 @@ export default function SettlementsPage() {
                           onClick={() => setReceiptModal(s)}
                           className={`inline-flex items-center gap-1 text-xs px-2 py-1 rounded-full ${rs.bg} ${rs.color}`}
                         >
-                          <Image className="h-3 w-3" />
+                          {s.receiptThumbUrl ? (
+                            <img src={s.receiptThumbUrl} alt="" loading="lazy" className="h-5 w-5 rounded object-cover" />
+                          ) : (
+                            <Image className="h-3 w-3" />
+                          )}
                           {rs.label}
                         </button>
                       ) : (
@@ -301,7 +301,7 @@ export default function SettlementsPage() {
                   />
                 ) : (
                   <img
-                    src={getReceiptSrc(receiptModal.receiptUrl)}
+                    src={receiptModal.receiptUrl}
                     alt="Чек оплаты"
                     className="w-full rounded-lg border border-gray-200 max-h-[60vh] object-contain"
                   />
@@ -50,6 +50,10 @@ function getToken(): string {
 export default function WarrantyManagersPage() {
   const [managers, setManagers] = useState<Manager[]>([]);
   const [loading, setLoading] = useState(true);
+  const [page, setPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(1);
+  const [total, setTotal] = useState(0);
+  const [totalWarranties, setTotalWarranties] = useState(0);
   const [showForm, setShowForm] = useState(false);
   const [editingId, setEditingId] = useState<string | null>(null);
   const [saving, setSaving] = useState(false);
@@ -62,17 +66,21 @@ export default function WarrantyManagersPage() {
   const fetchManagers = useCallback(async () => {
     setLoading(true);
     try {
-      const res = await fetch("/api/warranty-managers", {
+      const params = new URLSearchParams({ page: String(page), limit: "20" });
+      const res = await fetch(`/api/warranty-managers?${params}`, {
         headers: { Authorization: `Bearer ${getToken()}` },
       });
       const data = await res.json();
-      setManagers(data);
+      setManagers(data.managers || []);
+      setTotalPages(data.totalPages || 1);
+      setTotal(data.total || 0);
+      setTotalWarranties(data.totalWarranties || 0);
     } catch {
       console.error("Failed to fetch managers");
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [page]);
 
   useEffect(() => {
     fetchManagers();
@@ -170,7 +178,7 @@ export default function WarrantyManagersPage() {
             <UserCheck className="h-5 w-5 text-blue-600" />
           </div>
           <div>
-            <p className="text-2xl font-bold text-gray-900">{managers.length}</p>
+            <p className="text-2xl font-bold text-gray-900">{total}</p>
             <p className="text-xs text-gray-500">Всего менеджеров</p>
           </div>
         </div>
@@ -179,9 +187,7 @@ export default function WarrantyManagersPage() {
             <ShieldCheck className="h-5 w-5 text-emerald-600" />
           </div>
           <div>
-            <p className="text-2xl font-bold text-gray-900">
-              {managers.reduce((sum, m) => sum + m.totalWarranties, 0)}
-            </p>
+            <p className="text-2xl font-bold text-gray-900">{totalWarranties}</p>
             <p className="text-xs text-gray-500">Всего гарантий создано</p>
           </div>
         </div>
@@ -353,6 +359,26 @@ export default function WarrantyManagersPage() {
             )}
           </tbody>
         </table>
+
+        {totalPages > 1 && (
+          <div className="flex items-center justify-between px-6 py-4 border-t border-gray-200">
+            <button
+              onClick={() => setPage((p) => Math.max(1, p - 1))}
+              disabled={page === 1}
+              className="px-3 py-1 text-sm border rounded-lg disabled:opacity-50"
+            >
+              Назад
+            </button>
+            <span className="text-sm text-gray-500">Страница {page} из {totalPages}</span>
+            <button
+              onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
+              disabled={page === totalPages}
+              className="px-3 py-1 text-sm border rounded-lg disabled:opacity-50"
+            >
+              Далее
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );